@@ -2,14 +2,22 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from .models import (
+    ArchivedBooking,
+    ArchivedSlot,
+    ArchivedSubscription,
     AvailableSlot,
     Booking,
     Course,
+    CourseImage,
+    DailyCourseStat,
+    DailyWriterStat,
     Lesson,
     MentorshipPackage,
     Subscription,
+    Task,
     User,
     Writer,
+    WriterImage,
 )
 
 class CustomUserAdmin(UserAdmin):
@@ -25,5 +33,13 @@ admin.site.register(Writer)
 admin.site.register(MentorshipPackage)
 admin.site.register(Booking)
 admin.site.register(AvailableSlot)
+admin.site.register(CourseImage)
+admin.site.register(WriterImage)
+admin.site.register(DailyCourseStat)
+admin.site.register(DailyWriterStat)
+admin.site.register(Task)
+admin.site.register(ArchivedSubscription)
+admin.site.register(ArchivedBooking)
+admin.site.register(ArchivedSlot)
 
 # Register your models here.
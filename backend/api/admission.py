@@ -0,0 +1,29 @@
+import threading
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from . import metrics
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        limit = settings.ADMISSION_MAX_CONCURRENT_REQUESTS
+        self.slots = threading.BoundedSemaphore(limit) if limit else None
+        self.queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT
+        self.retry_after = settings.ADMISSION_RETRY_AFTER
+        self.exempt_paths = tuple(settings.ADMISSION_EXEMPT_PATHS)
+
+    def __call__(self, request):
+        if self.slots is None or request.path.startswith(self.exempt_paths):
+            return self.get_response(request)
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            metrics.incr("admission.rejected")
+            response = JsonResponse({"detail": "Server is busy, retry shortly."}, status=503)
+            response["Retry-After"] = str(self.retry_after)
+            return response
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
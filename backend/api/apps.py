@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .fields import check_codec
+
+        # Fail at startup rather than on the first read of a zstd row.
+        check_codec()
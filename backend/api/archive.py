@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import (
+    ArchivedBooking,
+    ArchivedSlot,
+    ArchivedSubscription,
+    AvailableSlot,
+    Booking,
+    Subscription,
+)
+
+
+def old_slots(now):
+    cutoff = timezone.localdate(now) - timedelta(days=settings.ARCHIVE_SLOT_RETENTION_DAYS)
+    return AvailableSlot.objects.filter(date__lt=cutoff)
+
+
+def old_bookings(now):
+    cutoff = now - timedelta(days=settings.ARCHIVE_BOOKING_RETENTION_DAYS)
+    return Booking.objects.filter(status__in=["completed", "cancelled"], session_date__lt=cutoff)
+
+
+def old_subscriptions(now):
+    cutoff = timezone.localdate(now) - timedelta(
+        days=settings.ARCHIVE_SUBSCRIPTION_RETENTION_DAYS
+    )
+    return Subscription.objects.filter(expired=True, expiry_date__lt=cutoff)
+
+
+def _detach_slots(ids):
+    AvailableSlot.objects.filter(booking_id__in=ids).update(booking=None)
+
+
+# Slots go first so bookings they point at are no longer referenced.
+ARCHIVES = {
+    "slots": (old_slots, ArchivedSlot, None),
+    "bookings": (old_bookings, ArchivedBooking, _detach_slots),
+    "subscriptions": (old_subscriptions, ArchivedSubscription, None),
+}
+
+
+def _columns(archive_model):
+    return [
+        field.attname for field in archive_model._meta.concrete_fields if field.name != "archived_at"
+    ]
+
+
+def archive(name, now=None, batch_size=500, pause=0.0, dry_run=False, progress=None):
+    select, archive_model, before_delete = ARCHIVES[name]
+    now = now or timezone.now()
+    queryset = select(now)
+    if dry_run:
+        return queryset.count()
+
+    columns = _columns(archive_model)
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by("pk").values(*columns)[:batch_size])
+            if not rows:
+                break
+            ids = [row["id"] for row in rows]
+            archive_model.objects.bulk_create(
+                [archive_model(archived_at=now, **row) for row in rows], ignore_conflicts=True
+            )
+            if before_delete is not None:
+                before_delete(ids)
+            # A raw delete skips the per-row signals, which would otherwise
+            # recompute rollups and requeue work for rows that only moved.
+            moved = queryset.model.objects.filter(pk__in=ids)
+            moved._raw_delete(moved.db)
+        total += len(ids)
+        metrics.incr(f"archive.{name}", len(ids))
+        if progress:
+            progress(name, len(ids), total)
+        if pause:
+            time.sleep(pause)
+    return total
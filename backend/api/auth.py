@@ -0,0 +1,57 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Length
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_user(user_id):
+    if user_id is not None:
+        cache.delete(user_cache_key(user_id))
+
+
+def writer_profile_id(user):
+    if hasattr(user, "writer_profile_id"):
+        return user.writer_profile_id
+    writer_profile = getattr(user, "writer_profile", None)
+    return writer_profile.id if writer_profile else None
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            UserModel = get_user_model()
+            user = (
+                UserModel._default_manager.annotate(writer_profile_id=F("writer_profile__id"))
+                .filter(pk=user_id)
+                .first()
+            )
+            if user is None:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def next_username(base):
+    UserModel = get_user_model()
+    last = (
+        UserModel._default_manager.filter(
+            username__startswith=base, username__regex=rf"^{re.escape(base)}[0-9]*$"
+        )
+        .order_by(Length("username").desc(), "-username")
+        .values_list("username", flat=True)
+        .first()
+    )
+    if last is None:
+        return base
+    suffix = last[len(base):]
+    return f"{base}{int(suffix) + 1 if suffix else 2}"
@@ -0,0 +1,158 @@
+import hashlib
+import mimetypes
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponseRedirect
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+KEY_CHARS = set("0123456789abcdef")
+EXTENSIONS = {
+    "image/avif": ".avif",
+    "image/gif": ".gif",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+CONTENT_TYPES = {extension: mime for mime, extension in EXTENSIONS.items()}
+# Keys are content hashes, so the bytes behind one never change.
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def make_key(data, mime):
+    extension = EXTENSIONS.get(mime) or mimetypes.guess_extension(mime or "") or ".bin"
+    return f"{hashlib.sha256(data).hexdigest()}{extension}"
+
+
+def is_valid_key(key):
+    digest, _, extension = key.partition(".")
+    return len(digest) == 64 and set(digest) <= KEY_CHARS and extension.isalnum()
+
+
+def content_type(key):
+    extension = os.path.splitext(key)[1]
+    return CONTENT_TYPES.get(extension) or mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def blob_url(key):
+    return reverse("blob", args=[key])
+
+
+class FileSystemBlobStore:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, key):
+        return self.root / key[:2] / key[2:4] / key
+
+    def exists(self, key):
+        return self.path(key).exists()
+
+    def put(self, data, mime):
+        key = make_key(data, mime)
+        target = self.path(key)
+        if target.exists():
+            return key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return key
+
+    def read(self, key):
+        return self.path(key).read_bytes()
+
+    def keys(self):
+        for path in self.root.glob("??/??/*"):
+            if is_valid_key(path.name):
+                yield path.name, path.stat().st_mtime
+
+    def delete(self, key):
+        self.path(key).unlink(missing_ok=True)
+
+    def response(self, key):
+        try:
+            handle = self.path(key).open("rb")
+        except FileNotFoundError:
+            raise Http404
+        response = FileResponse(handle, content_type=content_type(key))
+        response["Cache-Control"] = IMMUTABLE
+        return response
+
+
+class S3BlobStore:
+    def __init__(self, bucket, endpoint_url=None, prefix="", url_expiry=3600, **client_options):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expiry = url_expiry
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, **client_options)
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError:
+            return False
+        return True
+
+    def put(self, data, mime):
+        key = make_key(data, mime)
+        if not self.exists(key):
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key),
+                Body=data,
+                ContentType=content_type(key),
+                CacheControl=IMMUTABLE,
+            )
+        return key
+
+    def read(self, key):
+        response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        return response["Body"].read()
+
+    def keys(self):
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self.prefix
+        )
+        for page in pages:
+            for item in page.get("Contents", ()):
+                key = item["Key"][len(self.prefix) :]
+                if is_valid_key(key):
+                    yield key, item["LastModified"].timestamp()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def response(self, key):
+        url = self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=self.url_expiry,
+        )
+        # The blob is immutable but the signed URL is not: a cached redirect
+        # must lapse well before the signature does.
+        response = HttpResponseRedirect(url)
+        response["Cache-Control"] = f"private, max-age={self.url_expiry // 2}"
+        return response
+
+
+@lru_cache(maxsize=None)
+def get_blob_store():
+    config = settings.BLOB_STORE
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
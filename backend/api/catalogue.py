@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from . import response_cache, search, tasks
+from .models import Course, Lesson, MentorshipPackage, Writer
+from .ordering import GAP
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+KINDS = {
+    "writers": {
+        "model": Writer,
+        "unique_fields": ("slug",),
+        "fields": (
+            "name",
+            "bio",
+            "image_url",
+            "specialty",
+            "email",
+            "experience",
+            "achievements",
+            "active",
+        ),
+        "propagate": ("propagate_writer", "writer_id"),
+    },
+    "courses": {
+        "model": Course,
+        "unique_fields": ("slug",),
+        "fields": (
+            "title",
+            "description",
+            "image_url",
+            "instructor",
+            "type",
+            "price",
+            "requirements",
+            "category",
+            "duration",
+            "level",
+            "published",
+        ),
+        "propagate": ("propagate_course", "course_id"),
+    },
+    "lessons": {
+        "model": Lesson,
+        "unique_fields": ("course", "slug"),
+        "fields": (
+            "title",
+            "description",
+            "type",
+            "video_url",
+            "content",
+            "is_free",
+            "order",
+            "duration",
+        ),
+        "parent": ("course", Course),
+    },
+    "packages": {
+        "model": MentorshipPackage,
+        "unique_fields": ("slug",),
+        "fields": ("name", "sessions_count", "price", "description", "session_duration", "benefits"),
+        "parent": ("writer", Writer),
+    },
+}
+
+TRUE_VALUES = {"true", "yes", "1"}
+FALSE_VALUES = {"false", "no", "0", ""}
+
+
+def kind_for_path(path):
+    stem = Path(path).stem
+    return stem if stem in KINDS else None
+
+
+def read(stream, fmt, kind=None):
+    if fmt == "csv":
+        if kind not in KINDS:
+            raise ValueError("CSV files need a kind: writers, courses, lessons or packages.")
+        if isinstance(stream, (bytes, bytearray)):
+            stream = io.StringIO(stream.decode("utf-8-sig"))
+        return {kind: csv.DictReader(stream)}
+    if fmt != "json":
+        raise ValueError("Catalogue files must be JSON or CSV.")
+    data = json.load(stream) if hasattr(stream, "read") else stream
+    if isinstance(data, list):
+        if kind not in KINDS:
+            raise ValueError("A JSON list needs a kind: writers, courses, lessons or packages.")
+        return {kind: data}
+    if not isinstance(data, dict) or set(data) - set(KINDS):
+        raise ValueError("A JSON bundle may only hold writers, courses, lessons and packages.")
+    # Checked up front so a bad kind fails the whole bundle, not after the
+    # kinds before it have been written.
+    for name, rows in data.items():
+        if not isinstance(rows, list):
+            raise ValueError(f"{name} must be a list of objects.")
+        if not all(isinstance(row, dict) for row in rows):
+            raise ValueError(f"Every {name} entry must be an object.")
+    return data
+
+
+def _coerce(field, value):
+    if not isinstance(value, str):
+        return value
+    internal = field.get_internal_type()
+    if internal == "BooleanField":
+        lowered = value.strip().lower()
+        if lowered in TRUE_VALUES:
+            return True
+        if lowered in FALSE_VALUES:
+            return False
+        return value
+    if internal == "JSONField":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return [item.strip() for item in value.split("|") if item.strip()]
+    if value == "" and field.null:
+        return None
+    return field.to_python(value)
+
+
+class Importer:
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.keys = {}
+
+    def _keys(self, model):
+        if model not in self.keys:
+            self.keys[model] = dict(
+                model.objects.filter(slug__isnull=False).values_list("slug", "id")
+            )
+        return self.keys[model]
+
+    def _build(self, kind, spec, number, row, errors):
+        model = spec["model"]
+        slug = str(row.get("slug") or "").strip()
+        if not slug:
+            errors.append({"row": number, "errors": {"slug": ["This field is required."]}})
+            return None
+        values = {"slug": slug}
+        try:
+            for name in spec["fields"]:
+                if name in row:
+                    values[name] = _coerce(model._meta.get_field(name), row[name])
+        except ValidationError as exc:
+            errors.append({"row": number, "errors": {"__all__": exc.messages}})
+            return None
+
+        exclude = []
+        if "parent" in spec:
+            field, parent = spec["parent"]
+            parent_id = self._keys(parent).get(str(row.get(field) or "").strip())
+            if parent_id is None:
+                errors.append({"row": number, "errors": {field: ["Unknown natural key."]}})
+                return None
+            values[f"{field}_id"] = parent_id
+            exclude.append(field)
+        if kind == "lessons" and values.get("order") is None:
+            values["order"] = 0
+            exclude.append("order")
+
+        instance = model(**values)
+        try:
+            instance.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+        except ValidationError as exc:
+            errors.append({"row": number, "errors": exc.message_dict})
+            return None
+        return instance
+
+    def _assign_lesson_keys(self, lessons):
+        pending = [lesson for lesson in lessons if not lesson.order]
+        if not pending:
+            return
+        course_ids = {lesson.course_id for lesson in pending}
+        last = dict(
+            Lesson.objects.filter(course_id__in=course_ids)
+            .values("course_id")
+            .annotate(last=Max("order"))
+            .values_list("course_id", "last")
+        )
+        existing = {
+            (course_id, slug): order
+            for course_id, slug, order in Lesson.objects.filter(
+                course_id__in=course_ids, slug__in=[lesson.slug for lesson in pending]
+            ).values_list("course_id", "slug", "order")
+        }
+        for lesson in pending:
+            if (lesson.course_id, lesson.slug) in existing:
+                lesson.order = existing[lesson.course_id, lesson.slug]
+            else:
+                last[lesson.course_id] = (last.get(lesson.course_id) or 0) + GAP
+                lesson.order = last[lesson.course_id]
+
+    def _write(self, kind, spec, instances, columns):
+        model = spec["model"]
+        unique_fields = list(spec["unique_fields"])
+        update_fields = [name for name in spec["fields"] if name in columns]
+        if kind == "packages":
+            writers = dict(
+                Writer.objects.filter(
+                    pk__in={package.writer_id for package in instances}
+                ).values_list("id", "name")
+            )
+            for package in instances:
+                package.writer_name = writers[package.writer_id]
+            update_fields += ["writer", "writer_name"]
+        if kind == "lessons":
+            self._assign_lesson_keys(instances)
+        known = self._keys(model) if "propagate" in spec else {}
+        existing = [known[instance.slug] for instance in instances if instance.slug in known]
+
+        with transaction.atomic():
+            model.objects.bulk_create(
+                instances,
+                update_conflicts=bool(update_fields),
+                ignore_conflicts=not update_fields,
+                unique_fields=unique_fields,
+                update_fields=update_fields or None,
+            )
+            if "propagate" in spec:
+                name, argument = spec["propagate"]
+                for pk in existing:
+                    tasks.enqueue(name, **{argument: pk})
+                search.index_objects(
+                    model.objects.filter(slug__in=[instance.slug for instance in instances])
+                )
+                self.keys.pop(model, None)
+
+    def import_kind(self, kind, rows):
+        spec = KINDS[kind]
+        report = {"rows": 0, "imported": 0, "errors": []}
+        errors = []
+        started = time.perf_counter()
+        rows = iter(rows)
+        number = 0
+        while batch := list(islice(rows, self.batch_size)):
+            if not all(isinstance(row, dict) for row in batch):
+                raise ValueError(f"Every {kind} entry must be an object.")
+            instances = {}
+            columns = set()
+            for row in batch:
+                number += 1
+                instance = self._build(kind, spec, number, row, errors)
+                if instance is None:
+                    continue
+                key = tuple(
+                    getattr(instance, instance._meta.get_field(name).attname)
+                    for name in spec["unique_fields"]
+                )
+                instances.pop(key, None)
+                instances[key] = instance
+                columns.update(row)
+                if self.dry_run and "propagate" in spec:
+                    self._keys(spec["model"]).setdefault(instance.slug, 0)
+            report["rows"] = number
+            if instances and not self.dry_run:
+                self._write(kind, spec, list(instances.values()), columns)
+            report["imported"] += len(instances)
+
+        elapsed = time.perf_counter() - started
+        report["errors"] = errors[:MAX_REPORTED_ERRORS]
+        report["error_count"] = len(errors)
+        report["seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(number / elapsed) if elapsed else 0
+        if report["imported"] and not self.dry_run:
+            response_cache.bump(spec["model"])
+        return report
+
+    def run(self, bundle):
+        report = {kind: self.import_kind(kind, bundle[kind]) for kind in KINDS if kind in bundle}
+        if not self.dry_run and any(
+            result["imported"] for kind, result in report.items() if kind != "lessons"
+        ):
+            tasks.schedule_snapshots()
+        return report
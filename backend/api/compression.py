@@ -0,0 +1,92 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+CODECS = {"gzip": lambda data: gzip.compress(data, compresslevel=6)}
+if brotli is not None:
+    CODECS["br"] = lambda data: brotli.compress(data, quality=5)
+if zstandard is not None:
+    CODECS["zstd"] = lambda data: zstandard.ZstdCompressor(level=6).compress(data)
+
+PREFERENCE = ("zstd", "br", "gzip")
+COMPRESSIBLE_TYPES = re.compile(r"^(application/(json|x-ndjson|javascript|xml)|text/)")
+
+
+def negotiate(accept_encoding):
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    for codec in PREFERENCE:
+        if codec in CODECS and offered.get(codec, offered.get("*", 0)) > 0:
+            return codec
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header("Content-Encoding") or response.status_code != 200:
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codec = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if codec != "gzip" or response.is_async:
+                return response
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            original = response.content
+            entry = getattr(response, "cache_entry", None)
+            compressed = entry.encoded(codec) if entry else None
+            if compressed is None:
+                compressed = CODECS[codec](original)
+                metrics.incr("compression.encoded")
+                if entry:
+                    entry.store_encoded(codec, compressed)
+            else:
+                metrics.incr("compression.precompressed_hits")
+            if len(compressed) >= len(original):
+                return response
+            metrics.incr("compression.bytes_in", len(original))
+            metrics.incr("compression.bytes_saved", len(original) - len(compressed))
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = codec
+        return response
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from . import response_cache
+from .models import Course, Subscription, normalize_email
+
+UNRESTRICTED = None
+
+
+def _key(email):
+    return f"entitlements:{response_cache.version(Course)}:{normalize_email(email)}"
+
+
+def invalidate(email):
+    if email:
+        cache.delete(_key(email))
+
+
+def free_course_ids():
+    key = f"entitlements:free:{response_cache.version(Course)}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Course.objects.filter(type="free").values_list("id", flat=True))
+        cache.set(key, ids, settings.ENTITLEMENT_CACHE_TIMEOUT)
+    return ids
+
+
+def _query_course_ids(user):
+    today = timezone.localdate()
+    subscribed = (
+        Subscription.objects.with_email(user.email)
+        .filter(payment_status="completed", expired=False)
+        .filter(Q(expiry_date__isnull=True) | Q(expiry_date__gte=today))
+        .values_list("course_id", flat=True)
+    )
+    if user.role == "instructor":
+        taught = Course.objects.filter(instructor=user.get_full_name() or user.username)
+        subscribed = subscribed.union(taught.values_list("id", flat=True))
+    return frozenset(subscribed)
+
+
+def entitled_course_ids(user):
+    if not user or not user.is_authenticated:
+        return frozenset()
+    if user.is_staff or getattr(user, "role", None) == "manager":
+        return UNRESTRICTED
+    if not user.email:
+        return frozenset()
+    key = _key(user.email)
+    ids = cache.get(key)
+    if ids is None:
+        ids = _query_course_ids(user)
+        cache.set(key, ids, settings.ENTITLEMENT_CACHE_TIMEOUT)
+    return ids
+
+
+class LessonAccess:
+    def __init__(self, user):
+        self.entitled = entitled_course_ids(user)
+        self.free = free_course_ids()
+
+    def can_open(self, course_id, is_free):
+        return (
+            is_free
+            or course_id in self.free
+            or self.entitled is UNRESTRICTED
+            or course_id in self.entitled
+        )
@@ -0,0 +1,165 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+from itertools import chain, islice
+
+from .filters import filter_by_params
+from .models import Booking, DailyCourseStat, DailyWriterStat, Subscription
+from .renderers import dumps
+
+CHUNK_SIZE = 2000
+
+SUBSCRIPTION_COLUMNS = (
+    "id",
+    "user_email",
+    "course_id",
+    "course_title",
+    "payment_status",
+    "payment_amount",
+    "payment_date",
+    "expiry_date",
+    "expired",
+)
+BOOKING_COLUMNS = (
+    "id",
+    "user_email",
+    "user_name",
+    "writer_id",
+    "writer_name",
+    "writer_email",
+    "package_id",
+    "sessions_count",
+    "session_date",
+    "status",
+    "payment_status",
+)
+REVENUE_COLUMNS = ("day", "source", "entity_id", "name", "count", "paid_count", "revenue")
+
+RESOURCES = {
+    "subscriptions": {
+        "model": Subscription,
+        "columns": SUBSCRIPTION_COLUMNS,
+        "filter_fields": ("id", "course_id", "user_email", "payment_status", "expired"),
+    },
+    "bookings": {
+        "model": Booking,
+        "columns": BOOKING_COLUMNS,
+        "filter_fields": ("id", "writer_id", "package_id", "status", "payment_status", "user_email"),
+    },
+    "revenue": {"columns": REVENUE_COLUMNS},
+}
+
+
+def _stat_rows(model, source, key, name_field, count_field, paid_field, start, end):
+    qs = model.objects.all()
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    values = qs.order_by("day", key).values_list(
+        "day", key, name_field, count_field, paid_field, "revenue"
+    )
+    for day, entity_id, name, count, paid, revenue in values.iterator(chunk_size=CHUNK_SIZE):
+        yield day, source, entity_id, name, count, paid, revenue
+
+
+def _revenue_rows(params):
+    start = date.fromisoformat(params["start"]) if params.get("start") else None
+    end = date.fromisoformat(params["end"]) if params.get("end") else None
+    if start and end and start > end:
+        raise ValueError("start must not be after end.")
+    source = params.get("source")
+    if source not in (None, "", "courses", "writers"):
+        raise ValueError("source must be courses or writers.")
+    streams = []
+    if source in (None, "", "courses"):
+        streams.append(
+            _stat_rows(
+                DailyCourseStat,
+                "course",
+                "course_id",
+                "course__title",
+                "subscriptions",
+                "paid_subscriptions",
+                start,
+                end,
+            )
+        )
+    if source in (None, "", "writers"):
+        streams.append(
+            _stat_rows(
+                DailyWriterStat,
+                "writer",
+                "writer_id",
+                "writer__name",
+                "bookings",
+                "paid_bookings",
+                start,
+                end,
+            )
+        )
+    return chain.from_iterable(streams)
+
+
+def rows(resource, params):
+    spec = RESOURCES[resource]
+    if resource == "revenue":
+        return _revenue_rows(params)
+    queryset = filter_by_params(
+        spec["model"].objects.order_by("id"), params, spec["filter_fields"], "user_email"
+    )
+    return queryset.values_list(*spec["columns"]).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _batches(rows):
+    rows = iter(rows)
+    while batch := list(islice(rows, CHUNK_SIZE)):
+        yield batch
+
+
+def csv_stream(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+    for batch in _batches(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_cell(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _json_cell(value):
+    # Amounts stay exact strings, as in the CSV and the API.
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def ndjson_stream(columns, rows):
+    for batch in _batches(rows):
+        yield b"".join(
+            dumps({column: _json_cell(value) for column, value in zip(columns, row)}) + b"\n"
+            for row in batch
+        )
+
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", csv_stream),
+    "ndjson": ("application/x-ndjson", ndjson_stream),
+}
+
+
+def stream(resource, fmt, params):
+    columns = RESOURCES[resource]["columns"]
+    content_type, writer = FORMATS[fmt]
+    return content_type, writer(columns, rows(resource, params))
@@ -0,0 +1,115 @@
+from functools import lru_cache
+from itertools import islice
+
+from rest_framework import serializers
+from rest_framework.permissions import BasePermission
+
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.JSONField,
+)
+CONVERTED_FIELDS = (
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.FloatField,
+)
+
+
+class CompiledSerializer:
+    batch_size = 500
+
+    def __init__(self, columns, spec, resolvers=()):
+        self.columns = columns
+        self.spec = spec
+        self.resolvers = resolvers
+
+    def row_to_dict(self, row):
+        return {
+            key: None
+            if index is None
+            else convert(row[index])
+            if convert is not None and row[index] is not None
+            else row[index]
+            for key, index, convert in self.spec
+        }
+
+    def rows(self, queryset, chunk_size=None, context=None):
+        values = queryset.values_list(*self.columns)
+        iterable = values.iterator(chunk_size=chunk_size) if chunk_size else values
+        if not self.resolvers:
+            for row in iterable:
+                yield self.row_to_dict(row)
+            return
+        # Method fields are filled a chunk at a time, so their lookups cost
+        # one query per chunk rather than one per row.
+        iterator = iter(iterable)
+        while chunk := list(islice(iterator, chunk_size or self.batch_size)):
+            items = [self.row_to_dict(row) for row in chunk]
+            for key, positions, resolver in self.resolvers:
+                resolved = resolver.resolve(
+                    [tuple(row[index] for index in positions) for row in chunk], context or {}
+                )
+                for item, value in zip(items, resolved):
+                    item[key] = value
+            yield from items
+
+
+def _column_for(field):
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None or "." in field.source:
+            return None
+        return f"{field.source}_id", None
+    if isinstance(field, serializers.ModelField) or "." in field.source or field.source == "*":
+        return None
+    if isinstance(field, PASSTHROUGH_FIELDS) and not isinstance(field, CONVERTED_FIELDS):
+        if isinstance(field, serializers.JSONField) and field.binary:
+            return None
+        return field.source, None
+    if isinstance(field, CONVERTED_FIELDS):
+        return field.source, field.to_representation
+    return None
+
+
+def _column_index(columns, column):
+    if column not in columns:
+        columns.append(column)
+    return columns.index(column)
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    serializer = serializer_class()
+    columns = []
+    spec = []
+    resolvers = []
+    for key, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            # A method field compiles only when the serializer offers a batch
+            # resolver for it as compile_<field name>(model).
+            factory = getattr(serializer_class, f"compile_{key}", None)
+            if factory is None:
+                return None
+            resolver = factory(serializer.Meta.model)
+            positions = tuple(_column_index(columns, column) for column in resolver.columns)
+            spec.append((key, None, None))
+            resolvers.append((key, positions, resolver))
+            continue
+        compiled = _column_for(field)
+        if compiled is None:
+            return None
+        column, convert = compiled
+        spec.append((key, _column_index(columns, column), convert))
+    return CompiledSerializer(tuple(columns), tuple(spec), tuple(resolvers))
+
+
+def has_object_permissions(permissions):
+    return any(
+        type(permission).has_object_permission is not BasePermission.has_object_permission
+        for permission in permissions
+    )
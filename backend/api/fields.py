@@ -0,0 +1,83 @@
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+RAW = 0
+ZLIB = 1
+ZSTD = 2
+CODECS = {"zlib": ZLIB, "zstd": ZSTD}
+
+
+def check_codec():
+    codec = settings.COMPRESSED_TEXT_CODEC
+    if codec not in CODECS:
+        raise ImproperlyConfigured(f"COMPRESSED_TEXT_CODEC must be zlib or zstd, not {codec!r}.")
+    if codec == "zstd" and zstandard is None:
+        raise ImproperlyConfigured(
+            "COMPRESSED_TEXT_CODEC is zstd but the zstandard package is not installed."
+        )
+
+
+def _codec():
+    return CODECS[settings.COMPRESSED_TEXT_CODEC]
+
+
+def pack(text):
+    data = text.encode("utf-8")
+    if len(data) >= settings.COMPRESSED_TEXT_MIN_SIZE:
+        version = _codec()
+        if version == ZSTD:
+            packed = zstandard.ZstdCompressor(level=settings.COMPRESSED_TEXT_LEVEL).compress(data)
+        else:
+            packed = zlib.compress(data, settings.COMPRESSED_TEXT_LEVEL)
+        if len(packed) < len(data):
+            return bytes([version]) + packed
+    return bytes([RAW]) + data
+
+
+def unpack(value):
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value:
+        return ""
+    version, data = value[0], value[1:]
+    if version == RAW:
+        return data.decode("utf-8")
+    if version == ZLIB:
+        return zlib.decompress(data).decode("utf-8")
+    if version == ZSTD:
+        if zstandard is None:
+            raise ImproperlyConfigured(
+                "This text was stored with zstd; install zstandard on every host that reads it."
+            )
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown compressed text version {version}.")
+
+
+class CompressedTextField(models.TextField):
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return unpack(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return unpack(value)
+        return super().to_python(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return value
+        return connection.Database.Binary(pack(value))
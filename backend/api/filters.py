@@ -0,0 +1,16 @@
+def filter_by_params(queryset, params, fields, email_field=None):
+    filters = {}
+    for field in fields:
+        if field not in params:
+            continue
+        value = params.get(field)
+        if value is None or value == "":
+            continue
+        if field == email_field:
+            queryset = queryset.with_email(value)
+            continue
+        lowered = value.lower()
+        if lowered in {"true", "false"}:
+            value = lowered == "true"
+        filters[field] = value
+    return queryset.filter(**filters)
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = settings.PASSWORD_SCRYPT_PARAMS["work_factor"]
+    block_size = settings.PASSWORD_SCRYPT_PARAMS["block_size"]
+    parallelism = settings.PASSWORD_SCRYPT_PARAMS["parallelism"]
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = settings.PASSWORD_ARGON2_PARAMS["time_cost"]
+    memory_cost = settings.PASSWORD_ARGON2_PARAMS["memory_cost"]
+    parallelism = settings.PASSWORD_ARGON2_PARAMS["parallelism"]
@@ -0,0 +1,129 @@
+import time
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+
+from . import metrics, tasks
+from .blobstore import get_blob_store
+from .models import Course, CourseImage, Writer, WriterImage
+
+IMAGE_SIZES = ("thumbnail", "card", "full")
+MIME_TYPES = {"WEBP": "image/webp", "AVIF": "image/avif", "JPEG": "image/jpeg"}
+# Every column that can point at a blob. Keys are content hashes, so two rows
+# uploading the same bytes share one blob and it stays until both let go.
+BLOB_REFERENCES = (
+    (CourseImage, "storage_key"),
+    (WriterImage, "storage_key"),
+    (Course, "image_storage_key"),
+    (Writer, "image_storage_key"),
+)
+
+
+def _check_size(upload):
+    limit = settings.IMAGE_UPLOAD_MAX_BYTES
+    if upload.size is not None and upload.size > limit:
+        raise ValidationError(f"Image exceeds the {limit // (1024 * 1024)} MB upload limit.")
+
+
+def _open(upload):
+    _check_size(upload)
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+            raise ValidationError("Image dimensions are too large.")
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise ValidationError("Upload a valid image.") from exc
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or "A" in image.mode else "RGB")
+    return image
+
+
+def _encode(image, bounds):
+    variant = image.copy()
+    variant.thumbnail(bounds, Image.Resampling.LANCZOS)
+    fmt = settings.IMAGE_VARIANT_FORMAT
+    if fmt == "JPEG" and variant.mode == "RGBA":
+        variant = variant.convert("RGB")
+    buffer = BytesIO()
+    variant.save(buffer, format=fmt, quality=settings.IMAGE_VARIANT_QUALITY)
+    return {
+        "blob": buffer.getvalue(),
+        "mime": MIME_TYPES[fmt],
+        "width": variant.width,
+        "height": variant.height,
+    }
+
+
+def ingest(upload):
+    image = _open(upload)
+    return {
+        size: _encode(image, settings.IMAGE_VARIANT_BOUNDS[size]) for size in IMAGE_SIZES
+    }
+
+
+def replace_variants(instance, variants):
+    store = get_blob_store()
+    manager = instance.image_variants
+    owner = {manager.field.name: instance}
+    previous = manager.model.objects.filter(**owner)
+    released = list(previous.values_list("storage_key", flat=True))
+    # A raw delete skips the per-variant release signal; the old keys are
+    # released together below, once the new variants are in place.
+    previous._raw_delete(previous.db)
+    manager.model.objects.bulk_create(
+        [
+            manager.model(
+                size=size,
+                storage_key=store.put(data["blob"], data["mime"]),
+                mime=data["mime"],
+                width=data["width"],
+                height=data["height"],
+                **owner,
+            )
+            for size, data in variants.items()
+        ]
+    )
+    if any(released):
+        tasks.enqueue("release_blobs", keys=[key for key in released if key])
+
+
+def referenced_keys(keys):
+    keys = list(keys)
+    in_use = set()
+    for start in range(0, len(keys), 500):
+        chunk = keys[start : start + 500]
+        for model, field in BLOB_REFERENCES:
+            in_use.update(
+                model.objects.filter(**{f"{field}__in": chunk}).values_list(field, flat=True)
+            )
+    return in_use
+
+
+def release_blobs(keys):
+    keys = {key for key in keys if key}
+    unused = keys - referenced_keys(keys)
+    store = get_blob_store()
+    for key in unused:
+        store.delete(key)
+    if unused:
+        metrics.incr("blobs.released", len(unused))
+    return len(unused)
+
+
+def collect_garbage(min_age=3600, dry_run=False):
+    # Blobs younger than min_age may belong to an upload whose row is not
+    # committed yet, so only older unreferenced blobs are removed.
+    cutoff = time.time() - min_age
+    candidates = [key for key, modified in get_blob_store().keys() if modified < cutoff]
+    unused = set(candidates) - referenced_keys(candidates)
+    if not dry_run:
+        store = get_blob_store()
+        for key in unused:
+            store.delete(key)
+        metrics.incr("blobs.collected", len(unused))
+    return len(candidates), len(unused)
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import archive
+
+
+class Command(BaseCommand):
+    help = "Move slots, bookings and subscriptions past their retention window to archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only", choices=sorted(archive.ARCHIVES), action="append", help="Archive just this set."
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--pause", type=float, default=0.0, help="Seconds to sleep between batches."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count rows due for archival without moving them."
+        )
+
+    def _progress(self, name, moved, total):
+        self.stdout.write(f"  {name}: {moved} in batch, {total} so far")
+
+    def handle(self, *args, **options):
+        for name in archive.ARCHIVES:
+            if options["only"] and name not in options["only"]:
+                continue
+            started = time.perf_counter()
+            count = archive.archive(
+                name,
+                batch_size=options["batch_size"],
+                pause=options["pause"],
+                dry_run=options["dry_run"],
+                progress=None if options["dry_run"] else self._progress,
+            )
+            elapsed = time.perf_counter() - started
+            verb = "would move" if options["dry_run"] else "moved"
+            self.stdout.write(self.style.SUCCESS(f"{name}: {verb} {count} rows in {elapsed:.2f}s."))
@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import catalogue
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure catalogue import throughput in rows per second on synthetic rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--lessons-per-course", type=int, default=20)
+        parser.add_argument("--writers", type=int, default=100)
+        parser.add_argument("--batch-size", type=int, default=catalogue.BATCH_SIZE)
+        parser.add_argument(
+            "--keep", action="store_true", help="Commit the rows instead of rolling back."
+        )
+
+    def _bundle(self, options):
+        writers = [
+            {"slug": f"bench-writer-{n}", "name": f"Writer {n}", "bio": "Bio", "specialty": "Poetry"}
+            for n in range(options["writers"])
+        ]
+        courses = [
+            {
+                "slug": f"bench-course-{n}",
+                "title": f"Course {n}",
+                "description": "Description",
+                "instructor": f"Writer {n % max(options['writers'], 1)}",
+                "type": "paid",
+                "price": "49.00",
+            }
+            for n in range(options["courses"])
+        ]
+        lessons = [
+            {
+                "course": f"bench-course-{n}",
+                "slug": f"lesson-{m}",
+                "title": f"Lesson {m}",
+                "type": "exercise",
+                "content": "Lorem ipsum " * 40,
+                "is_free": m == 0,
+            }
+            for n in range(options["courses"])
+            for m in range(options["lessons_per_course"])
+        ]
+        packages = [
+            {
+                "writer": f"bench-writer-{n}",
+                "slug": f"bench-package-{n}",
+                "name": "Package",
+                "sessions_count": 4,
+                "price": "120.00",
+                "benefits": ["Feedback", "Reading list"],
+            }
+            for n in range(options["writers"])
+        ]
+        return {"writers": writers, "courses": courses, "lessons": lessons, "packages": packages}
+
+    def _report(self, label, report):
+        for kind, result in report.items():
+            self.stdout.write(
+                f"{label} {kind}: {result['rows']} rows in {result['seconds']:.2f}s "
+                f"({result['rows_per_second']:,} rows/s, {result['error_count']} errors)"
+            )
+
+    def handle(self, *args, **options):
+        bundle = self._bundle(options)
+        try:
+            with transaction.atomic():
+                importer = catalogue.Importer(options["batch_size"])
+                self._report("insert", importer.run(bundle))
+                self._report("upsert", catalogue.Importer(options["batch_size"]).run(bundle))
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write("Rolled back benchmark rows.")
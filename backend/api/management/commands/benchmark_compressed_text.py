@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.fields import CompressedTextField, unpack
+from api.models import Course, Lesson, Writer
+
+
+class Command(BaseCommand):
+    help = "Report stored versus raw size and read latency for compressed text columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reads", type=int, default=20)
+
+    def _stored(self, model, field):
+        table = connection.ops.quote_name(model._meta.db_table)
+        column = connection.ops.quote_name(field.column)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {column} FROM {table}")
+            return [bytes(row[0]) for row in cursor.fetchall() if row[0] is not None]
+
+    def _field(self, model, field, reads):
+        stored = self._stored(model, field)
+        texts = [unpack(value) for value in stored]
+        raw_bytes = sum(len(text.encode("utf-8")) for text in texts)
+        stored_bytes = sum(len(value) for value in stored)
+
+        started = time.perf_counter()
+        for _ in range(reads):
+            list(model.objects.values_list(field.name, flat=True))
+        query_ms = (time.perf_counter() - started) * 1000 / reads
+
+        started = time.perf_counter()
+        for _ in range(reads):
+            for value in stored:
+                unpack(value)
+        decode_ms = (time.perf_counter() - started) * 1000 / reads
+
+        ratio = stored_bytes / raw_bytes if raw_bytes else 1
+        self.stdout.write(
+            f"{model._meta.model_name}.{field.name}: {len(stored)} rows, "
+            f"{raw_bytes:,} raw bytes -> {stored_bytes:,} stored ({ratio:.0%}), "
+            f"read {query_ms:.2f}ms/pass of which decode {decode_ms:.2f}ms"
+        )
+
+    def handle(self, *args, **options):
+        for model in (Course, Lesson, Writer):
+            for field in model._meta.concrete_fields:
+                if isinstance(field, CompressedTextField):
+                    self._field(model, field, options["reads"])
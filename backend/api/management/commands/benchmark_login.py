@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time login email resolution against a large synthetic user table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--lookups", type=int, default=2_000)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def _seed(self, User, count, batch_size):
+        # One hash shared by every row; hashing a million passwords would
+        # measure the hasher, not the lookup.
+        password = make_password("kitab-benchmark")
+        for start in range(0, count, batch_size):
+            User.objects.bulk_create(
+                [
+                    User(username=f"bench{n}", email=f"bench{n}@example.com", password=password)
+                    for n in range(start, min(start + batch_size, count))
+                ],
+                batch_size=batch_size,
+            )
+
+    def _time(self, label, lookup, emails):
+        started = time.perf_counter()
+        for email in emails:
+            lookup(email)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label}: {len(emails) / elapsed:,.0f} lookups/s "
+            f"({elapsed * 1000 / len(emails):.3f} ms each)"
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        count = options["users"]
+        emails = [
+            f"Bench{random.randrange(count)}@Example.com" for _ in range(options["lookups"])
+        ]
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                self._seed(User, count, options["batch_size"])
+                self.stdout.write(f"Seeded {count:,} users in {time.perf_counter() - started:.1f}s.")
+                self._time(
+                    "Lower(email) index",
+                    lambda email: User.objects.with_email(email).only("username").first(),
+                    emails,
+                )
+                self._time(
+                    "email__iexact",
+                    lambda email: User.objects.filter(email__iexact=email).only("username").first(),
+                    emails[: max(1, len(emails) // 100)],
+                )
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Rolled back benchmark users.")
@@ -0,0 +1,85 @@
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.utils.module_loading import import_string
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure login requests per second through /api/auth/login/ for each hashing policy."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=2.0)
+        parser.add_argument("--policy", action="append", dest="policies")
+
+    def _rate(self, client, payload, status, seconds):
+        runs = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            client.cookies.clear()
+            response = client.post("/api/auth/login/", payload, content_type="application/json")
+            if response.status_code != status:
+                raise RuntimeError(f"Expected {status} from login, got {response.status_code}.")
+            runs += 1
+        return runs / (time.perf_counter() - started)
+
+    def _measure(self, hasher_path, seconds):
+        hasher = import_string(hasher_path)()
+        try:
+            hasher.encode("kitab-benchmark", hasher.salt())
+        except ValueError as exc:
+            return str(exc)
+        # Throttles would turn the run into a 429 benchmark.
+        with override_settings(
+            PASSWORD_HASHERS=[hasher_path, *settings.PASSWORD_HASHERS],
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}},
+            ALLOWED_HOSTS=["testserver"],
+        ):
+            try:
+                with transaction.atomic():
+                    get_user_model().objects.create_user(
+                        username="kitab-benchmark",
+                        email="benchmark@kitab.local",
+                        password="kitab-benchmark",
+                    )
+                    client = Client()
+                    ok = {"email": "benchmark@kitab.local", "password": "kitab-benchmark"}
+                    bad = {**ok, "password": "wrong"}
+                    rates = (
+                        self._rate(client, ok, 200, seconds),
+                        self._rate(client, bad, 401, seconds),
+                    )
+                    raise Rollback
+            except Rollback:
+                return rates
+
+    def handle(self, *args, **options):
+        # Each failed login would otherwise log an "Unauthorized" warning.
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            self._report(options["policies"] or list(settings.PASSWORD_HASHER_POLICIES), options)
+        finally:
+            request_logger.setLevel(level)
+
+    def _report(self, policies, options):
+        for policy in policies:
+            result = self._measure(settings.PASSWORD_HASHER_POLICIES[policy], options["seconds"])
+            if isinstance(result, str):
+                self.stdout.write(self.style.WARNING(f"{policy}: skipped ({result})"))
+                continue
+            marker = " (active)" if policy == settings.PASSWORD_HASHING_POLICY else ""
+            self.stdout.write(
+                f"{policy}{marker}: {result[0]:,.1f} logins/sec, "
+                f"{result[1]:,.1f} failed logins/sec per worker"
+            )
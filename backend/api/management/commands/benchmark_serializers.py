@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import serializers
+from api.fastpath import compile_serializer
+
+SERIALIZERS = (
+    serializers.LessonSerializer,
+    serializers.SubscriptionSerializer,
+    serializers.MentorshipPackageSerializer,
+    serializers.BookingSerializer,
+    serializers.AvailableSlotSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = "Compare stock and compiled serializer throughput in rows per second."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _rate(self, produce, repeat):
+        rows = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            rows += len(produce())
+        elapsed = time.perf_counter() - started
+        return rows / elapsed if elapsed else 0.0
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        for serializer_class in SERIALIZERS:
+            queryset = serializer_class.Meta.model.objects.all()
+            compiled = compile_serializer(serializer_class)
+            stock = self._rate(lambda: serializer_class(queryset.all(), many=True).data, repeat)
+            fast = self._rate(lambda: list(compiled.rows(queryset.all())), repeat)
+            self.stdout.write(
+                f"{serializer_class.__name__}: stock {stock:,.0f} rows/s, "
+                f"compiled {fast:,.0f} rows/s ({fast / stock if stock else 0:.1f}x)"
+            )
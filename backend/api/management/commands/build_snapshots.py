@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api import snapshots
+
+
+class Command(BaseCommand):
+    help = "Write versioned, precompressed JSON snapshots of the published catalogue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            choices=sorted(snapshots.SNAPSHOTS),
+            action="append",
+            help="Build just this snapshot.",
+        )
+        parser.add_argument(
+            "--output", help="Directory to write; defaults to CATALOGUE_SNAPSHOT_DIR."
+        )
+
+    def handle(self, *args, **options):
+        manifest = snapshots.build_all(options["only"], options["output"])
+        for name in options["only"] or snapshots.SNAPSHOTS:
+            entry = manifest[name]
+            rows = f"{entry['count']} rows, " if entry["count"] is not None else ""
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: {rows}{entry['bytes']:,} bytes -> {entry['url']}")
+            )
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from api import exports
+
+
+class Command(BaseCommand):
+    help = "Write a subscriptions, bookings or revenue export as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("resource", choices=sorted(exports.RESOURCES))
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write; defaults to stdout.")
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="FIELD=VALUE",
+            help="Same filters as the API, e.g. --filter payment_status=completed.",
+        )
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for item in options["filter"]:
+            field, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"Filters look like FIELD=VALUE, got {item!r}.")
+            params[field] = value
+        try:
+            _, chunks = exports.stream(options["resource"], options["format"], params)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        output = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options["output"]:
+                output.close()
+        if options["output"]:
+            self.stderr.write(f"Wrote {written:,} bytes to {options['output']}.")
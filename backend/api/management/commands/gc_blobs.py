@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api import images
+
+
+class Command(BaseCommand):
+    help = "Delete blobs that no image row references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help="Leave blobs younger than this many seconds alone.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count unreferenced blobs without deleting them."
+        )
+
+    def handle(self, *args, **options):
+        scanned, unused = images.collect_garbage(options["min_age"], options["dry_run"])
+        verb = "would delete" if options["dry_run"] else "deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"Scanned {scanned} blobs, {verb} {unused} unreferenced.")
+        )
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import catalogue
+
+
+class Command(BaseCommand):
+    help = "Load writers, courses, lessons and mentorship packages from JSON or CSV files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files",
+            nargs="+",
+            help="JSON bundles or lists, or CSV files named after their kind (e.g. lessons.csv).",
+        )
+        parser.add_argument(
+            "--kind",
+            choices=sorted(catalogue.KINDS),
+            help="Kind of rows in CSV files and JSON lists whose name does not say it.",
+        )
+        parser.add_argument("--batch-size", type=int, default=catalogue.BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Validate every row without writing."
+        )
+
+    def _bundle(self, files, kind):
+        bundle = {}
+        handles = []
+        for name in files:
+            path = Path(name)
+            fmt = path.suffix.lower().lstrip(".")
+            handle = open(path, encoding="utf-8-sig", newline="")
+            handles.append(handle)
+            try:
+                parsed = catalogue.read(handle, fmt, kind or catalogue.kind_for_path(path))
+            except ValueError as exc:
+                raise CommandError(f"{name}: {exc}") from exc
+            for key, rows in parsed.items():
+                if key in bundle:
+                    raise CommandError(f"{key} appear in more than one file.")
+                bundle[key] = rows
+        return bundle, handles
+
+    def handle(self, *args, **options):
+        bundle, handles = self._bundle(options["files"], options["kind"])
+        importer = catalogue.Importer(options["batch_size"], dry_run=options["dry_run"])
+        try:
+            report = importer.run(bundle)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        finally:
+            for handle in handles:
+                handle.close()
+
+        verb = "validated" if options["dry_run"] else "imported"
+        for kind, result in report.items():
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{kind}: {verb} {result['imported']} of {result['rows']} rows in "
+                    f"{result['seconds']:.2f}s ({result['rows_per_second']:,} rows/s)."
+                )
+            )
+            for error in result["errors"]:
+                self.stderr.write(f"  row {error['row']}: {error['errors']}")
+            hidden = result["error_count"] - len(result["errors"])
+            if hidden:
+                self.stderr.write(f"  ... and {hidden} more invalid rows.")
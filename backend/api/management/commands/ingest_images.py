@@ -0,0 +1,39 @@
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from api import images, response_cache
+from api.blobstore import get_blob_store
+from api.models import Course, Writer
+
+
+class Command(BaseCommand):
+    help = "Convert legacy single-image uploads into sized image variants."
+
+    def handle(self, *args, **options):
+        store = get_blob_store()
+        for model in (Course, Writer):
+            converted = 0
+            pending = model.objects.exclude(image_blob__isnull=True, image_storage_key="")
+            for pk in pending.values_list("pk", flat=True).iterator():
+                instance = model.objects.get(pk=pk)
+                data = instance.image_blob or store.read(instance.image_storage_key)
+                upload = BytesIO(data)
+                upload.size = len(data)
+                try:
+                    variants = images.ingest(upload)
+                except ValidationError:
+                    self.stderr.write(f"Skipping {model.__name__} {pk}: not a valid image.")
+                    continue
+                with transaction.atomic():
+                    images.replace_variants(instance, variants)
+                    model.objects.filter(pk=pk).update(
+                        image_blob=None, image_mime="", image_storage_key=""
+                    )
+                converted += 1
+            response_cache.bump(model)
+            self.stdout.write(
+                self.style.SUCCESS(f"Converted {converted} {model._meta.verbose_name_plural}.")
+            )
@@ -0,0 +1,65 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Fire concurrent requests at a running server and report status codes and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("url")
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--data", help="JSON request body.")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def _send(self, url, method, body, timeout):
+        request = urllib.request.Request(url, data=body, method=method)
+        if body is not None:
+            request.add_header("Content-Type", "application/json")
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                status, retry_after = response.status, response.headers.get("Retry-After")
+        except urllib.error.HTTPError as exc:
+            status, retry_after = exc.code, exc.headers.get("Retry-After")
+        except OSError:
+            status, retry_after = "error", None
+        return status, time.perf_counter() - started, retry_after
+
+    def handle(self, *args, **options):
+        body = json.dumps(json.loads(options["data"])).encode() if options["data"] else None
+        method = options["method"].upper()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(
+                pool.map(
+                    lambda _: self._send(options["url"], method, body, options["timeout"]),
+                    range(options["requests"]),
+                )
+            )
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(status for status, _, _ in results)
+        latencies = sorted(latency for _, latency, _ in results)
+        retry_after = sorted({value for _, _, value in results if value})
+        self.stdout.write(
+            f"{len(results)} requests in {elapsed:.2f}s ({len(results) / elapsed:,.1f} req/s)"
+        )
+        for status, count in sorted(statuses.items(), key=lambda item: str(item[0])):
+            self.stdout.write(f"  {status}: {count}")
+        self.stdout.write(
+            f"latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, "
+            f"max {latencies[-1] * 1000:.1f} ms"
+        )
+        if retry_after:
+            self.stdout.write(f"Retry-After values: {', '.join(retry_after)}")
@@ -0,0 +1,118 @@
+import json
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import profiling
+
+SORTS = {
+    "peak": lambda route: route["peak_bytes"]["p95"],
+    "net": lambda route: route["net_bytes"]["mean"],
+    "samples": lambda route: route["samples"],
+}
+
+
+def _summary(values):
+    values = sorted(values)
+    if not values:
+        return {"mean": 0, "p95": 0, "max": 0}
+    return {
+        "mean": sum(values) // len(values),
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "max": values[-1],
+    }
+
+
+def _sites(records, key, top):
+    totals = {}
+    for record in records:
+        for name, entry in record.get(key, {}).items():
+            total = totals.setdefault(name, {"bytes": 0, "count": 0})
+            total["bytes"] += entry["bytes"]
+            total["count"] += entry["count"]
+    ranked = sorted(totals.items(), key=lambda item: item[1]["bytes"], reverse=True)[:top]
+    # Per request, so routes sampled more often do not look heavier.
+    return {
+        name: {"bytes": total["bytes"] // len(records), "count": total["count"] // len(records)}
+        for name, total in ranked
+    }
+
+
+def aggregate(records, top=10):
+    routes = {}
+    for record in records:
+        routes.setdefault(f"{record['method']} {record['route']}", []).append(record)
+    report = {}
+    for name, samples in routes.items():
+        rendered = [record["render_bytes"] for record in samples if "render_bytes" in record]
+        report[name] = {
+            "samples": len(samples),
+            "peak_bytes": _summary([record["peak_bytes"] for record in samples]),
+            "net_bytes": _summary([record["net_bytes"] for record in samples]),
+            "render_bytes": _summary(rendered),
+            "ms": _summary([record["ms"] for record in samples]),
+            "sites": _sites(samples, "sites", top),
+            "render_sites": _sites(samples, "render_sites", top),
+        }
+    return report
+
+
+def _size(value):
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}GiB"
+
+
+class Command(BaseCommand):
+    help = "Aggregate sampled memory profiles per route, heaviest first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="Profile directory (defaults to MEMORY_PROFILE_DIR).")
+        parser.add_argument("--route", help="Only routes containing this text.")
+        parser.add_argument("--top", type=int, default=5, help="Allocation sites per route.")
+        parser.add_argument("--sort", choices=sorted(SORTS), default="peak")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+        parser.add_argument(
+            "--clear", action="store_true", help="Delete the collected profiles after reporting."
+        )
+
+    def _write_route(self, name, route):
+        peak, net, render = route["peak_bytes"], route["net_bytes"], route["render_bytes"]
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f"{name}  ({route['samples']} samples, {route['ms']['mean']}ms)")
+        )
+        self.stdout.write(
+            f"  peak {_size(peak['mean'])} mean / {_size(peak['p95'])} p95 / {_size(peak['max'])} max"
+            f", net {_size(net['mean'])}, render {_size(render['mean'])}"
+        )
+        for label, key in (("before render", "sites"), ("render", "render_sites")):
+            for site, entry in route[key].items():
+                self.stdout.write(
+                    f"    {label:>13}  {_size(entry['bytes']):>9}  {entry['count']:>7} blocks  {site}"
+                )
+
+    def handle(self, *args, **options):
+        directory = Path(options["dir"] or settings.MEMORY_PROFILE_DIR)
+        records = [
+            record
+            for record in profiling.read(directory)
+            if not options["route"] or options["route"] in record["route"]
+        ]
+        report = aggregate(records, options["top"])
+        ordered = sorted(report.items(), key=lambda item: SORTS[options["sort"]](item[1]), reverse=True)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(dict(ordered), indent=2))
+        elif not records:
+            self.stdout.write(f"No memory profiles in {directory}.")
+        else:
+            for name, route in ordered:
+                self._write_route(name, route)
+
+        if options["clear"] and directory.exists():
+            shutil.rmtree(directory)
+            self.stdout.write(self.style.SUCCESS(f"Cleared {directory}."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import response_cache
+from api.blobstore import get_blob_store
+from api.models import Course, CourseImage, Writer, WriterImage
+
+
+class Command(BaseCommand):
+    help = "Move image bytes stored in database rows into the blob store."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        store = get_blob_store()
+        batch_size = options["batch_size"]
+        targets = (
+            (CourseImage, "blob", "mime", "storage_key"),
+            (WriterImage, "blob", "mime", "storage_key"),
+            (Course, "image_blob", "image_mime", "image_storage_key"),
+            (Writer, "image_blob", "image_mime", "image_storage_key"),
+        )
+        for model, blob_field, mime_field, key_field in targets:
+            moved = 0
+            pending = model.objects.filter(**{f"{blob_field}__isnull": False}).order_by("pk")
+            while True:
+                batch = list(pending.values_list("pk", blob_field, mime_field)[:batch_size])
+                if not batch:
+                    break
+                with transaction.atomic():
+                    for pk, blob, mime in batch:
+                        model.objects.filter(pk=pk).update(
+                            **{key_field: store.put(bytes(blob), mime), blob_field: None}
+                        )
+                moved += len(batch)
+                self.stdout.write(f"{model.__name__}: moved {moved}")
+            self.stdout.write(
+                self.style.SUCCESS(f"{model.__name__}: {moved} blobs in the blob store.")
+            )
+        response_cache.bump(Course)
+        response_cache.bump(Writer)
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily analytics rollups for a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD).")
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Days back from --end to rebuild when --start is omitted.",
+        )
+
+    def handle(self, *args, **options):
+        end = options["end"] or date.today()
+        start = options["start"] or end - timedelta(days=options["days"])
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        course_rows, writer_rows = rollups.rebuild(start, end)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {course_rows} course and {writer_rows} writer rollups "
+                f"from {start} to {end}."
+            )
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for courses and writers."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} entries."))
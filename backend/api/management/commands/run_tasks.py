@@ -0,0 +1,45 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks. Start one process per worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--burst", action="store_true", help="Exit once no task is due instead of polling."
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=1.0, help="Seconds to wait between empty polls."
+        )
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        total = 0
+        pruned_at = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - pruned_at >= settings.TASK_PRUNE_INTERVAL:
+                tasks.prune()
+                pruned_at = time.monotonic()
+            batch = tasks.claim(settings.TASK_BATCH_SIZE)
+            for task in batch:
+                tasks.run(task)
+            total += len(batch)
+            if not batch:
+                if options["burst"]:
+                    break
+                time.sleep(options["sleep"])
+        self.stdout.write(self.style.SUCCESS(f"Ran {total} tasks."))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import sweeper
+
+
+class Command(BaseCommand):
+    help = "Expire lapsed subscriptions and retire past open slots in batched updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only", choices=sorted(sweeper.SWEEPS), action="append", help="Sweep just this set."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause", type=float, default=0.0, help="Seconds to sleep between batches."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count matching rows without updating them."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running and sweep again every this many seconds.",
+        )
+
+    def _progress(self, name, updated, total):
+        self.stdout.write(f"  {name}: {updated} in batch, {total} so far")
+
+    def _sweep_once(self, options):
+        for name in options["only"] or sweeper.SWEEPS:
+            started = time.perf_counter()
+            count = sweeper.sweep(
+                name,
+                batch_size=options["batch_size"],
+                pause=options["pause"],
+                dry_run=options["dry_run"],
+                progress=None if options["dry_run"] else self._progress,
+            )
+            elapsed = time.perf_counter() - started
+            verb = "would update" if options["dry_run"] else "updated"
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: {verb} {count} rows in {elapsed:.2f}s.")
+            )
+
+    def handle(self, *args, **options):
+        while True:
+            self._sweep_once(options)
+            if not options["interval"] or options["dry_run"]:
+                break
+            time.sleep(options["interval"])
+            # A long-lived loop must not keep reusing a connection the
+            # database has since dropped.
+            close_old_connections()
@@ -0,0 +1,24 @@
+from django.core.cache import cache
+
+PREFIX = "metrics:"
+KEYS_KEY = f"{PREFIX}keys"
+
+
+def incr(name, amount=1):
+    key = f"{PREFIX}{name}"
+    if cache.add(key, amount, timeout=None):
+        names = cache.get(KEYS_KEY) or set()
+        if name not in names:
+            cache.set(KEYS_KEY, names | {name}, timeout=None)
+        return amount
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, timeout=None)
+        return amount
+
+
+def snapshot():
+    names = sorted(cache.get(KEYS_KEY) or ())
+    values = cache.get_many([f"{PREFIX}{name}" for name in names])
+    return {name: values.get(f"{PREFIX}{name}", 0) for name in names}
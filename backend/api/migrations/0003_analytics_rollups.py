@@ -0,0 +1,68 @@
+# Generated by Django 6.0 on 2026-10-19 13:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_remove_course_image_file_remove_writer_image_file_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCourseStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('subscriptions', models.PositiveIntegerField(default=0)),
+                ('paid_subscriptions', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyWriterStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('paid_bookings', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['writer', 'session_date'], name='api_booking_writer__6f8160_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['course', 'payment_date'], name='api_subscri_course__c12652_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailycoursestat',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='api.course'),
+        ),
+        migrations.AddField(
+            model_name='dailywriterstat',
+            name='writer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='api.writer'),
+        ),
+        migrations.AddIndex(
+            model_name='dailycoursestat',
+            index=models.Index(fields=['day'], name='api_dailyco_day_4e1e7f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycoursestat',
+            constraint=models.UniqueConstraint(fields=('course', 'day'), name='daily_course_stat_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='dailywriterstat',
+            index=models.Index(fields=['day'], name='api_dailywr_day_add6c9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailywriterstat',
+            constraint=models.UniqueConstraint(fields=('writer', 'day'), name='daily_writer_stat_unique'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_searchentry_fts USING fts5("
+    "title, body, content='api_searchentry', content_rowid='id')",
+    "CREATE TRIGGER api_searchentry_ai AFTER INSERT ON api_searchentry BEGIN "
+    "INSERT INTO api_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER api_searchentry_ad AFTER DELETE ON api_searchentry BEGIN "
+    "INSERT INTO api_searchentry_fts(api_searchentry_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER api_searchentry_au AFTER UPDATE ON api_searchentry BEGIN "
+    "INSERT INTO api_searchentry_fts(api_searchentry_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO api_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_searchentry_au",
+    "DROP TRIGGER IF EXISTS api_searchentry_ad",
+    "DROP TRIGGER IF EXISTS api_searchentry_ai",
+    "DROP TABLE IF EXISTS api_searchentry_fts",
+]
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX api_searchentry_document_idx ON api_searchentry USING GIN ("
+    "(setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', body), 'B')))",
+]
+POSTGRESQL_BACKWARD = ["DROP INDEX IF EXISTS api_searchentry_document_idx"]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRESQL_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('course', 'Course'), ('writer', 'Writer')], max_length=16)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('visible', models.BooleanField(default=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_unique')],
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-19 13:31
+
+import api.models
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def lowercase_emails(apps, schema_editor):
+    apps.get_model("api", "User").objects.update(email=Lower(Trim("email")))
+    for model_name in ("Subscription", "Booking"):
+        apps.get_model("api", model_name).objects.update(user_email=Lower(Trim("user_email")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_search_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', api.models.KitabUserManager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(django.db.models.functions.text.Lower('user_email'), name='booking_user_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(django.db.models.functions.text.Lower('user_email'), name='subscription_user_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='user_email_ci_unique'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_normalized_emails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('card', 'Card'), ('full', 'Full')], max_length=16)),
+                ('blob', models.BinaryField()),
+                ('mime', models.CharField(max_length=100)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='api.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'size'), name='course_image_size_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WriterImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('card', 'Card'), ('full', 'Full')], max_length=16)),
+                ('blob', models.BinaryField()),
+                ('mime', models.CharField(max_length=100)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('writer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='api.writer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('writer', 'size'), name='writer_image_size_unique')],
+            },
+        ),
+    ]
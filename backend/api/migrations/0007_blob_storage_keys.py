@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='image_storage_key',
+            field=models.CharField(blank=True, max_length=80),
+        ),
+        migrations.AddField(
+            model_name='courseimage',
+            name='storage_key',
+            field=models.CharField(blank=True, max_length=80),
+        ),
+        migrations.AddField(
+            model_name='writer',
+            name='image_storage_key',
+            field=models.CharField(blank=True, max_length=80),
+        ),
+        migrations.AddField(
+            model_name='writerimage',
+            name='storage_key',
+            field=models.CharField(blank=True, max_length=80),
+        ),
+        migrations.AlterField(
+            model_name='courseimage',
+            name='blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='writerimage',
+            name='blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
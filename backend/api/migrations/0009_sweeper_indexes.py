@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-19 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_task_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='expired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='availableslot',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['date'], name='slot_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(condition=models.Q(('expired', False)), fields=['expiry_date'], name='subscription_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 13:46
+
+from django.db import migrations, models
+
+GAP = 1024
+
+
+def space_lesson_keys(apps, schema_editor):
+    Lesson = apps.get_model("api", "Lesson")
+    changed = []
+    course_id, position = None, 0
+    for lesson in Lesson.objects.order_by("course_id", "order", "id").only("id", "course_id", "order"):
+        if lesson.course_id != course_id:
+            course_id, position = lesson.course_id, 0
+        position += 1
+        if lesson.order != position * GAP:
+            lesson.order = position * GAP
+            changed.append(lesson)
+    Lesson.objects.bulk_update(changed, ["order"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_sweeper_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'order'], name='lesson_course_order_idx'),
+        ),
+        migrations.RunPython(space_lesson_keys, migrations.RunPython.noop),
+    ]
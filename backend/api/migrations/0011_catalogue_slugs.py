@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_lesson_order_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='mentorshippackage',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='writer',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, max_length=255, null=True, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'slug'), name='lesson_course_slug_unique'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0 on 2026-10-19 14:01
+
+import django.db.models.functions.text
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_catalogue_slugs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_email', models.EmailField(max_length=254)),
+                ('user_name', models.CharField(blank=True, max_length=255)),
+                ('writer_id', models.BigIntegerField()),
+                ('writer_name', models.CharField(blank=True, max_length=255)),
+                ('writer_email', models.EmailField(blank=True, max_length=254)),
+                ('package_id', models.BigIntegerField()),
+                ('sessions_count', models.PositiveIntegerField(default=0)),
+                ('session_date', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(max_length=16)),
+                ('payment_status', models.CharField(max_length=16)),
+                ('notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['writer_id'], name='archived_booking_writer_idx'), models.Index(django.db.models.functions.text.Lower('user_email'), name='archived_booking_email_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSlot',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('writer_id', models.BigIntegerField()),
+                ('package_id', models.BigIntegerField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('time', models.CharField(max_length=50)),
+                ('is_available', models.BooleanField(default=False)),
+                ('booking_id', models.BigIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['writer_id', 'date'], name='archived_slot_writer_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSubscription',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_email', models.EmailField(max_length=254)),
+                ('course_id', models.BigIntegerField()),
+                ('course_title', models.CharField(blank=True, max_length=255)),
+                ('payment_status', models.CharField(max_length=16)),
+                ('payment_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('payment_date', models.DateField(blank=True, null=True)),
+                ('expiry_date', models.DateField(blank=True, null=True)),
+                ('expired', models.BooleanField(default=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course_id'], name='archived_sub_course_idx'), models.Index(django.db.models.functions.text.Lower('user_email'), name='archived_sub_email_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations, models, transaction
+
+import api.fields
+
+BATCH_SIZE = 500
+
+FIELDS = [
+    ("course", "description", True),
+    ("course", "requirements", True),
+    ("lesson", "content", True),
+    ("writer", "bio", False),
+]
+
+
+def _copy(apps, model_name, source, target):
+    model = apps.get_model("api", model_name)
+    last = 0
+    while True:
+        rows = list(
+            model.objects.filter(pk__gt=last).order_by("pk").values_list("pk", source)[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            model.objects.bulk_update(
+                [model(pk=pk, **{target: text or ""}) for pk, text in rows], [target]
+            )
+        last = rows[-1][0]
+
+
+def pack_text(apps, schema_editor):
+    for model_name, name, _ in FIELDS:
+        _copy(apps, model_name, name, f"{name}_packed")
+
+
+def unpack_text(apps, schema_editor):
+    for model_name, name, _ in FIELDS:
+        _copy(apps, model_name, f"{name}_packed", name)
+
+
+def _add(model_name, name, blank):
+    return migrations.AddField(
+        model_name=model_name,
+        name=f"{name}_packed",
+        field=api.fields.CompressedTextField(blank=blank, default=""),
+        preserve_default=False,
+    )
+
+
+class Migration(migrations.Migration):
+    # Rows are copied in committed batches so large tables are not rewritten
+    # in one transaction.
+    atomic = False
+
+    dependencies = [
+        ("api", "0012_archive_tables"),
+    ]
+
+    operations = [
+        *[_add(model_name, name, blank) for model_name, name, blank in FIELDS],
+        migrations.RunPython(pack_text, unpack_text),
+        # Gives the old column a default in state only, so unapplying can
+        # re-add it to a populated table before the rows are copied back.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="writer", name="bio", field=models.TextField(default="")
+                ),
+            ],
+        ),
+        *[
+            migrations.RemoveField(model_name=model_name, name=name)
+            for model_name, name, _ in FIELDS
+        ],
+        *[
+            migrations.RenameField(model_name=model_name, old_name=f"{name}_packed", new_name=name)
+            for model_name, name, _ in FIELDS
+        ],
+    ]
@@ -0,0 +1,39 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.core.cache import caches
+from django.db import migrations
+from django.utils import timezone
+
+OLD_BACKEND = "django.contrib.auth.backends.ModelBackend"
+NEW_BACKEND = "api.auth.CachedModelBackend"
+
+
+def remap_sessions(apps, schema_editor):
+    # Sessions created before CachedModelBackend name the stock backend. It is
+    # no longer listed (listing it made failed logins hash twice), so point
+    # those sessions at the backend that now resolves them.
+    Session = apps.get_model("sessions", "Session")
+    engine = import_module(settings.SESSION_ENGINE)
+    cache = caches[settings.SESSION_CACHE_ALIAS]
+    live = Session.objects.filter(expire_date__gt=timezone.now())
+    for session in live.iterator(chunk_size=500):
+        store = engine.SessionStore(session.session_key)
+        data = store.decode(session.session_data)
+        if data.get(BACKEND_SESSION_KEY) != OLD_BACKEND:
+            continue
+        data[BACKEND_SESSION_KEY] = NEW_BACKEND
+        session.session_data = store.encode(data)
+        session.save(update_fields=["session_data"])
+        if hasattr(store, "cache_key"):
+            cache.delete(store.cache_key)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0013_compressed_text"),
+        ("sessions", "0001_initial"),
+    ]
+
+    operations = [migrations.RunPython(remap_sessions, migrations.RunPython.noop)]
@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_amounts(apps, schema_editor):
+    # The price paid was never stored, so existing bookings take their
+    # package's price as of this migration. Archived bookings whose package
+    # is gone were already counted as zero revenue.
+    MentorshipPackage = apps.get_model("api", "MentorshipPackage")
+    price = Subquery(
+        MentorshipPackage.objects.filter(pk=OuterRef("package_id")).values("price")[:1]
+    )
+    amount = Coalesce(price, Value(Decimal("0.00")), output_field=models.DecimalField())
+    for model_name in ("Booking", "ArchivedBooking"):
+        model = apps.get_model("api", model_name)
+        model.objects.filter(payment_amount__isnull=True).update(payment_amount=amount)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0014_remap_session_backend"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="payment_amount",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="archivedbooking",
+            name="payment_amount",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_amounts, migrations.RunPython.noop),
+    ]
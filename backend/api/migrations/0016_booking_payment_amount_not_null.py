@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+# Kept apart from the backfill in 0015 so the rows are updated before the
+# tables are altered, not in the same transaction.
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0015_booking_payment_amount"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="booking",
+            name="payment_amount",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name="archivedbooking",
+            name="payment_amount",
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
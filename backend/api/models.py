@@ -1,6 +1,84 @@
+import copy
+
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .fields import CompressedTextField
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+class EmailQuerySet(models.QuerySet):
+    email_field = "email"
+
+    def with_email(self, email):
+        return self.alias(_email_lower=Lower(self.email_field)).filter(
+            _email_lower=normalize_email(email)
+        )
+
+
+class UserEmailQuerySet(EmailQuerySet):
+    email_field = "user_email"
+
+
+def _snapshot(value):
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+class TrackedModel(models.Model):
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded()
+        return instance
+
+    def _remember_loaded(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: _snapshot(getattr(self, field.attname))
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def dirty_fields(self):
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return None
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in loaded
+            and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and not self._state.adding
+        ):
+            kwargs["update_fields"] = self.dirty_fields()
+        super().save(*args, **kwargs)
+        self._remember_loaded()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_loaded()
+
+
+class KitabUserManager(UserManager.from_queryset(EmailQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -13,11 +91,25 @@ class User(AbstractUser):
 
     role = models.CharField(max_length=16, choices=ROLE_CHOICES, default="student")
 
+    objects = KitabUserManager()
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                Lower("email"), name="user_email_ci_unique", condition=~Q(email="")
+            ),
+        ]
+        indexes = [models.Index(Lower("email"), name="user_email_lower_idx")]
+
+    def save(self, *args, **kwargs):
+        self.email = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.username
 
 
-class Course(models.Model):
+class Course(TrackedModel):
     TYPE_CHOICES = [
         ("free", "Free"),
         ("paid", "Paid"),
@@ -29,15 +121,17 @@ class Course(models.Model):
         ("advanced", "Advanced"),
     ]
 
+    slug = models.SlugField(max_length=255, unique=True, null=True, blank=True, allow_unicode=True)
     title = models.CharField(max_length=255)
-    description = models.TextField(blank=True)
+    description = CompressedTextField(blank=True)
     image_url = models.URLField(blank=True)
     image_blob = models.BinaryField(null=True, blank=True)
     image_mime = models.CharField(max_length=100, blank=True)
+    image_storage_key = models.CharField(max_length=80, blank=True)
     instructor = models.CharField(max_length=255)
     type = models.CharField(max_length=16, choices=TYPE_CHOICES)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    requirements = models.TextField(blank=True)
+    requirements = CompressedTextField(blank=True)
     category = models.CharField(max_length=100, blank=True)
     duration = models.CharField(max_length=100, blank=True)
     level = models.CharField(max_length=16, choices=LEVEL_CHOICES, blank=True)
@@ -47,7 +141,37 @@ class Course(models.Model):
         return self.title
 
 
-class Lesson(models.Model):
+class ImageVariant(models.Model):
+    SIZE_CHOICES = [
+        ("thumbnail", "Thumbnail"),
+        ("card", "Card"),
+        ("full", "Full"),
+    ]
+
+    size = models.CharField(max_length=16, choices=SIZE_CHOICES)
+    blob = models.BinaryField(null=True, blank=True)
+    storage_key = models.CharField(max_length=80, blank=True)
+    mime = models.CharField(max_length=100)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        abstract = True
+
+
+class CourseImage(ImageVariant):
+    course = models.ForeignKey(Course, related_name="image_variants", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["course", "size"], name="course_image_size_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} - {self.size}"
+
+
+class Lesson(TrackedModel):
     TYPE_CHOICES = [
         ("video", "Video"),
         ("exercise", "Exercise"),
@@ -55,23 +179,28 @@ class Lesson(models.Model):
     ]
 
     course = models.ForeignKey(Course, related_name="lessons", on_delete=models.CASCADE)
+    slug = models.SlugField(max_length=255, null=True, blank=True, allow_unicode=True)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     type = models.CharField(max_length=16, choices=TYPE_CHOICES)
     video_url = models.URLField(blank=True)
-    content = models.TextField(blank=True)
+    content = CompressedTextField(blank=True)
     is_free = models.BooleanField(default=False)
     order = models.PositiveIntegerField()
     duration = models.CharField(max_length=100, blank=True)
 
     class Meta:
         ordering = ["order"]
+        constraints = [
+            models.UniqueConstraint(fields=["course", "slug"], name="lesson_course_slug_unique"),
+        ]
+        indexes = [models.Index(fields=["course", "order"], name="lesson_course_order_idx")]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
 
-class Subscription(models.Model):
+class Subscription(TrackedModel):
     PAYMENT_STATUS_CHOICES = [
         ("pending", "Pending"),
         ("completed", "Completed"),
@@ -87,12 +216,28 @@ class Subscription(models.Model):
     payment_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     payment_date = models.DateField(null=True, blank=True)
     expiry_date = models.DateField(null=True, blank=True)
+    expired = models.BooleanField(default=False)
+
+    objects = UserEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["course", "payment_date"]),
+            models.Index(Lower("user_email"), name="subscription_user_email_idx"),
+            models.Index(
+                fields=["expiry_date"], condition=Q(expired=False), name="subscription_expiry_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.user_email = normalize_email(self.user_email)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user_email} - {self.course.title}"
 
 
-class Writer(models.Model):
+class Writer(TrackedModel):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         related_name="writer_profile",
@@ -100,11 +245,13 @@ class Writer(models.Model):
         null=True,
         blank=True,
     )
+    slug = models.SlugField(max_length=255, unique=True, null=True, blank=True, allow_unicode=True)
     name = models.CharField(max_length=255)
-    bio = models.TextField()
+    bio = CompressedTextField()
     image_url = models.URLField(blank=True)
     image_blob = models.BinaryField(null=True, blank=True)
     image_mime = models.CharField(max_length=100, blank=True)
+    image_storage_key = models.CharField(max_length=80, blank=True)
     specialty = models.CharField(max_length=255)
     email = models.EmailField(blank=True)
     experience = models.CharField(max_length=255, blank=True)
@@ -115,7 +262,20 @@ class Writer(models.Model):
         return self.name
 
 
-class MentorshipPackage(models.Model):
+class WriterImage(ImageVariant):
+    writer = models.ForeignKey(Writer, related_name="image_variants", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["writer", "size"], name="writer_image_size_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.writer_id} - {self.size}"
+
+
+class MentorshipPackage(TrackedModel):
+    slug = models.SlugField(max_length=255, unique=True, null=True, blank=True, allow_unicode=True)
     writer = models.ForeignKey(Writer, related_name="packages", on_delete=models.CASCADE)
     writer_name = models.CharField(max_length=255, blank=True)
     name = models.CharField(max_length=255, blank=True)
@@ -129,7 +289,7 @@ class MentorshipPackage(models.Model):
         return f"{self.writer.name} - {self.name or 'Package'}"
 
 
-class Booking(models.Model):
+class Booking(TrackedModel):
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("confirmed", "Confirmed"),
@@ -156,13 +316,30 @@ class Booking(models.Model):
     payment_status = models.CharField(
         max_length=16, choices=PAYMENT_STATUS_CHOICES, default="pending"
     )
+    # The package price when the booking was made; repricing the package
+    # later must not change what was charged.
+    payment_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True)
     notes = models.TextField(blank=True)
 
+    objects = UserEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["writer", "session_date"]),
+            models.Index(Lower("user_email"), name="booking_user_email_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.user_email = normalize_email(self.user_email)
+        if self.payment_amount is None:
+            self.payment_amount = self.package.price
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.user_email} - {self.writer.name}"
 
 
-class AvailableSlot(models.Model):
+class AvailableSlot(TrackedModel):
     writer = models.ForeignKey(Writer, related_name="available_slots", on_delete=models.CASCADE)
     package = models.ForeignKey(
         MentorshipPackage,
@@ -178,5 +355,166 @@ class AvailableSlot(models.Model):
         Booking, related_name="slots", on_delete=models.SET_NULL, null=True, blank=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date"], condition=Q(is_available=True), name="slot_open_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.writer.name} - {self.date} {self.time}"
+
+
+class DailyCourseStat(models.Model):
+    day = models.DateField()
+    course = models.ForeignKey(Course, related_name="daily_stats", on_delete=models.CASCADE)
+    subscriptions = models.PositiveIntegerField(default=0)
+    paid_subscriptions = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["course", "day"], name="daily_course_stat_unique"),
+        ]
+        indexes = [models.Index(fields=["day"])]
+
+    def __str__(self):
+        return f"{self.day} - {self.course_id}"
+
+
+class DailyWriterStat(models.Model):
+    day = models.DateField()
+    writer = models.ForeignKey(Writer, related_name="daily_stats", on_delete=models.CASCADE)
+    bookings = models.PositiveIntegerField(default=0)
+    paid_bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["writer", "day"], name="daily_writer_stat_unique"),
+        ]
+        indexes = [models.Index(fields=["day"])]
+
+    def __str__(self):
+        return f"{self.day} - {self.writer_id}"
+
+
+class SearchEntry(models.Model):
+    KIND_CHOICES = [
+        ("course", "Course"),
+        ("writer", "Writer"),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    visible = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="search_entry_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
+
+
+class Task(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"], condition=~Q(key=""), name="task_key_unique"
+            ),
+        ]
+        indexes = [models.Index(fields=["status", "run_after"], name="task_due_idx")]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class ArchivedSubscription(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user_email = models.EmailField()
+    course_id = models.BigIntegerField()
+    course_title = models.CharField(max_length=255, blank=True)
+    payment_status = models.CharField(max_length=16)
+    payment_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    payment_date = models.DateField(null=True, blank=True)
+    expiry_date = models.DateField(null=True, blank=True)
+    expired = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["course_id"], name="archived_sub_course_idx"),
+            models.Index(Lower("user_email"), name="archived_sub_email_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_email} - {self.course_title}"
+
+
+class ArchivedBooking(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user_email = models.EmailField()
+    user_name = models.CharField(max_length=255, blank=True)
+    writer_id = models.BigIntegerField()
+    writer_name = models.CharField(max_length=255, blank=True)
+    writer_email = models.EmailField(blank=True)
+    package_id = models.BigIntegerField()
+    sessions_count = models.PositiveIntegerField(default=0)
+    session_date = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=16)
+    payment_status = models.CharField(max_length=16)
+    payment_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    notes = models.TextField(blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["writer_id"], name="archived_booking_writer_idx"),
+            models.Index(Lower("user_email"), name="archived_booking_email_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_email} - {self.writer_name}"
+
+
+class ArchivedSlot(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    writer_id = models.BigIntegerField()
+    package_id = models.BigIntegerField(null=True, blank=True)
+    date = models.DateField()
+    time = models.CharField(max_length=50)
+    is_available = models.BooleanField(default=False)
+    booking_id = models.BigIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["writer_id", "date"], name="archived_slot_writer_idx")]
+
+    def __str__(self):
+        return f"{self.writer_id} - {self.date} {self.time}"
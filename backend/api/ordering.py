@@ -0,0 +1,77 @@
+from bisect import bisect_left
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Lesson
+
+GAP = 1024
+
+
+def next_key(course):
+    last = Lesson.objects.filter(course=course).aggregate(last=Max("order"))["last"]
+    return (last or 0) + GAP
+
+
+def spaced_keys(count):
+    return [GAP * (position + 1) for position in range(count)]
+
+
+def _kept_positions(keys):
+    tails, tail_positions, previous = [], [], [-1] * len(keys)
+    for position, key in enumerate(keys):
+        slot = bisect_left(tails, key)
+        if slot == len(tails):
+            tails.append(key)
+            tail_positions.append(position)
+        else:
+            tails[slot] = key
+            tail_positions[slot] = position
+        previous[position] = tail_positions[slot - 1] if slot else -1
+    kept = set()
+    position = tail_positions[-1] if tail_positions else -1
+    while position != -1:
+        kept.add(position)
+        position = previous[position]
+    return kept
+
+
+def plan(keys):
+    kept = _kept_positions(keys)
+    result = list(keys)
+    start = 0
+    while start < len(keys):
+        if start in kept:
+            start += 1
+            continue
+        end = start
+        while end < len(keys) and end not in kept:
+            end += 1
+        low = result[start - 1] if start else 0
+        high = keys[end] if end < len(keys) else low + GAP * (end - start + 1)
+        step = (high - low) // (end - start + 1)
+        if step < 1:
+            return None
+        for offset, position in enumerate(range(start, end), 1):
+            result[position] = low + step * offset
+        start = end
+    return result
+
+
+def reorder(course, lesson_ids):
+    with transaction.atomic():
+        lessons = {
+            lesson.pk: lesson
+            for lesson in Lesson.objects.select_for_update().filter(course=course).only("id", "order")
+        }
+        if len(lesson_ids) != len(lessons) or set(lesson_ids) != set(lessons):
+            raise ValueError("The sequence must list every lesson of the course exactly once.")
+        sequence = [lessons[pk] for pk in lesson_ids]
+        keys = plan([lesson.order for lesson in sequence]) or spaced_keys(len(sequence))
+        changed = []
+        for lesson, key in zip(sequence, keys):
+            if lesson.order != key:
+                lesson.order = key
+                changed.append(lesson)
+        Lesson.objects.bulk_update(changed, ["order"])
+    return changed
@@ -0,0 +1,23 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsManager(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and getattr(user, "role", None) == "manager")
+
+
+class IsCourseInstructorOrManager(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user
+            and user.is_authenticated
+            and getattr(user, "role", None) in ("instructor", "manager")
+        )
+
+    def has_object_permission(self, request, view, obj):
+        user = request.user
+        if user.role == "manager":
+            return True
+        return obj.instructor == (user.get_full_name() or user.username)
@@ -0,0 +1,162 @@
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from . import metrics
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+# Allocations are charged to the innermost frame in one of these files, so a
+# base64 image string lands on get_image_data and a row dict on its serializer.
+ATTRIBUTED_FILES = tuple(
+    os.path.join(API_DIR, name) for name in ("serializers.py", "views.py", "renderers.py")
+)
+IGNORED = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    # Modules imported lazily by the first request are not the request's cost.
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>", all_frames=True),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _package(filename):
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1].split(os.sep, 1)[0]
+    if filename.startswith(API_DIR):
+        return "api"
+    return "python"
+
+
+def site(traceback):
+    # The allocating package tells ORM rows (django) from serializer output
+    # (rest_framework) under the same line of ours, e.g. a super().list().
+    allocator = _package(traceback[-1].filename)
+    for frame in reversed(traceback):
+        if frame.filename in ATTRIBUTED_FILES:
+            name = f"api/{os.path.basename(frame.filename)}:{frame.lineno}"
+            return name if allocator == "api" else f"{name} <{allocator}>"
+    return f"<{allocator}>"
+
+
+def attribute(before, after, top):
+    sites = {}
+    for diff in after.compare_to(before, "traceback"):
+        if diff.size_diff <= 0:
+            continue
+        entry = sites.setdefault(site(diff.traceback), {"bytes": 0, "count": 0})
+        entry["bytes"] += diff.size_diff
+        entry["count"] += max(diff.count_diff, 0)
+    ranked = sorted(sites.items(), key=lambda item: item[1]["bytes"], reverse=True)
+    return dict(ranked[:top])
+
+
+def route_of(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    if not match.route:
+        return match.view_name
+    return "/" + match.route.replace("^", "").replace("$", "").replace("\\", "")
+
+
+def write(record, directory=None):
+    directory = Path(directory or settings.MEMORY_PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f"{os.getpid()}.jsonl", "a", encoding="utf-8") as handle:
+        handle.write(json.dumps(record) + "\n")
+
+
+def read(directory=None):
+    directory = Path(directory or settings.MEMORY_PROFILE_DIR)
+    for path in sorted(directory.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+class MemoryProfileMiddleware:
+    def __init__(self, get_response):
+        self.sample_rate = settings.MEMORY_PROFILE_SAMPLE_RATE
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.frames = settings.MEMORY_PROFILE_FRAMES
+        self.top = settings.MEMORY_PROFILE_TOP_SITES
+        # tracemalloc is process-wide, so only one request is traced at a time;
+        # threads serving other requests would otherwise show up in its numbers.
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate or not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self._profile(request)
+        finally:
+            self.lock.release()
+
+    def process_template_response(self, request, response):
+        # DRF responses arrive here before rendering, while the page of model
+        # instances and the serialized dicts are still alive; snapshotting now
+        # separates them from what the JSON render adds afterwards.
+        state = getattr(request, "_memory_profile", None)
+        if state is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            state["rendered_from"] = current
+            state["peak"] = peak
+            state["mid"] = tracemalloc.take_snapshot().filter_traces(IGNORED)
+            state["overhead"] = tracemalloc.get_traced_memory()[0] - current
+            tracemalloc.reset_peak()
+        return response
+
+    def _profile(self, request):
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(self.frames)
+        state = request._memory_profile = {"mid": None, "peak": 0, "overhead": 0}
+        try:
+            before = tracemalloc.take_snapshot().filter_traces(IGNORED)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            response = self.get_response(request)
+            elapsed = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(IGNORED)
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        if response.streaming:
+            # The body is rendered after this returns, as the server drains
+            # it, so a record would leave out the very cost streaming moves.
+            metrics.incr("profiling.streaming_skipped")
+            return response
+
+        mid, overhead = state["mid"], state["overhead"]
+        record = {
+            "route": route_of(request),
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "peak_bytes": max(state["peak"], peak - overhead) - baseline,
+            "net_bytes": current - overhead - baseline,
+            "ms": round(elapsed * 1000, 2),
+            "at": timezone.now().isoformat(),
+            "sites": attribute(before, after if mid is None else mid, self.top),
+        }
+        if mid is not None:
+            record["render_bytes"] = current - state["rendered_from"] - overhead
+            record["render_sites"] = attribute(mid, after, self.top)
+        write(record)
+        metrics.incr("profiling.memory_samples")
+        return response
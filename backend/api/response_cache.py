@@ -0,0 +1,59 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _version_key(model):
+    return f"respver:{model._meta.label_lower}"
+
+
+def version(model):
+    return cache.get_or_set(_version_key(model), 1, timeout=None)
+
+
+def bump(model):
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), 2, timeout=None)
+
+
+def key_for(request, model):
+    path = hashlib.sha256(request.get_full_path().encode()).hexdigest()
+    return f"resp:{model._meta.label_lower}:{version(model)}:{path}"
+
+
+class CacheEntry:
+    def __init__(self, key, body, content_type, encodings=None):
+        self.key = key
+        self.body = body
+        self.content_type = content_type
+        self.encodings = encodings or {}
+
+    def encoded(self, codec):
+        return self.encodings.get(codec)
+
+    def store_encoded(self, codec, data):
+        self.encodings[codec] = data
+        self.save()
+
+    def save(self):
+        cache.set(
+            self.key,
+            {"body": self.body, "content_type": self.content_type, "encodings": self.encodings},
+            settings.RESPONSE_CACHE_TIMEOUT,
+        )
+
+
+def lookup(key):
+    data = cache.get(key)
+    if data is None:
+        return None
+    return CacheEntry(key, data["body"], data["content_type"], data["encodings"])
+
+
+def store(key, response):
+    entry = CacheEntry(key, response.content, response["Content-Type"])
+    entry.save()
+    return entry
@@ -0,0 +1,221 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedBooking,
+    ArchivedSubscription,
+    Booking,
+    Course,
+    DailyCourseStat,
+    DailyWriterStat,
+    Lesson,
+    MentorshipPackage,
+    Subscription,
+    Writer,
+)
+
+ZERO = Decimal("0.00")
+COURSE_METRICS = ("subscriptions", "paid_subscriptions", "revenue")
+WRITER_METRICS = ("bookings", "paid_bookings", "revenue")
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def session_day(session_date):
+    if not session_date:
+        return None
+    if timezone.is_naive(session_date):
+        return session_date.date()
+    return timezone.localdate(session_date)
+
+
+# Archiving moves old subscriptions and bookings out of the hot tables, so
+# every recompute counts the archive too; otherwise rebuilding an old range
+# would silently drop the history. Archived rows of deleted courses or
+# writers are left out, as their hot rows went with them.
+def _subscription_totals():
+    return {
+        "subscriptions": Count("id"),
+        "paid_subscriptions": Count("id", filter=Q(payment_status="completed")),
+        "revenue": Sum("payment_amount", filter=Q(payment_status="completed")),
+    }
+
+
+# Revenue is what each booking was charged, not its package's current
+# price, so repricing a package leaves past days alone.
+def _booking_totals():
+    return {
+        "bookings": Count("id"),
+        "paid_bookings": Count("id", filter=Q(payment_status="completed")),
+        "revenue": Sum("payment_amount", filter=Q(payment_status="completed")),
+    }
+
+
+def _archived_subscriptions():
+    return ArchivedSubscription.objects.filter(course_id__in=Course.objects.values("pk"))
+
+
+def _archived_bookings():
+    return ArchivedBooking.objects.filter(writer_id__in=Writer.objects.values("pk"))
+
+
+def _add(totals, key, row, metrics):
+    current = totals.setdefault(key, dict.fromkeys(metrics, 0))
+    for name in metrics:
+        current[name] += row[name] or 0
+
+
+def refresh_course_day(course_id, day):
+    if course_id is None or day is None:
+        return
+    totals = {}
+    for queryset in (Subscription.objects.all(), _archived_subscriptions()):
+        row = queryset.filter(course_id=course_id, payment_date=day).aggregate(
+            **_subscription_totals()
+        )
+        _add(totals, (), row, COURSE_METRICS)
+    totals = totals[()]
+    if not totals["subscriptions"]:
+        DailyCourseStat.objects.filter(course_id=course_id, day=day).delete()
+        return
+    DailyCourseStat.objects.update_or_create(
+        course_id=course_id,
+        day=day,
+        defaults={
+            "subscriptions": totals["subscriptions"],
+            "paid_subscriptions": totals["paid_subscriptions"],
+            "revenue": totals["revenue"] or ZERO,
+        },
+    )
+
+
+def refresh_writer_day(writer_id, day):
+    if writer_id is None or day is None:
+        return
+    start, end = _day_bounds(day)
+    in_day = {"writer_id": writer_id, "session_date__gte": start, "session_date__lt": end}
+    totals = {}
+    for queryset in (Booking.objects.all(), _archived_bookings()):
+        row = queryset.filter(**in_day).aggregate(**_booking_totals())
+        _add(totals, (), row, WRITER_METRICS)
+    totals = totals[()]
+    if not totals["bookings"]:
+        DailyWriterStat.objects.filter(writer_id=writer_id, day=day).delete()
+        return
+    DailyWriterStat.objects.update_or_create(
+        writer_id=writer_id,
+        day=day,
+        defaults={
+            "bookings": totals["bookings"],
+            "paid_bookings": totals["paid_bookings"],
+            "revenue": totals["revenue"] or ZERO,
+        },
+    )
+
+
+@transaction.atomic
+def rebuild(start, end):
+    DailyCourseStat.objects.filter(day__gte=start, day__lte=end).delete()
+    DailyWriterStat.objects.filter(day__gte=start, day__lte=end).delete()
+
+    course_totals = {}
+    for queryset in (Subscription.objects.all(), _archived_subscriptions()):
+        rows = (
+            queryset.filter(payment_date__gte=start, payment_date__lte=end)
+            .values("course_id", "payment_date")
+            .annotate(**_subscription_totals())
+            .order_by()
+        )
+        for row in rows.iterator():
+            _add(course_totals, (row["course_id"], row["payment_date"]), row, COURSE_METRICS)
+    course_stats = DailyCourseStat.objects.bulk_create(
+        [
+            DailyCourseStat(
+                course_id=course_id,
+                day=day,
+                subscriptions=totals["subscriptions"],
+                paid_subscriptions=totals["paid_subscriptions"],
+                revenue=totals["revenue"] or ZERO,
+            )
+            for (course_id, day), totals in course_totals.items()
+        ],
+        batch_size=500,
+    )
+
+    range_start, _ = _day_bounds(start)
+    _, range_end = _day_bounds(end)
+    in_range = {"session_date__gte": range_start, "session_date__lt": range_end}
+    writer_totals = {}
+    for queryset in (Booking.objects.all(), _archived_bookings()):
+        rows = (
+            queryset.filter(**in_range)
+            .annotate(day=TruncDate("session_date"))
+            .values("writer_id", "day")
+            .annotate(**_booking_totals())
+            .order_by()
+        )
+        for row in rows.iterator():
+            _add(writer_totals, (row["writer_id"], row["day"]), row, WRITER_METRICS)
+    writer_stats = DailyWriterStat.objects.bulk_create(
+        [
+            DailyWriterStat(
+                writer_id=writer_id,
+                day=day,
+                bookings=totals["bookings"],
+                paid_bookings=totals["paid_bookings"],
+                revenue=totals["revenue"] or ZERO,
+            )
+            for (writer_id, day), totals in writer_totals.items()
+        ],
+        batch_size=500,
+    )
+    return len(course_stats), len(writer_stats)
+
+
+def series(source, group_by, start=None, end=None, ids=None):
+    if source == "courses":
+        qs, key, metrics = DailyCourseStat.objects.all(), "course_id", COURSE_METRICS
+    else:
+        qs, key, metrics = DailyWriterStat.objects.all(), "writer_id", WRITER_METRICS
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    if ids:
+        qs = qs.filter(**{f"{key}__in": ids})
+
+    group_fields = {"day": ["day"], "entity": [key], "entity_day": [key, "day"]}[group_by]
+    aggregates = {f"total_{name}": Sum(name) for name in metrics}
+    rows = qs.values(*group_fields).annotate(**aggregates).order_by(*group_fields)
+    return [
+        {
+            **{field: row[field] for field in group_fields},
+            **{name: row[f"total_{name}"] for name in metrics},
+        }
+        for row in rows
+    ]
+
+
+def totals():
+    course = DailyCourseStat.objects.aggregate(**{name: Sum(name) for name in COURSE_METRICS})
+    writer = DailyWriterStat.objects.aggregate(**{name: Sum(name) for name in WRITER_METRICS})
+    return {
+        "writers": Writer.objects.count(),
+        "courses": Course.objects.count(),
+        "lessons": Lesson.objects.count(),
+        "packages": MentorshipPackage.objects.count(),
+        "subscriptions": course["subscriptions"] or 0,
+        "paid_subscriptions": course["paid_subscriptions"] or 0,
+        "subscription_revenue": course["revenue"] or ZERO,
+        "bookings": writer["bookings"] or 0,
+        "paid_bookings": writer["paid_bookings"] or 0,
+        "booking_revenue": writer["revenue"] or ZERO,
+    }
@@ -0,0 +1,161 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Course, SearchEntry, Writer
+
+DIACRITICS = re.compile("[\u0610-\u061a\u0640\u064b-\u065f\u0670\u06d6-\u06ed]")
+FOLDS = str.maketrans(
+    {
+        "\u0623": "\u0627",  # alef with hamza above
+        "\u0625": "\u0627",  # alef with hamza below
+        "\u0622": "\u0627",  # alef with madda
+        "\u0671": "\u0627",  # alef wasla
+        "\u0649": "\u064a",  # alef maksura
+        "\u0626": "\u064a",  # ya with hamza
+        "\u0624": "\u0648",  # waw with hamza
+        "\u0629": "\u0647",  # ta marbuta
+    }
+)
+TOKEN = re.compile(r"\w+")
+ARTICLES = ("وال", "بال", "كال", "فال", "ال", "لل")
+
+PG_DOCUMENT = (
+    "(setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', body), 'B'))"
+)
+
+INDEXED_FIELDS = {
+    "course": (Course, ("title",), ("description", "category")),
+    "writer": (Writer, ("name",), ("specialty", "bio")),
+}
+
+
+def _strip_article(token):
+    for article in ARTICLES:
+        if token.startswith(article) and len(token) - len(article) >= 2:
+            return token[len(article):]
+    return token
+
+
+def tokenize(text):
+    text = DIACRITICS.sub("", (text or "").lower()).translate(FOLDS)
+    return [_strip_article(token) for token in TOKEN.findall(text)]
+
+
+def normalize(text):
+    return " ".join(tokenize(text))
+
+
+def _kind_for(instance):
+    for kind, (model, _, _) in INDEXED_FIELDS.items():
+        if isinstance(instance, model):
+            return kind
+    return None
+
+
+def _entry_values(kind, instance):
+    _, title_fields, body_fields = INDEXED_FIELDS[kind]
+    return {
+        "title": normalize(" ".join(getattr(instance, f) or "" for f in title_fields)),
+        "body": normalize(" ".join(getattr(instance, f) or "" for f in body_fields)),
+        "visible": instance.published if kind == "course" else instance.active,
+    }
+
+
+def index_object(instance):
+    kind = _kind_for(instance)
+    if kind is None:
+        return
+    SearchEntry.objects.update_or_create(
+        kind=kind, object_id=instance.pk, defaults=_entry_values(kind, instance)
+    )
+
+
+def index_objects(instances):
+    entries = []
+    for instance in instances:
+        kind = _kind_for(instance)
+        if kind is not None:
+            entries.append(
+                SearchEntry(kind=kind, object_id=instance.pk, **_entry_values(kind, instance))
+            )
+    SearchEntry.objects.bulk_create(
+        entries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["kind", "object_id"],
+        update_fields=["title", "body", "visible"],
+    )
+    return len(entries)
+
+
+def remove_object(instance):
+    kind = _kind_for(instance)
+    if kind is None:
+        return
+    SearchEntry.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def rebuild():
+    SearchEntry.objects.all().delete()
+    total = 0
+    for kind, (model, _, _) in INDEXED_FIELDS.items():
+        entries = [
+            SearchEntry(kind=kind, object_id=instance.pk, **_entry_values(kind, instance))
+            for instance in model.objects.iterator(chunk_size=500)
+        ]
+        SearchEntry.objects.bulk_create(entries, batch_size=500)
+        total += len(entries)
+    return total
+
+
+def _sqlite_search(tokens, kinds, limit):
+    match = " ".join(f'"{token}"*' for token in tokens)
+    placeholders = ", ".join(["%s"] * len(kinds))
+    sql = (
+        "SELECT e.kind, e.object_id, bm25(api_searchentry_fts, 10.0, 1.0) AS rank "
+        "FROM api_searchentry_fts JOIN api_searchentry e ON e.id = api_searchentry_fts.rowid "
+        f"WHERE api_searchentry_fts MATCH %s AND e.visible AND e.kind IN ({placeholders}) "
+        "ORDER BY rank LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *kinds, limit])
+        return [(kind, object_id, -rank) for kind, object_id, rank in cursor.fetchall()]
+
+
+def _postgresql_search(tokens, kinds, limit):
+    query = " & ".join(f"{token}:*" for token in tokens)
+    sql = (
+        f"SELECT kind, object_id, ts_rank({PG_DOCUMENT}, query) AS rank "
+        "FROM api_searchentry, to_tsquery('simple', %s) query "
+        f"WHERE {PG_DOCUMENT} @@ query AND visible AND kind = ANY(%s) "
+        "ORDER BY rank DESC LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, list(kinds), limit])
+        return cursor.fetchall()
+
+
+def _fallback_search(tokens, kinds, limit):
+    qs = SearchEntry.objects.filter(kind__in=kinds, visible=True)
+    for token in tokens:
+        qs = qs.filter(Q(title__contains=token) | Q(body__contains=token))
+    results = []
+    for entry in qs[:limit]:
+        score = sum(2 if token in entry.title else 1 for token in tokens)
+        results.append((entry.kind, entry.object_id, float(score)))
+    return sorted(results, key=lambda row: row[2], reverse=True)
+
+
+def search(text, kinds=None, limit=20):
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    kinds = list(kinds or INDEXED_FIELDS)
+    if connection.vendor == "sqlite":
+        return _sqlite_search(tokens, kinds, limit)
+    if connection.vendor == "postgresql":
+        return _postgresql_search(tokens, kinds, limit)
+    return _fallback_search(tokens, kinds, limit)
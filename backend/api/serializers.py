@@ -1,8 +1,14 @@
 import base64
 
+from django.db import transaction
 from rest_framework import serializers
 
+from . import images, ordering
+from .blobstore import blob_url
 from .models import (
+    ArchivedBooking,
+    ArchivedSlot,
+    ArchivedSubscription,
     AvailableSlot,
     Booking,
     Course,
@@ -13,36 +19,91 @@ from .models import (
 )
 
 
-class BinaryImageMixin:
+def image_data(key, blob, mime):
+    if key:
+        return blob_url(key)
+    if not blob:
+        return ""
+    mime = mime or "application/octet-stream"
+    encoded = base64.b64encode(blob).decode("ascii")
+    return f"data:{mime};base64,{encoded}"
+
+
+class ImageDataResolver:
+    """Fills image_data for a batch of compiled rows in at most two queries."""
+
+    columns = ("id", "image_storage_key", "image_mime")
+
+    def __init__(self, model):
+        self.model = model
+        self.variants = model.image_variants.rel.related_model
+        self.owner_field = model.image_variants.field.name
+
+    def resolve(self, rows, context):
+        size = context.get("image_size", "full")
+        variants = {
+            owner: (key, blob, mime)
+            for owner, key, blob, mime in self.variants.objects.filter(
+                **{f"{self.owner_field}__in": [pk for pk, _, _ in rows]}, size=size
+            ).values_list(self.owner_field, "storage_key", "blob", "mime")
+        }
+        # Only rows predating the blob store still carry their bytes inline.
+        legacy_ids = [pk for pk, key, _ in rows if not key and pk not in variants]
+        legacy = (
+            dict(
+                self.model.objects.filter(pk__in=legacy_ids, image_blob__isnull=False).values_list(
+                    "pk", "image_blob"
+                )
+            )
+            if legacy_ids
+            else {}
+        )
+        return [
+            image_data(*variants[pk]) if pk in variants else image_data(key, legacy.get(pk), mime)
+            for pk, key, mime in rows
+        ]
+
+
+class BinaryImageMixin(serializers.Serializer):
     image_data = serializers.SerializerMethodField(read_only=True)
-    image_file = serializers.ImageField(write_only=True, required=False)
+    image_file = serializers.FileField(write_only=True, required=False)
+
+    @classmethod
+    def compile_image_data(cls, model):
+        return ImageDataResolver(model)
+
+    def _image_variant(self, obj):
+        size = self.context.get("image_size", "full")
+        for variant in obj.image_variants.all():
+            if variant.size == size:
+                return variant
+        return None
 
     def get_image_data(self, obj):
-        if not obj.image_blob:
-            return ""
-        mime = obj.image_mime or "application/octet-stream"
-        encoded = base64.b64encode(obj.image_blob).decode("ascii")
-        return f"data:{mime};base64,{encoded}"
-
-    def _apply_image(self, instance, image_file):
-        if not image_file:
-            return False
-        instance.image_blob = image_file.read()
-        instance.image_mime = getattr(image_file, "content_type", "") or "application/octet-stream"
-        return True
+        variant = self._image_variant(obj)
+        if variant is not None:
+            return image_data(variant.storage_key, variant.blob, variant.mime)
+        return image_data(obj.image_storage_key, obj.image_blob, obj.image_mime)
+
+    def validate_image_file(self, value):
+        if value:
+            return images.ingest(value)
+        return value
 
     def create(self, validated_data):
-        image_file = validated_data.pop("image_file", None)
+        variants = validated_data.pop("image_file", None)
         instance = super().create(validated_data)
-        if self._apply_image(instance, image_file):
-            instance.save(update_fields=["image_blob", "image_mime"])
+        if variants:
+            images.replace_variants(instance, variants)
         return instance
 
     def update(self, instance, validated_data):
-        image_file = validated_data.pop("image_file", None)
+        variants = validated_data.pop("image_file", None)
+        if variants:
+            validated_data.update(image_blob=None, image_mime="", image_storage_key="")
         instance = super().update(instance, validated_data)
-        if self._apply_image(instance, image_file):
-            instance.save(update_fields=["image_blob", "image_mime"])
+        if variants:
+            images.replace_variants(instance, variants)
         return instance
 
 
@@ -85,6 +146,12 @@ class LessonSerializer(serializers.ModelSerializer):
             "order",
             "duration",
         ]
+        extra_kwargs = {"order": {"required": False}}
+
+    def create(self, validated_data):
+        if validated_data.get("order") is None:
+            validated_data["order"] = ordering.next_key(validated_data["course"])
+        return super().create(validated_data)
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -101,11 +168,13 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             "payment_amount",
             "payment_date",
             "expiry_date",
+            "expired",
         ]
 
 
 class WriterSerializer(BinaryImageMixin, serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(source="user", read_only=True)
+
     class Meta:
         model = Writer
         fields = [
@@ -147,6 +216,10 @@ class BookingSerializer(serializers.ModelSerializer):
     package_id = serializers.PrimaryKeyRelatedField(
         source="package", queryset=MentorshipPackage.objects.all()
     )
+    slot_id = serializers.PrimaryKeyRelatedField(
+        source="slot", queryset=AvailableSlot.objects.all(), write_only=True, required=False
+    )
+    payment_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = Booking
@@ -162,9 +235,36 @@ class BookingSerializer(serializers.ModelSerializer):
             "session_date",
             "status",
             "payment_status",
+            "payment_amount",
             "notes",
+            "slot_id",
         ]
 
+    def create(self, validated_data):
+        slot = validated_data.pop("slot", None)
+        with transaction.atomic():
+            booking = super().create(validated_data)
+            if slot is not None:
+                slot = (
+                    AvailableSlot.objects.select_for_update()
+                    .filter(pk=slot.pk, writer=booking.writer, is_available=True)
+                    .first()
+                )
+                if slot is None:
+                    raise serializers.ValidationError(
+                        {"slot_id": "This slot is no longer available."}
+                    )
+                # A real save, not a queryset update, so the slot signals
+                # publish the TAKEN event like any other transition.
+                slot.is_available = False
+                slot.booking = booking
+                slot.save()
+        return booking
+
+    def update(self, instance, validated_data):
+        validated_data.pop("slot", None)
+        return super().update(instance, validated_data)
+
 
 class AvailableSlotSerializer(serializers.ModelSerializer):
     writer_id = serializers.PrimaryKeyRelatedField(source="writer", queryset=Writer.objects.all())
@@ -186,3 +286,56 @@ class AvailableSlotSerializer(serializers.ModelSerializer):
             "is_available",
             "booking_id",
         ]
+
+
+class ArchivedSubscriptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedSubscription
+        fields = [
+            "id",
+            "user_email",
+            "course_id",
+            "course_title",
+            "payment_status",
+            "payment_amount",
+            "payment_date",
+            "expiry_date",
+            "expired",
+            "archived_at",
+        ]
+
+
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedBooking
+        fields = [
+            "id",
+            "user_email",
+            "user_name",
+            "writer_id",
+            "writer_name",
+            "writer_email",
+            "package_id",
+            "sessions_count",
+            "session_date",
+            "status",
+            "payment_status",
+            "payment_amount",
+            "notes",
+            "archived_at",
+        ]
+
+
+class ArchivedSlotSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedSlot
+        fields = [
+            "id",
+            "writer_id",
+            "package_id",
+            "date",
+            "time",
+            "is_available",
+            "booking_id",
+            "archived_at",
+        ]
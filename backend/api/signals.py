@@ -0,0 +1,252 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import entitlements, response_cache, rollups, search, slot_events, tasks
+from .auth import invalidate_user
+from .models import (
+    AvailableSlot,
+    Booking,
+    Course,
+    CourseImage,
+    MentorshipPackage,
+    Subscription,
+    User,
+    Writer,
+    WriterImage,
+)
+from .serializers import AvailableSlotSerializer
+
+
+def _previous(sender, instance, fields):
+    if instance.pk is None:
+        return None
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is not None and all(field in loaded for field in fields):
+        return {field: loaded[field] for field in fields}
+    return sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _refresh_course_rollup(course_id, day):
+    if course_id is not None and day is not None:
+        tasks.enqueue(
+            "refresh_course_rollup",
+            key=f"rollup:course:{course_id}:{day}",
+            course_id=course_id,
+            day=str(day),
+        )
+
+
+def _refresh_writer_rollup(writer_id, day):
+    if writer_id is not None and day is not None:
+        tasks.enqueue(
+            "refresh_writer_rollup",
+            key=f"rollup:writer:{writer_id}:{day}",
+            writer_id=writer_id,
+            day=str(day),
+        )
+
+
+@receiver(pre_save, sender=Subscription)
+def remember_subscription_bucket(sender, instance, **kwargs):
+    previous = _previous(sender, instance, ["course_id", "payment_date", "user_email"])
+    instance._rollup_bucket = (
+        (previous["course_id"], previous["payment_date"]) if previous else None
+    )
+    instance._previous_email = previous["user_email"] if previous else None
+
+
+@receiver(post_save, sender=Subscription)
+def refresh_subscription_rollup(sender, instance, **kwargs):
+    bucket = (instance.course_id, instance.payment_date)
+    _refresh_course_rollup(*bucket)
+    previous = getattr(instance, "_rollup_bucket", None)
+    if previous and previous != bucket:
+        _refresh_course_rollup(*previous)
+
+
+@receiver(post_delete, sender=Subscription)
+def drop_subscription_rollup(sender, instance, **kwargs):
+    _refresh_course_rollup(instance.course_id, instance.payment_date)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def drop_cached_entitlements(sender, instance, **kwargs):
+    entitlements.invalidate(instance.user_email)
+    previous = getattr(instance, "_previous_email", None)
+    if previous and previous != instance.user_email:
+        entitlements.invalidate(previous)
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_bucket(sender, instance, **kwargs):
+    previous = _previous(sender, instance, ["writer_id", "session_date"])
+    instance._rollup_bucket = (
+        (previous["writer_id"], rollups.session_day(previous["session_date"])) if previous else None
+    )
+
+
+@receiver(post_save, sender=Booking)
+def refresh_booking_rollup(sender, instance, **kwargs):
+    bucket = (instance.writer_id, rollups.session_day(instance.session_date))
+    _refresh_writer_rollup(*bucket)
+    previous = getattr(instance, "_rollup_bucket", None)
+    if previous and previous != bucket:
+        _refresh_writer_rollup(*previous)
+
+
+@receiver(post_delete, sender=Booking)
+def drop_booking_rollup(sender, instance, **kwargs):
+    _refresh_writer_rollup(instance.writer_id, rollups.session_day(instance.session_date))
+
+
+@receiver(post_save, sender=Booking)
+def send_booking_emails(sender, instance, created, **kwargs):
+    if not created:
+        return
+    for recipient in ("writer", "student"):
+        tasks.enqueue(
+            "send_booking_email",
+            key=f"booking-email:{instance.pk}:{recipient}",
+            booking_id=instance.pk,
+            recipient=recipient,
+        )
+
+
+@receiver(pre_save, sender=AvailableSlot)
+def remember_slot_state(sender, instance, **kwargs):
+    instance._previous_state = _previous(sender, instance, ["writer_id", "is_available"])
+
+
+@receiver(post_save, sender=AvailableSlot)
+def publish_slot_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_state", None)
+    if previous and previous["is_available"] and previous["writer_id"] != instance.writer_id:
+        slot_events.publish_on_commit(
+            previous["writer_id"],
+            slot_events.REMOVED,
+            {"id": instance.pk, "writer_id": previous["writer_id"]},
+        )
+        previous = None
+    was_available = bool(previous and previous["is_available"])
+    if instance.is_available:
+        if created or previous is None:
+            event = slot_events.ADDED
+        elif was_available:
+            event = slot_events.UPDATED
+        else:
+            event = slot_events.RELEASED
+        row = AvailableSlotSerializer(instance).data
+    elif was_available:
+        event = slot_events.TAKEN
+        row = {"id": instance.pk, "writer_id": instance.writer_id}
+    else:
+        return
+    slot_events.publish_on_commit(instance.writer_id, event, row)
+
+
+@receiver(post_delete, sender=AvailableSlot)
+def publish_slot_removal(sender, instance, **kwargs):
+    if instance.is_available:
+        slot_events.publish_on_commit(
+            instance.writer_id,
+            slot_events.REMOVED,
+            {"id": instance.pk, "writer_id": instance.writer_id},
+        )
+
+
+@receiver(pre_save, sender=Writer)
+def remember_writer_contact(sender, instance, **kwargs):
+    instance._previous_contact = _previous(sender, instance, ["name", "email"])
+
+
+@receiver(post_save, sender=Writer)
+def propagate_writer_contact(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_contact", None)
+    if previous and (previous["name"], previous["email"]) != (instance.name, instance.email):
+        tasks.enqueue("propagate_writer", writer_id=instance.pk)
+
+
+@receiver(pre_save, sender=Course)
+def remember_course_title(sender, instance, **kwargs):
+    instance._previous_title = _previous(sender, instance, ["title"])
+
+
+@receiver(post_save, sender=Course)
+def propagate_course_title(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_title", None)
+    if previous and previous["title"] != instance.title:
+        tasks.enqueue("propagate_course", course_id=instance.pk)
+
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Writer)
+def remember_image_key(sender, instance, **kwargs):
+    instance._previous_image_key = _previous(sender, instance, ["image_storage_key"])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Writer)
+def release_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_image_key", None)
+    key = previous["image_storage_key"] if previous else ""
+    if key and key != instance.image_storage_key:
+        tasks.enqueue("release_blobs", keys=[key])
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Writer)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image_storage_key:
+        tasks.enqueue("release_blobs", keys=[instance.image_storage_key])
+
+
+@receiver(post_delete, sender=CourseImage)
+@receiver(post_delete, sender=WriterImage)
+def release_deleted_variant(sender, instance, **kwargs):
+    if instance.storage_key:
+        tasks.enqueue("release_blobs", keys=[instance.storage_key])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Writer)
+def refresh_search_entry(sender, instance, **kwargs):
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Writer)
+def drop_search_entry(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Writer)
+@receiver(post_delete, sender=Writer)
+def drop_cached_writer_user(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Writer)
+@receiver(post_save, sender=MentorshipPackage)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Writer)
+@receiver(post_delete, sender=MentorshipPackage)
+def expire_cached_responses(sender, **kwargs):
+    response_cache.bump(sender)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Writer)
+@receiver(post_save, sender=MentorshipPackage)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Writer)
+@receiver(post_delete, sender=MentorshipPackage)
+def schedule_snapshot_rebuild(sender, **kwargs):
+    tasks.schedule_snapshots()
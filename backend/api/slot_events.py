@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import metrics
+from .renderers import dumps
+
+ADDED = "added"
+TAKEN = "taken"
+RELEASED = "released"
+UPDATED = "updated"
+REMOVED = "removed"
+RESET = "reset"
+
+_subscribers = defaultdict(set)
+_lock = threading.Lock()
+
+
+class Subscriber:
+    def __init__(self, writer_id):
+        self.writer_id = writer_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.SLOT_STREAM_QUEUE_SIZE)
+
+    def deliver(self, message):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = (RESET, {"writer_id": self.writer_id})
+            metrics.incr("slot_stream.overflows")
+        self.queue.put_nowait(message)
+
+
+def subscriber_count():
+    with _lock:
+        return sum(len(subscribers) for subscribers in _subscribers.values())
+
+
+def subscribe(writer_id):
+    subscriber = Subscriber(writer_id)
+    with _lock:
+        _subscribers[writer_id].add(subscriber)
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    with _lock:
+        subscribers = _subscribers.get(subscriber.writer_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del _subscribers[subscriber.writer_id]
+
+
+def publish(writer_id, event, row):
+    with _lock:
+        subscribers = list(_subscribers.get(writer_id, ()))
+    for subscriber in subscribers:
+        try:
+            subscriber.loop.call_soon_threadsafe(subscriber.deliver, (event, row))
+        except RuntimeError:
+            unsubscribe(subscriber)
+    metrics.incr("slot_stream.published")
+    metrics.incr("slot_stream.delivered", len(subscribers))
+
+
+def publish_on_commit(writer_id, event, row):
+    transaction.on_commit(lambda: publish(writer_id, event, row))
+
+
+def _frame(event, row):
+    return b"event: " + event.encode() + b"\ndata: " + dumps(row) + b"\n\n"
+
+
+async def stream(writer_id):
+    subscriber = subscribe(writer_id)
+    try:
+        yield b"retry: %d\n\n" % settings.SLOT_STREAM_RETRY_MS
+        while True:
+            try:
+                event, row = await asyncio.wait_for(
+                    subscriber.queue.get(), settings.SLOT_STREAM_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield _frame(event, row)
+    finally:
+        unsubscribe(subscriber)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import metrics
+from .compression import CODECS
+from .models import (
+    Course,
+    CourseImage,
+    MentorshipPackage,
+    Subscription,
+    Writer,
+    WriterImage,
+)
+from .renderers import dumps
+from .serializers import CourseSerializer, MentorshipPackageSerializer, WriterSerializer
+
+EXTENSIONS = {"gzip": ".gz", "br": ".br", "zstd": ".zst"}
+MANIFEST = "manifest.json"
+KEEP_VERSIONS = 2
+
+
+def _serialize(serializer_class, queryset):
+    return serializer_class(queryset.order_by("id"), many=True, context={"image_size": "card"}).data
+
+
+def published_courses():
+    return _serialize(
+        CourseSerializer,
+        Course.objects.filter(published=True).prefetch_related(
+            Prefetch("image_variants", queryset=CourseImage.objects.filter(size="card"))
+        ),
+    )
+
+
+def active_writers():
+    return _serialize(
+        WriterSerializer,
+        Writer.objects.filter(active=True).prefetch_related(
+            Prefetch("image_variants", queryset=WriterImage.objects.filter(size="card"))
+        ),
+    )
+
+
+def active_packages():
+    return _serialize(
+        MentorshipPackageSerializer, MentorshipPackage.objects.filter(writer__active=True)
+    )
+
+
+def catalogue_stats():
+    return {
+        "courses": Course.objects.filter(published=True).count(),
+        "writers": Writer.objects.filter(active=True).count(),
+        "students": Subscription.objects.values(email=Lower("user_email")).distinct().count(),
+    }
+
+
+SNAPSHOTS = {
+    "courses": published_courses,
+    "writers": active_writers,
+    "packages": active_packages,
+    "stats": catalogue_stats,
+}
+
+
+def _write(path, data):
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+def _prune(directory, name, current):
+    versions = sorted(
+        (path for path in directory.glob(f"{name}.*.json") if path.name != current),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in versions[KEEP_VERSIONS - 1 :]:
+        for suffix in ("", *EXTENSIONS.values()):
+            Path(f"{stale}{suffix}").unlink(missing_ok=True)
+
+
+def build(name, directory):
+    rows = SNAPSHOTS[name]()
+    body = dumps(rows)
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    filename = f"{name}.{digest}.json"
+    path = directory / filename
+    if not path.exists():
+        _write(path, body)
+        for codec, extension in EXTENSIONS.items():
+            if codec in CODECS:
+                _write(Path(f"{path}{extension}"), CODECS[codec](body))
+        metrics.incr("snapshots.written")
+    _prune(directory, name, filename)
+    return {
+        "url": filename,
+        "count": len(rows) if isinstance(rows, list) else None,
+        "bytes": len(body),
+        "generated_at": timezone.now().isoformat(),
+    }
+
+
+def build_all(names=None, directory=None):
+    directory = Path(directory or settings.CATALOGUE_SNAPSHOT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / MANIFEST
+    manifest = {}
+    if names and manifest_path.exists():
+        manifest = json.loads(manifest_path.read_bytes())
+    for name in names or SNAPSHOTS:
+        manifest[name] = build(name, directory)
+    _write(manifest_path, dumps(manifest))
+    return manifest
@@ -0,0 +1,65 @@
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import entitlements, metrics, slot_events
+from .models import AvailableSlot, Subscription
+
+
+def expired_subscriptions(today):
+    return Subscription.objects.filter(expired=False, expiry_date__lt=today)
+
+
+def past_slots(today):
+    return AvailableSlot.objects.filter(is_available=True, date__lt=today)
+
+
+# Bulk updates skip the model signals, so each sweep replays the parts of
+# them that matter for the rows it touched.
+def _expired(rows):
+    for email in {email for _, email in rows}:
+        entitlements.invalidate(email)
+
+
+def _retired(rows):
+    for pk, writer_id in rows:
+        slot_events.publish_on_commit(
+            writer_id, slot_events.REMOVED, {"id": pk, "writer_id": writer_id}
+        )
+
+
+# name: (rows to sweep, batch order, new values, column passed on, follow-up)
+SWEEPS = {
+    "subscriptions": (
+        expired_subscriptions,
+        "expiry_date",
+        {"expired": True},
+        "user_email",
+        _expired,
+    ),
+    "slots": (past_slots, "date", {"is_available": False}, "writer_id", _retired),
+}
+
+
+def sweep(name, today=None, batch_size=1000, pause=0.0, dry_run=False, progress=None):
+    select, order, values, column, after = SWEEPS[name]
+    queryset = select(today or timezone.localdate())
+    if dry_run:
+        return queryset.count()
+
+    total = 0
+    while True:
+        rows = list(queryset.order_by(order, "pk").values_list("pk", column)[:batch_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            updated = queryset.filter(pk__in=[pk for pk, _ in rows]).update(**values)
+            after(rows)
+        total += updated
+        metrics.incr(f"sweeper.{name}", updated)
+        if progress:
+            progress(name, updated, total)
+        if pause:
+            time.sleep(pause)
+    return total
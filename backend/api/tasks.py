@@ -0,0 +1,222 @@
+import logging
+import random
+import traceback
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from . import images, metrics, response_cache, rollups, snapshots
+from .models import Booking, Course, MentorshipPackage, Subscription, Task, Writer
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+# Tasks whose key only dedupes while they wait: claiming one frees its key,
+# so a change made while it runs queues a fresh task instead of being lost.
+COALESCED = set()
+
+
+def task(func=None, *, coalesce=False):
+    if func is None:
+        return lambda func: task(func, coalesce=coalesce)
+    HANDLERS[func.__name__] = func
+    if coalesce:
+        COALESCED.add(func.__name__)
+    return func
+
+
+def enqueue(name, key="", delay=0, **payload):
+    if name not in HANDLERS:
+        raise LookupError(f"No task handler registered for {name!r}.")
+    Task.objects.bulk_create(
+        [
+            Task(
+                name=name,
+                payload=payload,
+                key=key,
+                max_attempts=settings.TASK_MAX_ATTEMPTS,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+        ],
+        ignore_conflicts=True,
+    )
+    if settings.TASK_QUEUE_EAGER:
+        transaction.on_commit(run_pending)
+
+
+def backoff(attempts):
+    delay = min(settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1), settings.TASK_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim(limit):
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.TASK_LEASE_SECONDS)
+    due = Q(status="pending", run_after__lte=now) | Q(status="running", locked_at__lt=lease_expired)
+    claimed = []
+    for pk in Task.objects.filter(due).order_by("run_after").values_list("pk", flat=True)[:limit]:
+        if Task.objects.filter(due, pk=pk).update(
+            status="running",
+            locked_at=now,
+            attempts=F("attempts") + 1,
+            key=Case(When(name__in=COALESCED, then=Value("")), default=F("key")),
+        ):
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed).order_by("run_after"))
+
+
+def run(task):
+    handler = HANDLERS.get(task.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No task handler registered for {task.name!r}.")
+        with transaction.atomic():
+            handler(**task.payload)
+    except Exception:
+        logger.exception("Task %s (%s) failed on attempt %s", task.pk, task.name, task.attempts)
+        now = timezone.now()
+        gave_up = task.attempts >= task.max_attempts
+        Task.objects.filter(pk=task.pk).update(
+            status="failed" if gave_up else "pending",
+            run_after=now + backoff(task.attempts),
+            locked_at=None,
+            last_error=traceback.format_exc()[-4000:],
+            finished_at=now if gave_up else None,
+        )
+        metrics.incr("tasks.failed" if gave_up else "tasks.retried")
+        return False
+    Task.objects.filter(pk=task.pk).update(
+        status="done", locked_at=None, last_error="", finished_at=timezone.now()
+    )
+    metrics.incr("tasks.done")
+    return True
+
+
+def run_pending(limit=100):
+    processed = 0
+    while processed < limit:
+        batch = claim(min(settings.TASK_BATCH_SIZE, limit - processed))
+        if not batch:
+            break
+        for task in batch:
+            run(task)
+        processed += len(batch)
+    return processed
+
+
+def prune(batch_size=1000):
+    cutoff = timezone.now() - timedelta(days=settings.TASK_RETENTION_DAYS)
+    finished = Task.objects.filter(status="done", finished_at__lt=cutoff)
+    total = 0
+    while ids := list(finished.values_list("pk", flat=True)[:batch_size]):
+        total += Task.objects.filter(pk__in=ids).delete()[0]
+    metrics.incr("tasks.pruned", total)
+    return total
+
+
+def _booking_email(booking, recipient):
+    package = booking.package
+    package_name = package.name or f"{booking.sessions_count} جلسات"
+    when = timezone.localtime(booking.session_date) if booking.session_date else None
+    day = when.date().isoformat() if when else ""
+    hour = when.strftime("%H:%M") if when else ""
+    if recipient == "writer":
+        subject = f"حجز جديد من {booking.user_name}"
+        lines = [
+            f"مرحباً {booking.writer_name}،",
+            "",
+            "لديك حجز جديد:",
+            "",
+            f"- الطالب: {booking.user_name}",
+            f"- البريد: {booking.user_email}",
+            f"- التاريخ: {day}",
+            f"- الوقت: {hour}",
+            f"- الباقة: {package_name}",
+            f"- ملاحظات: {booking.notes or 'لا توجد'}",
+            "",
+            "يرجى التواصل مع الطالب لتأكيد الموعد.",
+        ]
+        to = booking.writer_email or booking.writer.email
+    else:
+        subject = f"تأكيد حجز جلسة إرشاد مع {booking.writer_name}"
+        lines = [
+            f"مرحباً {booking.user_name}،",
+            "",
+            "تم حجز جلستك بنجاح!",
+            "",
+            f"- الكاتب: {booking.writer_name}",
+            f"- التاريخ: {day}",
+            f"- الوقت: {hour}",
+            f"- الباقة: {package_name}",
+            f"- السعر: {booking.payment_amount} ر.س",
+            "",
+            "سيتواصل معك الكاتب قريباً لتأكيد الموعد.",
+        ]
+        to = booking.user_email
+    lines += ["", "مع تحيات منصة كتاب"]
+    return to, subject, "\n".join(lines)
+
+
+@task
+def send_booking_email(booking_id, recipient):
+    booking = Booking.objects.select_related("package", "writer").filter(pk=booking_id).first()
+    if booking is None:
+        return
+    to, subject, body = _booking_email(booking, recipient)
+    if to:
+        send_mail(subject, body, None, [to])
+
+
+@task(coalesce=True)
+def refresh_course_rollup(course_id, day):
+    rollups.refresh_course_day(course_id, date.fromisoformat(day))
+
+
+@task(coalesce=True)
+def refresh_writer_rollup(writer_id, day):
+    rollups.refresh_writer_day(writer_id, date.fromisoformat(day))
+
+
+@task
+def propagate_writer(writer_id):
+    writer = Writer.objects.filter(pk=writer_id).values("name", "email").first()
+    if writer is None:
+        return
+    Booking.objects.filter(writer_id=writer_id).exclude(
+        writer_name=writer["name"], writer_email=writer["email"]
+    ).update(writer_name=writer["name"], writer_email=writer["email"])
+    if MentorshipPackage.objects.filter(writer_id=writer_id).exclude(
+        writer_name=writer["name"]
+    ).update(writer_name=writer["name"]):
+        response_cache.bump(MentorshipPackage)
+
+
+@task
+def propagate_course(course_id):
+    title = Course.objects.filter(pk=course_id).values_list("title", flat=True).first()
+    if title is None:
+        return
+    Subscription.objects.filter(course_id=course_id).exclude(course_title=title).update(
+        course_title=title
+    )
+
+
+@task
+def release_blobs(keys):
+    images.release_blobs(keys)
+
+
+@task
+def build_snapshots():
+    snapshots.build_all()
+
+
+def schedule_snapshots():
+    if not settings.CATALOGUE_SNAPSHOT_ON_CHANGE:
+        return
+    if not Task.objects.filter(name="build_snapshots", status="pending").exists():
+        enqueue("build_snapshots", delay=settings.CATALOGUE_SNAPSHOT_DELAY)
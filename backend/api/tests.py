@@ -1,3 +1,1696 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY,
+    base_user,
+    get_user_model,
+)
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.signals import post_save
+from django.forms import modelform_factory
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+try:
+    from moto import mock_aws
+except ImportError:  # pragma: no cover - optional test dependency
+    mock_aws = None
+
+from . import (
+    archive,
+    blobstore,
+    compression,
+    entitlements,
+    exports,
+    fields,
+    images,
+    metrics,
+    profiling,
+    rollups,
+    search,
+    serializers,
+    slot_events,
+    snapshots,
+    sweeper,
+    tasks,
+    throttling,
+)
+from .admission import ConcurrencyLimitMiddleware
+from .fastpath import compile_serializer
+from .models import (
+    ArchivedBooking,
+    AvailableSlot,
+    Booking,
+    Course,
+    CourseImage,
+    DailyCourseStat,
+    DailyWriterStat,
+    Lesson,
+    MentorshipPackage,
+    Subscription,
+    Task,
+    Writer,
+)
+from .renderers import dumps
+
+
+UNTHROTTLED = override_settings(
+    REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+)
+
+
+class KitabTestCase(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        # Throttle buckets, cached sessions and entitlement sets live in the
+        # local-memory cache, which outlives each test's transaction.
+        cache.clear()
+
+    def make_user(self, username, role="student", **extra):
+        return get_user_model().objects.create_user(
+            username=username,
+            email=extra.pop("email", f"{username}@example.com"),
+            password="secret-pass",
+            role=role,
+            **extra,
+        )
+
+    def make_course(self, **fields):
+        fields = {"title": "Course", "instructor": "Instructor", "type": "paid", **fields}
+        return Course.objects.create(**fields)
+
+
+class AnalyticsTotalsTests(KitabTestCase):
+    def test_totals_come_from_rollups(self):
+        course = self.make_course()
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(
+                user_email="a@example.com",
+                course=course,
+                payment_status="completed",
+                payment_amount=Decimal("40.00"),
+                payment_date=date(2024, 5, 1),
+            )
+        self.client.force_authenticate(self.make_user("boss", role="manager"))
+
+        response = self.client.get("/api/analytics/", {"source": "totals"})
+
+        self.assertEqual(response.status_code, 200)
+        totals = response.json()["results"]
+        self.assertEqual(totals["courses"], 1)
+        self.assertEqual(totals["subscriptions"], 1)
+        self.assertEqual(Decimal(totals["subscription_revenue"]), Decimal("40.00"))
+
+    def test_totals_need_a_manager(self):
+        self.client.force_authenticate(self.make_user("student"))
+        response = self.client.get("/api/analytics/", {"source": "totals"})
+        self.assertEqual(response.status_code, 403)
+
+
+class SearchViewTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(3):
+            self.make_course(title=f"الرواية العربية {number}", published=True)
+
+    def test_negative_limit_is_clamped(self):
+        response = self.client.get("/api/search/", {"q": "رواية", "limit": -1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_non_integer_limit_is_rejected(self):
+        response = self.client.get("/api/search/", {"q": "رواية", "limit": "many"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_scores_are_not_rounded(self):
+        hits = search.search("رواية")
+        self.assertTrue(hits)
+        response = self.client.get("/api/search/", {"q": "رواية"})
+        self.assertEqual([hit["score"] for hit in response.json()["results"]], [h[2] for h in hits])
+
+
+def register(client, email):
+    return client.post(
+        "/api/auth/register/", {"email": email, "password": "secret-pass"}, format="json"
+    )
+
+
+@UNTHROTTLED
+class RegistrationTests(KitabTestCase):
+    def test_same_prefix_gets_the_next_free_suffix(self):
+        usernames = [register(APIClient(), f"ahmed@host{n}.com").json()["username"] for n in range(4)]
+        self.assertEqual(usernames, ["ahmed", "ahmed2", "ahmed3", "ahmed4"])
+
+    def test_allocation_cost_does_not_grow_with_the_prefix(self):
+        register(APIClient(), "info@first.com")
+        with CaptureQueriesContext(connection) as early:
+            register(APIClient(), "info@second.com")
+        for n in range(40):
+            get_user_model().objects.create_user(username=f"info{n + 3}", password="x")
+        with CaptureQueriesContext(connection) as late:
+            response = register(APIClient(), "info@last.com")
+        self.assertEqual(response.json()["username"], "info43")
+        self.assertEqual(len(late), len(early))
+
+
+@UNTHROTTLED
+class ConcurrentRegistrationTests(TransactionTestCase):
+    signups = 8
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_signups_for_one_prefix_all_succeed(self):
+        barrier = threading.Barrier(self.signups)
+        statuses, errors = [], []
+
+        def signup(number):
+            try:
+                barrier.wait()
+                statuses.append(register(APIClient(), f"info@race{number}.com").status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=signup, args=(n,)) for n in range(self.signups)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [201] * self.signups)
+        usernames = set(get_user_model().objects.values_list("username", flat=True))
+        self.assertEqual(len(usernames), self.signups)
+
+
+@UNTHROTTLED
+class EmailLookupTests(KitabTestCase):
+    def test_login_matches_email_case_insensitively(self):
+        self.make_user("mona", email="mona@example.com")
+        response = self.client.post(
+            "/api/auth/login/", {"email": "Mona@Example.COM", "password": "secret-pass"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_emails_are_stored_lower_cased_and_unique_by_case(self):
+        self.assertEqual(register(self.client, "Sara@Example.com").status_code, 201)
+        self.assertTrue(get_user_model().objects.filter(email="sara@example.com").exists())
+        self.assertEqual(register(APIClient(), "SARA@example.com").status_code, 400)
+
+    # Login cost at 1M users hinges on these lookups being index searches;
+    # a table scan here is what made the old iexact path grow with the table.
+    @unittest.skipUnless(connection.vendor == "sqlite", "checks SQLite query plans")
+    def test_email_lookups_search_the_lower_indexes(self):
+        lookups = {
+            "user_email_lower_idx": get_user_model().objects.with_email("A@x.com").only("username"),
+            "subscription_user_email_idx": Subscription.objects.with_email("A@x.com"),
+            "booking_user_email_idx": Booking.objects.with_email("A@x.com"),
+        }
+        for index, queryset in lookups.items():
+            with self.subTest(index=index):
+                plan = queryset.explain()
+                self.assertIn(f"USING INDEX {index}", plan)
+                self.assertNotIn("SCAN", plan)
+
+
+def image_upload(color, name="cover.png"):
+    buffer = BytesIO()
+    Image.new("RGB", (640, 480), color).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class BlobStoreTestCase(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.blob_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.blob_root, ignore_errors=True)
+        settings_override = override_settings(
+            BLOB_STORE={
+                "BACKEND": "api.blobstore.FileSystemBlobStore",
+                "OPTIONS": {"root": self.blob_root},
+            }
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        blobstore.get_blob_store.cache_clear()
+        self.addCleanup(blobstore.get_blob_store.cache_clear)
+        self.store = blobstore.get_blob_store()
+
+    def stored_keys(self):
+        return {key for key, _ in self.store.keys()}
+
+
+@UNTHROTTLED
+class ImageBlobReleaseTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user("boss", role="manager"))
+
+    def upload(self, course, color):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/courses/{course.pk}/", {"image_file": image_upload(color)}, format="multipart"
+            )
+        self.assertEqual(response.status_code, 200)
+        return set(CourseImage.objects.filter(course=course).values_list("storage_key", flat=True))
+
+    def test_reupload_releases_the_replaced_variants(self):
+        course = self.make_course()
+        first = self.upload(course, "red")
+        second = self.upload(course, "blue")
+        self.assertFalse(first & second)
+        self.assertEqual(self.stored_keys(), second)
+
+    def test_shared_blobs_stay_until_the_last_reference_goes(self):
+        one, two = self.make_course(), self.make_course()
+        shared = self.upload(one, "green")
+        self.assertEqual(self.upload(two, "green"), shared)
+        with self.captureOnCommitCallbacks(execute=True):
+            one.delete()
+        self.assertEqual(self.stored_keys(), shared)
+        with self.captureOnCommitCallbacks(execute=True):
+            two.delete()
+        self.assertEqual(self.stored_keys(), set())
+
+    def test_stored_blobs_are_served_immutable(self):
+        key = next(iter(self.upload(self.make_course(), "red")))
+        response = self.client.get(f"/api/blobs/{key}/")
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], blobstore.IMMUTABLE)
+
+    def test_gc_sweep_removes_orphans(self):
+        kept = self.upload(self.make_course(), "red")
+        orphan = self.store.put(b"left behind", "image/png")
+        call_command("gc_blobs", min_age=0, stdout=StringIO())
+        self.assertEqual(self.stored_keys(), kept)
+        self.assertNotIn(orphan, self.stored_keys())
+
+
+@unittest.skipIf(mock_aws is None, "needs moto (requirements-dev.txt)")
+class S3BlobStoreTests(KitabTestCase):
+    bucket = "kitab-blobs"
+
+    def setUp(self):
+        super().setUp()
+        credentials = mock.patch.dict(
+            "os.environ",
+            {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing"},
+        )
+        credentials.start()
+        self.addCleanup(credentials.stop)
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        self.store = blobstore.S3BlobStore(self.bucket, prefix="blobs/", region_name="us-east-1")
+        self.store.client.create_bucket(Bucket=self.bucket)
+
+    def test_put_is_content_addressed_and_deduplicated(self):
+        key = self.store.put(b"cover", "image/webp")
+        self.assertEqual(self.store.put(b"cover", "image/webp"), key)
+        self.assertEqual(key, blobstore.make_key(b"cover", "image/webp"))
+        listed = self.store.client.list_objects_v2(Bucket=self.bucket)["Contents"]
+        self.assertEqual([item["Key"] for item in listed], [f"blobs/{key}"])
+        self.assertEqual(self.store.read(key), b"cover")
+
+    def test_keys_exists_and_delete(self):
+        key = self.store.put(b"cover", "image/webp")
+        self.assertEqual([listed for listed, _ in self.store.keys()], [key])
+        self.assertTrue(self.store.exists(key))
+        self.store.delete(key)
+        self.assertFalse(self.store.exists(key))
+
+    def test_response_redirects_to_a_presigned_url(self):
+        key = self.store.put(b"cover", "image/webp")
+        response = self.store.response(key)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(f"blobs/{key}", response["Location"])
+        self.assertIn("Signature", response["Location"])
+
+    def test_redirects_are_not_cached_past_the_signature(self):
+        key = self.store.put(b"cover", "image/webp")
+        with mock.patch.object(blobstore, "get_blob_store", return_value=self.store):
+            response = self.client.get(f"/api/blobs/{key}/")
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        max_age = int(response["Cache-Control"].split("max-age=")[1])
+        self.assertLess(max_age, self.store.url_expiry)
+
+
+@UNTHROTTLED
+class ListModeTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(3):
+            self.make_course(title=f"Course {number}", published=True)
+
+    def test_stream_matches_the_plain_list(self):
+        plain = self.client.get("/api/courses/")
+        streamed = self.client.get("/api/courses/", {"stream": "true"})
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(json.loads(b"".join(streamed.streaming_content)), plain.json())
+
+    def test_plain_list_is_cached_and_revalidates(self):
+        first = self.client.get("/api/courses/")
+        self.assertTrue(first["ETag"])
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+
+class CompiledSerializerTests(BlobStoreTestCase):
+    """The compiled fast path must render exactly what the stock serializers do."""
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course(price=Decimal("19.50"), level="beginner")
+        images.replace_variants(self.course, images.ingest(image_upload("red")))
+        self.legacy_course = self.make_course(image_blob=b"\x89PNG", image_mime="image/png")
+        self.writer = Writer.objects.create(name="Huda", specialty="Poetry", image_blob=b"GIF8")
+        self.package = MentorshipPackage.objects.create(
+            writer=self.writer, sessions_count=3, price=Decimal("75.00"), benefits=["notes"]
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course, title="One", type="video", order=1, video_url="https://v.example/1"
+        )
+        self.subscription = Subscription.objects.create(
+            user_email="a@example.com",
+            course=self.course,
+            payment_amount=Decimal("19.50"),
+            payment_date=date(2024, 5, 1),
+        )
+        self.booking = Booking.objects.create(
+            user_email="a@example.com", writer=self.writer, package=self.package
+        )
+        self.slot = AvailableSlot.objects.create(
+            writer=self.writer, package=self.package, date=date(2024, 6, 1), time="10:00"
+        )
+
+    def assertCompiledMatches(self, serializer_class, queryset, **context):
+        compiled = compile_serializer(serializer_class)
+        self.assertIsNotNone(compiled, serializer_class.__name__)
+        stock = [dict(serializer_class(obj, context=context).data) for obj in queryset]
+        self.assertEqual(list(compiled.rows(queryset, context=context)), stock)
+
+    def test_every_model_serializer_compiles_to_the_same_rows(self):
+        cases = [
+            (serializers.LessonSerializer, Lesson),
+            (serializers.SubscriptionSerializer, Subscription),
+            (serializers.MentorshipPackageSerializer, MentorshipPackage),
+            (serializers.BookingSerializer, Booking),
+            (serializers.AvailableSlotSerializer, AvailableSlot),
+        ]
+        for serializer_class, model in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertCompiledMatches(serializer_class, model.objects.order_by("pk"))
+
+    def test_image_serializers_match_for_every_size(self):
+        for size in ("thumbnail", "card", "full"):
+            with self.subTest(size=size):
+                self.assertCompiledMatches(
+                    serializers.CourseSerializer, Course.objects.order_by("pk"), image_size=size
+                )
+                self.assertCompiledMatches(
+                    serializers.WriterSerializer, Writer.objects.order_by("pk"), image_size=size
+                )
+
+    def test_image_data_costs_a_fixed_number_of_queries(self):
+        for _ in range(5):
+            self.make_course(image_storage_key="k" * 64, image_mime="image/webp")
+        compiled = compile_serializer(serializers.CourseSerializer)
+        # values_list, the variants for the chunk, the legacy inline blobs.
+        with self.assertNumQueries(3):
+            list(compiled.rows(Course.objects.all(), context={"image_size": "card"}))
+
+    def test_api_detail_matches_the_stock_serializer(self):
+        response = self.client.get(f"/api/courses/{self.course.pk}/", {"size": "card"})
+        stock = serializers.CourseSerializer(self.course, context={"image_size": "card"}).data
+        self.assertEqual(response.json(), json.loads(dumps(stock)))
+
+    def test_malformed_ids_are_not_found(self):
+        self.client.force_authenticate(self.make_user("boss", role="manager"))
+        for path in ("/api/lessons/abc/", "/api/subscriptions/abc/", "/api/courses/1.5/"):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+def throttle_rates(**rates):
+    return override_settings(
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}
+    )
+
+
+class ThrottleTests(KitabTestCase):
+    def bad_login(self):
+        return self.client.post(
+            "/api/auth/login/", {"email": "x@example.com", "password": "wrong"}, format="json"
+        )
+
+    @throttle_rates(ip="100/min", auth="3/min")
+    def test_login_burst_is_shed_with_retry_after(self):
+        statuses = [self.bad_login().status_code for _ in range(5)]
+        self.assertEqual(statuses, [401, 401, 401, 429, 429])
+        retry_after = int(self.bad_login()["Retry-After"])
+        self.assertTrue(0 < retry_after <= 20)
+
+    @throttle_rates(ip="100/min", auth="3/min")
+    def test_bucket_refills_over_time(self):
+        clock = mock.Mock(return_value=1000.0)
+        with mock.patch.object(throttling.TokenBucketThrottle, "timer", clock):
+            for _ in range(3):
+                self.bad_login()
+            self.assertEqual(self.bad_login().status_code, 429)
+            clock.return_value += 20  # one token at 3/min
+            self.assertEqual(self.bad_login().status_code, 401)
+            self.assertEqual(self.bad_login().status_code, 429)
+
+    @throttle_rates(ip="4/min", user="100/min", read="100/min")
+    def test_anonymous_clients_are_bucketed_per_ip(self):
+        for _ in range(4):
+            self.assertEqual(self.client.get("/api/courses/").status_code, 200)
+        self.assertEqual(self.client.get("/api/courses/").status_code, 429)
+        other = APIClient(REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other.get("/api/courses/").status_code, 200)
+        signed_in = APIClient()
+        signed_in.force_authenticate(self.make_user("reader"))
+        self.assertEqual(signed_in.get("/api/courses/").status_code, 200)
+
+    @throttle_rates(read="100/min", write="2/min")
+    def test_writes_have_their_own_scope(self):
+        self.client.force_authenticate(self.make_user("boss", role="manager"))
+        course = self.make_course()
+        for _ in range(2):
+            response = self.client.patch(f"/api/courses/{course.pk}/", {"title": "T"}, format="json")
+            self.assertEqual(response.status_code, 200)
+        response = self.client.patch(f"/api/courses/{course.pk}/", {"title": "T"}, format="json")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.client.get(f"/api/courses/{course.pk}/").status_code, 200)
+
+
+@override_settings(ADMISSION_MAX_CONCURRENT_REQUESTS=2, ADMISSION_QUEUE_TIMEOUT=0.05)
+class ConcurrencyLimitTests(KitabTestCase):
+    def test_requests_over_the_limit_fail_fast_with_503(self):
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def slow_view(request):
+            started.release()
+            release.wait(5)
+            return HttpResponse("ok")
+
+        middleware = ConcurrencyLimitMiddleware(slow_view)
+        request = RequestFactory().get("/api/courses/")
+        results = []
+        holders = [
+            threading.Thread(target=lambda: results.append(middleware(request).status_code))
+            for _ in range(2)
+        ]
+        for holder in holders:
+            holder.start()
+            started.acquire()
+
+        began = time.perf_counter()
+        rejected = [middleware(request) for _ in range(10)]
+        elapsed = time.perf_counter() - began
+        release.set()
+        for holder in holders:
+            holder.join()
+
+        self.assertEqual({response.status_code for response in rejected}, {503})
+        self.assertEqual(rejected[0]["Retry-After"], str(settings.ADMISSION_RETRY_AFTER))
+        # Each rejection waits only the queue timeout, not for a slot to free up.
+        self.assertLess(elapsed, 10 * 0.05 + 1)
+        self.assertEqual(results, [200, 200])
+        self.assertEqual(middleware(request).status_code, 200)
+
+    def test_exempt_paths_skip_the_limit(self):
+        middleware = ConcurrencyLimitMiddleware(lambda request: HttpResponse("ok"))
+        middleware.slots = threading.BoundedSemaphore(1)
+        middleware.slots.acquire()
+        factory = RequestFactory()
+        self.assertEqual(middleware(factory.get("/api/health/")).status_code, 200)
+        self.assertEqual(middleware(factory.get("/api/courses/")).status_code, 503)
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Just enough of an SMTP server to accept what Django's backend sends."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.messages = []
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 sink")
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 sink")
+            elif command.startswith("RCPT TO:"):
+                recipients.append(raw.decode().strip()[8:].strip("<> "))
+                self.reply("250 ok")
+            elif command == "DATA":
+                self.reply("354 go ahead")
+                lines = []
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data)
+                self.server.messages.append((recipients, b"".join(lines)))
+                recipients = []
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class BookingEmailTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.writer = Writer.objects.create(name="Huda", specialty="Poetry", email="huda@example.com")
+        self.package = MentorshipPackage.objects.create(
+            writer=self.writer, name="Intro", sessions_count=1, price=Decimal("50.00")
+        )
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(
+                user_email="sara@example.com",
+                user_name="Sara",
+                writer=self.writer,
+                writer_name="Huda",
+                package=self.package,
+            )
+
+    def test_booking_mails_the_writer_and_the_student(self):
+        self.book()
+        subjects = {message.to[0]: message.subject for message in mail.outbox}
+        self.assertEqual(sorted(subjects), ["huda@example.com", "sara@example.com"])
+        self.assertIn("Sara", subjects["huda@example.com"])
+        self.assertIn("Huda", subjects["sara@example.com"])
+
+    def test_emails_are_enqueued_once_per_booking(self):
+        booking = self.book()
+        with self.captureOnCommitCallbacks(execute=True):
+            post_save.send(Booking, instance=booking, created=True)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_emails_reach_an_smtp_server(self):
+        sink = SMTPSink()
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        self.addCleanup(sink.server_close)
+        self.addCleanup(sink.shutdown)
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=sink.server_address[1],
+        ):
+            self.book()
+        self.assertEqual(
+            sorted(recipients[0] for recipients, _ in sink.messages),
+            ["huda@example.com", "sara@example.com"],
+        )
+        self.assertTrue(all(b"Subject:" in body for _, body in sink.messages))
+
+
+class TaskQueueTests(KitabTestCase):
+    def subscribe(self, course, **fields):
+        return Subscription.objects.create(
+            user_email="a@example.com", course=course, payment_date=date(2024, 5, 1), **fields
+        )
+
+    def test_rollup_refreshes_coalesce_per_course_day(self):
+        course = self.make_course()
+        for _ in range(3):
+            self.subscribe(course)
+        self.subscribe(course).delete()
+        self.subscribe(self.make_course())
+        self.assertEqual(Task.objects.filter(name="refresh_course_rollup").count(), 2)
+
+    def test_claimed_rollup_frees_its_key_for_later_changes(self):
+        course = self.make_course()
+        self.subscribe(course)
+        claimed = tasks.claim(10)
+        self.assertEqual([task.key for task in claimed], [""])
+        self.subscribe(course)
+        pending = Task.objects.get(name="refresh_course_rollup", status="pending")
+        self.assertEqual(pending.key, f"rollup:course:{course.pk}:2024-05-01")
+
+    def test_prune_drops_old_done_tasks_only(self):
+        old = timezone.now() - timedelta(days=settings.TASK_RETENTION_DAYS + 1)
+        Task.objects.bulk_create(
+            [
+                Task(name="build_snapshots", status="done", finished_at=old),
+                Task(name="build_snapshots", status="done", finished_at=timezone.now()),
+                Task(name="build_snapshots", status="failed", finished_at=old),
+            ]
+        )
+        self.assertEqual(tasks.prune(batch_size=1), 1)
+        self.assertEqual(
+            sorted(Task.objects.values_list("status", flat=True)), ["done", "failed"]
+        )
+
+
+@UNTHROTTLED
+class LessonReorderTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course(instructor="Layla")
+        self.lessons = [
+            Lesson.objects.create(
+                course=self.course, title=f"L{n}", type="text", order=1024 * (n + 1), content="secret"
+            )
+            for n in range(3)
+        ]
+        self.reversed_ids = [lesson.pk for lesson in reversed(self.lessons)]
+
+    def reorder(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client.post(
+            f"/api/courses/{self.course.pk}/lessons/reorder/",
+            {"lessons": self.reversed_ids},
+            format="json",
+        )
+
+    def test_course_instructor_reorders_and_gets_only_keys_back(self):
+        response = self.reorder(self.make_user("layla", role="instructor", first_name="Layla"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.json()], self.reversed_ids)
+        self.assertEqual({key for row in response.json() for key in row}, {"id", "order"})
+
+    def test_manager_may_reorder_any_course(self):
+        self.assertEqual(self.reorder(self.make_user("boss", role="manager")).status_code, 200)
+
+    def test_everyone_else_is_refused(self):
+        outsiders = {
+            "anonymous": None,
+            "student": self.make_user("student"),
+            "other instructor": self.make_user("omar", role="instructor"),
+        }
+        for label, user in outsiders.items():
+            with self.subTest(user=label):
+                self.assertIn(self.reorder(user).status_code, (401, 403))
+        orders = list(Lesson.objects.order_by("order").values_list("pk", flat=True))
+        self.assertEqual(orders, [lesson.pk for lesson in self.lessons])
+
+
+@UNTHROTTLED
+class LockedLessonTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+        self.lesson = Lesson.objects.create(
+            course=self.course,
+            title="Locked",
+            type="video",
+            order=1024,
+            content="paid words",
+            video_url="https://v.example/paid",
+        )
+        self.client.force_authenticate(self.make_user("student"))
+        self.path = f"/api/lessons/{self.lesson.pk}/"
+
+    def assertLocked(self, row):
+        self.assertTrue(row["locked"])
+        self.assertEqual((row["content"], row["video_url"]), ("", ""))
+
+    def assertNothingLeaks(self, response):
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        self.assertNotIn(b"paid words", body)
+        self.assertNotIn(b"v.example/paid", body)
+
+    def test_reads_are_masked(self):
+        responses = [
+            self.client.get("/api/lessons/"),
+            self.client.get("/api/lessons/", {"stream": "true"}),
+            self.client.get(self.path),
+        ]
+        for response in responses:
+            with self.subTest(path=response.wsgi_request.get_full_path()):
+                self.assertNothingLeaks(response)
+        self.assertLocked(responses[2].json())
+
+    def test_write_responses_are_masked(self):
+        writes = {
+            "patch": lambda: self.client.patch(self.path, {}, format="json"),
+            "put": lambda: self.client.put(
+                self.path,
+                {"course_id": self.course.pk, "title": "Locked", "type": "video", "order": 1024},
+                format="json",
+            ),
+            "post": lambda: self.client.post(
+                "/api/lessons/",
+                {
+                    "course_id": self.course.pk,
+                    "title": "New",
+                    "type": "video",
+                    "order": 2048,
+                    "content": "paid words",
+                    "video_url": "https://v.example/paid",
+                },
+                format="json",
+            ),
+        }
+        for method, write in writes.items():
+            with self.subTest(method=method):
+                response = write()
+                self.assertIn(response.status_code, (200, 201))
+                self.assertLocked(response.json())
+                self.assertNothingLeaks(response)
+
+    def test_subscribers_still_see_the_lesson(self):
+        Subscription.objects.create(
+            user_email="student@example.com", course=self.course, payment_status="completed"
+        )
+        response = self.client.patch(self.path, {}, format="json")
+        self.assertFalse(response.json()["locked"])
+        self.assertEqual(response.json()["content"], "paid words")
+
+
+@UNTHROTTLED
+class CatalogueImportTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.make_user("boss", role="manager"))
+
+    def post(self, bundle):
+        return self.client.post("/api/imports/catalogue/", bundle, format="json")
+
+    def test_malformed_bundles_are_rejected_with_400(self):
+        bundles = [
+            {"courses": 5},
+            {"courses": "title"},
+            {"courses": {"title": "x"}},
+            {"courses": [5]},
+            {"novels": []},
+        ]
+        for bundle in bundles:
+            with self.subTest(bundle=bundle):
+                response = self.post(bundle)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("detail", response.json())
+
+    def test_a_bad_kind_fails_the_bundle_before_anything_is_written(self):
+        course = {"slug": "c1", "title": "C", "instructor": "I", "type": "free"}
+        response = self.post({"courses": [course], "lessons": None})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Course.objects.exists())
+
+    def test_well_formed_bundle_imports(self):
+        course = {"slug": "c1", "title": "C", "instructor": "I", "type": "free"}
+        response = self.post({"courses": [course]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["courses"]["imported"], 1)
+
+
+def updates_of(queries, table):
+    return [query["sql"] for query in queries if query["sql"].startswith(f'UPDATE "{table}"')]
+
+
+@UNTHROTTLED
+class DirtyFieldSaveTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.blob = bytes(200 * 1024)
+        self.course = self.make_course(image_blob=self.blob, image_mime="image/png")
+        self.client.force_authenticate(self.make_user("boss", role="manager"))
+        self.path = f"/api/courses/{self.course.pk}/"
+
+    def patch(self, data, format="json"):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.path, data, format=format)
+        self.assertEqual(response.status_code, 200)
+        return updates_of(queries, "api_course")
+
+    def test_patch_writes_only_the_changed_column(self):
+        updates = self.patch({"title": "Renamed"})
+        self.assertEqual(len(updates), 1)
+        self.assertIn('SET "title"', updates[0])
+        self.assertNotIn("image_blob", updates[0])
+        # The 200 KB blob is not sent back to the database.
+        self.assertLess(len(updates[0]), 1024)
+
+    def test_unchanged_patch_writes_nothing(self):
+        self.assertEqual(self.patch({"title": self.course.title}), [])
+
+    def test_image_upload_is_folded_into_one_update(self):
+        updates = self.patch({"title": "New", "image_file": image_upload("red")}, format="multipart")
+        self.assertEqual(len(updates), 1)
+        for column in ("title", "image_blob", "image_mime"):
+            self.assertIn(f'"{column}"', updates[0])
+        # The storage key was already empty, so it is not rewritten.
+        self.assertNotIn("image_storage_key", updates[0])
+        self.course.refresh_from_db()
+        self.assertIsNone(self.course.image_blob)
+
+    def test_in_place_json_edits_are_detected(self):
+        writer = Writer.objects.create(name="Huda", specialty="Poetry")
+        package = MentorshipPackage.objects.create(
+            writer=writer, sessions_count=1, price=Decimal("10.00"), benefits=["notes"]
+        )
+        package.benefits.append("recording")
+        with CaptureQueriesContext(connection) as queries:
+            package.save()
+        updates = updates_of(queries, "api_mentorshippackage")
+        self.assertEqual(len(updates), 1)
+        self.assertIn('SET "benefits"', updates[0])
+        package.refresh_from_db()
+        self.assertEqual(package.benefits, ["notes", "recording"])
+
+
+class ArchivedRollupTests(KitabTestCase):
+    day = date(2022, 3, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+        self.writer = Writer.objects.create(name="Huda", specialty="Poetry")
+        self.package = MentorshipPackage.objects.create(
+            writer=self.writer, sessions_count=1, price=Decimal("60.00")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for status in ("completed", "pending"):
+                Subscription.objects.create(
+                    user_email="a@example.com",
+                    course=self.course,
+                    payment_status=status,
+                    payment_amount=Decimal("40.00"),
+                    payment_date=self.day,
+                    expiry_date=self.day,
+                    expired=True,
+                )
+            Booking.objects.create(
+                user_email="a@example.com",
+                writer=self.writer,
+                package=self.package,
+                status="completed",
+                payment_status="completed",
+                session_date=timezone.make_aware(datetime(2022, 3, 1, 12)),
+            )
+        self.expected = self.stats()
+        for name in ("subscriptions", "bookings"):
+            archive.archive(name)
+        self.assertFalse(Subscription.objects.exists() or Booking.objects.exists())
+
+    def stats(self):
+        return (
+            list(DailyCourseStat.objects.values("day", "subscriptions", "paid_subscriptions", "revenue")),
+            list(DailyWriterStat.objects.values("day", "bookings", "paid_bookings", "revenue")),
+        )
+
+    def test_rebuild_keeps_archived_history(self):
+        self.assertEqual(self.expected[0][0]["revenue"], Decimal("40.00"))
+        self.assertEqual(self.expected[1][0]["revenue"], Decimal("60.00"))
+        rollups.rebuild(self.day, self.day)
+        self.assertEqual(self.stats(), self.expected)
+
+    def test_day_refresh_keeps_archived_history(self):
+        rollups.refresh_course_day(self.course.pk, self.day)
+        rollups.refresh_writer_day(self.writer.pk, self.day)
+        self.assertEqual(self.stats(), self.expected)
+
+    def test_live_and_archived_rows_add_up(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(
+                user_email="b@example.com",
+                course=self.course,
+                payment_status="completed",
+                payment_amount=Decimal("15.00"),
+                payment_date=self.day,
+            )
+        stat = DailyCourseStat.objects.get()
+        self.assertEqual((stat.subscriptions, stat.revenue), (3, Decimal("55.00")))
+
+    def test_repricing_a_package_keeps_past_revenue(self):
+        def book():
+            Booking.objects.create(
+                user_email="b@example.com",
+                writer=self.writer,
+                package=self.package,
+                payment_status="completed",
+                session_date=timezone.make_aware(datetime(2022, 3, 1, 15)),
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book()
+            self.package.price = Decimal("90.00")
+            self.package.save()
+            book()
+        self.assertEqual(ArchivedBooking.objects.get().payment_amount, Decimal("60.00"))
+        self.assertEqual(
+            sorted(Booking.objects.values_list("payment_amount", flat=True)),
+            [Decimal("60.00"), Decimal("90.00")],
+        )
+        expected = (3, Decimal("210.00"))
+        stat = DailyWriterStat.objects.get()
+        self.assertEqual((stat.paid_bookings, stat.revenue), expected)
+        rollups.rebuild(self.day, self.day)
+        stat = DailyWriterStat.objects.get()
+        self.assertEqual((stat.paid_bookings, stat.revenue), expected)
+
+    def test_archived_rows_of_deleted_courses_are_ignored(self):
+        self.course.delete()
+        rollups.rebuild(self.day, self.day)
+        self.assertFalse(DailyCourseStat.objects.exists())
+
+
+@UNTHROTTLED
+class SessionAuthTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user("mona", email="mona@example.com")
+
+    def login(self, password="secret-pass"):
+        return self.client.post(
+            "/api/auth/login/", {"email": "mona@example.com", "password": password}, format="json"
+        )
+
+    def count_hashing(self):
+        # Every hash a login runs goes through one of these two on the user model.
+        return (
+            mock.patch.object(base_user, "make_password", wraps=base_user.make_password),
+            mock.patch.object(base_user, "check_password", wraps=base_user.check_password),
+        )
+
+    def test_failed_login_hashes_once(self):
+        for label, data in {
+            "wrong password": {"email": "mona@example.com", "password": "nope"},
+            "unknown user": {"username": "nobody", "password": "nope"},
+        }.items():
+            with self.subTest(label):
+                encode, verify = self.count_hashing()
+                with encode as encoded, verify as verified:
+                    response = self.client.post("/api/auth/login/", data, format="json")
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(encoded.call_count + verified.call_count, 1)
+
+    def test_warm_me_runs_no_queries(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.client.get("/api/auth/me/").json()["username"], "mona")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/auth/me/")
+        self.assertEqual(response.json()["username"], "mona")
+
+    def test_sessions_from_the_stock_backend_are_remapped(self):
+        remap = import_module("api.migrations.0014_remap_session_backend")
+        store = SessionStore()
+        store.update(
+            {
+                SESSION_KEY: str(self.user.pk),
+                BACKEND_SESSION_KEY: remap.OLD_BACKEND,
+                HASH_SESSION_KEY: self.user.get_session_auth_hash(),
+            }
+        )
+        store.create()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = store.session_key
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 403)
+
+        remap.remap_sessions(django_apps, None)
+
+        response = self.client.get("/api/auth/me/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["username"], "mona")
+
+
+class PasswordHashingPolicyTests(KitabTestCase):
+    def load_settings(self, policy):
+        return subprocess.run(
+            [sys.executable, "-c", "import config.settings"],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "KITAB_PASSWORD_HASHING": policy},
+            capture_output=True,
+            text=True,
+        )
+
+    def test_fast_policy_cannot_come_from_the_environment(self):
+        result = self.load_settings("fast")
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ImproperlyConfigured", result.stderr)
+        self.assertEqual(self.load_settings("pbkdf2").returncode, 0)
+
+    def test_benchmark_times_login_requests(self):
+        out = StringIO()
+        call_command("benchmark_password_hashers", policy=["fast"], seconds=0.05, stdout=out)
+        self.assertRegex(out.getvalue(), r"fast \(active\): [\d,.]+ logins/sec, [\d,.]+ failed")
+        self.assertFalse(get_user_model().objects.filter(username="kitab-benchmark").exists())
+
+
+ARABIC = "في البدء كانت الكلمة، والكلمة كتاب. " * 40
+
+
+class CompressedTextTests(KitabTestCase):
+    def test_round_trip(self):
+        for codec in ("zlib", "zstd"):
+            if codec == "zstd" and fields.zstandard is None:
+                continue
+            for text in ("", "short", ARABIC, "x" * 10_000):
+                with self.subTest(codec=codec, size=len(text)), override_settings(
+                    COMPRESSED_TEXT_CODEC=codec
+                ):
+                    packed = fields.pack(text)
+                    self.assertEqual(fields.unpack(packed), text)
+                    self.assertEqual(fields.unpack(memoryview(packed)), text)
+
+    def test_version_bytes_and_threshold(self):
+        short = "ا" * (settings.COMPRESSED_TEXT_MIN_SIZE // 2 - 1)
+        self.assertEqual(fields.pack(short)[0], fields.RAW)
+        self.assertEqual(fields.pack(ARABIC)[0], fields.ZLIB)
+        self.assertLess(len(fields.pack(ARABIC)), len(ARABIC.encode()))
+        # Text that does not shrink is kept raw even above the threshold.
+        with mock.patch.object(fields.zlib, "compress", return_value=bytes(len(ARABIC) * 2)):
+            self.assertEqual(fields.pack(ARABIC), bytes([fields.RAW]) + ARABIC.encode())
+
+    @unittest.skipIf(fields.zstandard is None, "needs zstandard (requirements-dev.txt)")
+    def test_zstd_version_byte_and_missing_package(self):
+        with override_settings(COMPRESSED_TEXT_CODEC="zstd"):
+            packed = fields.pack(ARABIC)
+            self.assertEqual(packed[0], fields.ZSTD)
+            with mock.patch.object(fields, "zstandard", None):
+                with self.assertRaises(ImproperlyConfigured):
+                    fields.check_codec()
+                with self.assertRaises(ImproperlyConfigured):
+                    fields.unpack(packed)
+
+    def test_unknown_codec_fails_the_startup_check(self):
+        with override_settings(COMPRESSED_TEXT_CODEC="lz4"), self.assertRaises(
+            ImproperlyConfigured
+        ):
+            fields.check_codec()
+
+    def test_column_holds_packed_bytes_but_models_see_text(self):
+        lesson = Lesson.objects.create(
+            course=self.make_course(), title="L", type="text", order=1, content=ARABIC
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT content FROM api_lesson WHERE id = %s", [lesson.pk])
+            stored = bytes(cursor.fetchone()[0])
+        self.assertEqual(stored[0], fields.ZLIB)
+        self.assertEqual(Lesson.objects.get().content, ARABIC)
+        self.assertEqual(serializers.LessonSerializer(lesson).data["content"], ARABIC)
+
+    def test_admin_and_forms_see_plain_text(self):
+        lesson = Lesson.objects.create(
+            course=self.make_course(), title="L", type="text", order=1, content=ARABIC
+        )
+        admin_user = self.make_user("root", is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        response = self.client.get(f"/admin/api/lesson/{lesson.pk}/change/")
+        self.assertContains(response, "في البدء كانت الكلمة")
+
+        form = modelform_factory(Lesson, fields=["content"])(
+            {"content": "نص جديد"}, instance=lesson
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertEqual(Lesson.objects.get().content, "نص جديد")
+
+
+class CompressedTextMigrationTests(TransactionTestCase):
+    before = [("api", "0012_archive_tables")]
+    after = [("api", "0013_compressed_text")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_forward_packs_and_reverse_restores(self):
+        old_apps = self.migrate(self.before)
+        OldCourse = old_apps.get_model("api", "Course")
+        OldLesson = old_apps.get_model("api", "Lesson")
+        course = OldCourse.objects.create(
+            title="C", instructor="I", type="free", description=ARABIC, requirements="none"
+        )
+        OldLesson.objects.create(course=course, title="L", type="text", order=1, content=ARABIC)
+
+        new_apps = self.migrate(self.after)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT description, requirements FROM api_course")
+            description, requirements = (bytes(value) for value in cursor.fetchone())
+        self.assertEqual(description[0], fields.ZLIB)
+        self.assertEqual(requirements, bytes([fields.RAW]) + b"none")
+        self.assertEqual(new_apps.get_model("api", "Lesson").objects.get().content, ARABIC)
+
+        old_apps = self.migrate(self.before)
+        restored = old_apps.get_model("api", "Course").objects.get()
+        self.assertEqual((restored.description, restored.requirements), (ARABIC, "none"))
+        self.assertEqual(old_apps.get_model("api", "Lesson").objects.get().content, ARABIC)
+
+
+@UNTHROTTLED
+class MemoryProfileTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = Path(tempfile.mkdtemp()) / "profiles"
+        self.addCleanup(shutil.rmtree, self.directory.parent, ignore_errors=True)
+        profiling_on = override_settings(
+            MEMORY_PROFILE_SAMPLE_RATE=1, MEMORY_PROFILE_DIR=self.directory
+        )
+        profiling_on.enable()
+        self.addCleanup(profiling_on.disable)
+        for number in range(3):
+            self.make_course(title=f"Course {number}")
+
+    def test_sampled_list_request_writes_one_record(self):
+        self.assertEqual(APIClient().get("/api/courses/").status_code, 200)
+        records = list(profiling.read(self.directory))
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual((record["method"], record["route"]), ("GET", "/api/courses/"))
+        for key in ("peak_bytes", "net_bytes", "sites", "render_sites", "render_bytes"):
+            self.assertIn(key, record)
+        self.assertGreater(record["peak_bytes"], 0)
+
+    def test_streaming_responses_are_not_recorded(self):
+        response = APIClient().get("/api/courses/", {"stream": "true"})
+        b"".join(response.streaming_content)
+        self.assertEqual(list(profiling.read(self.directory)), [])
+
+    def test_middleware_is_dropped_when_sampling_is_off(self):
+        with override_settings(MEMORY_PROFILE_SAMPLE_RATE=0):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.MemoryProfileMiddleware(lambda request: HttpResponse())
+
+    def test_report_aggregates_per_route_and_clears(self):
+        client = APIClient()
+        for _ in range(2):
+            client.get("/api/courses/")
+        client.get("/api/writers/")
+        out = StringIO()
+        call_command("memory_profile_report", json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["GET /api/courses/"]["samples"], 2)
+        self.assertEqual(report["GET /api/writers/"]["samples"], 1)
+
+        call_command("memory_profile_report", clear=True, stdout=StringIO())
+        self.assertFalse(self.directory.exists())
+
+
+@UNTHROTTLED
+class CompressionTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(20):
+            self.make_course(title=f"Course {number}", description="وصف الدورة " * 10)
+
+    def get(self, path="/api/courses/", encoding="gzip", **params):
+        return self.client.get(path, params, HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_gzip_is_negotiated_and_varies(self):
+        plain = self.get(encoding="")
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        response = self.get(encoding="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+
+    def test_refused_codecs_are_not_used(self):
+        self.assertNotIn("Content-Encoding", self.get(encoding="gzip;q=0"))
+        best = next(codec for codec in compression.PREFERENCE if codec in compression.CODECS)
+        self.assertEqual(compression.negotiate("*"), best)
+        self.assertIsNone(compression.negotiate("identity"))
+
+    @unittest.skipIf(compression.zstandard is None, "needs zstandard (requirements-dev.txt)")
+    def test_zstd_is_preferred_when_available(self):
+        response = self.get(encoding="gzip, br, zstd")
+        self.assertEqual(response["Content-Encoding"], "zstd")
+        body = compression.zstandard.ZstdDecompressor().decompress(response.content)
+        self.assertEqual(body, self.get(encoding="").content)
+
+    @unittest.skipIf(compression.brotli is None, "needs brotli")
+    def test_brotli_is_negotiated_when_available(self):
+        response = self.get(encoding="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(compression.brotli.decompress(response.content), self.get(encoding="").content)
+
+    def test_small_responses_are_left_alone(self):
+        response = self.get(f"/api/courses/{Course.objects.first().pk}/", size="card")
+        self.assertLess(len(response.content), settings.COMPRESSION_MIN_SIZE)
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_encoded_and_streaming_responses(self):
+        encoded = HttpResponse(b"x" * 4096, content_type="application/json")
+        encoded["Content-Encoding"] = "br"
+        middleware = compression.CompressionMiddleware(lambda request: encoded)
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(middleware(request).content, b"x" * 4096)
+
+        streamed = self.get(encoding="gzip", stream="true")
+        self.assertEqual(streamed["Content-Encoding"], "gzip")
+        self.assertEqual(
+            json.loads(gzip.decompress(b"".join(streamed.streaming_content))),
+            self.get(encoding="").json(),
+        )
+        # Only gzip can be applied chunk by chunk.
+        streamed = self.get(encoding="zstd, br", stream="true")
+        self.assertNotIn("Content-Encoding", streamed)
+        b"".join(streamed.streaming_content)
+
+    def test_precompressed_cache_hits_until_a_course_changes(self):
+        first = self.get()
+        with self.assertNumQueries(0):
+            second = self.get()
+        self.assertEqual(second.content, first.content)
+        counts = metrics.snapshot()
+        self.assertEqual(counts["compression.encoded"], 1)
+        self.assertEqual(counts["compression.precompressed_hits"], 1)
+
+        course = Course.objects.first()
+        course.title = "Renamed"
+        course.save()
+        third = self.get()
+        self.assertIn("Renamed", gzip.decompress(third.content).decode())
+        self.assertEqual(metrics.snapshot()["compression.encoded"], 2)
+
+
+class SweepTests(KitabTestCase):
+    today = date(2025, 1, 10)
+
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course()
+        self.writer = Writer.objects.create(name="Huda", specialty="Poetry")
+        self.package = MentorshipPackage.objects.create(
+            writer=self.writer, sessions_count=1, price=Decimal("10.00")
+        )
+
+    def subscription(self, email, expiry):
+        return Subscription.objects.create(
+            user_email=email,
+            course=self.course,
+            payment_status="completed",
+            payment_amount=Decimal("20.00"),
+            payment_date=date(2024, 1, 1),
+            expiry_date=expiry,
+        )
+
+    def slot(self, day, **fields):
+        return AvailableSlot.objects.create(
+            writer=self.writer, package=self.package, date=day, time="10:00", **fields
+        )
+
+    def sweep(self, *only, **options):
+        call_command(
+            "sweep", *[f"--only={name}" for name in only], stdout=StringIO(), **options
+        )
+
+    def test_expired_subscriptions_flip_in_batches(self):
+        lapsed = [self.subscription(f"u{n}@example.com", date(2025, 1, n + 1)) for n in range(5)]
+        current = self.subscription("now@example.com", self.today)
+        progress = []
+        with mock.patch.object(timezone, "localdate", return_value=self.today):
+            total = sweeper.sweep(
+                "subscriptions", batch_size=2, progress=lambda *args: progress.append(args[1])
+            )
+        self.assertEqual((total, progress), (5, [2, 2, 1]))
+        self.assertEqual(
+            set(Subscription.objects.filter(expired=True).values_list("pk", flat=True)),
+            {subscription.pk for subscription in lapsed},
+        )
+        current.refresh_from_db()
+        self.assertFalse(current.expired)
+
+    def test_past_open_slots_are_retired_and_booked_ones_left_alone(self):
+        past = self.slot(date(2025, 1, 1))
+        upcoming = self.slot(date(2025, 2, 1))
+        booking = Booking.objects.create(
+            user_email="a@example.com", writer=self.writer, package=self.package
+        )
+        booked = self.slot(date(2025, 1, 2), is_available=False, booking=booking)
+        with mock.patch.object(slot_events, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(sweeper.sweep("slots", today=self.today), 1)
+        publish.assert_called_once_with(
+            self.writer.pk, slot_events.REMOVED, {"id": past.pk, "writer_id": self.writer.pk}
+        )
+        states = dict(AvailableSlot.objects.values_list("pk", "is_available"))
+        self.assertEqual(states, {past.pk: False, upcoming.pk: True, booked.pk: False})
+        booked.refresh_from_db()
+        self.assertEqual(booked.booking_id, booking.pk)
+
+    def test_dry_run_writes_nothing(self):
+        self.subscription("u@example.com", date(2025, 1, 1))
+        self.slot(date(2025, 1, 1))
+        with mock.patch.object(timezone, "localdate", return_value=self.today):
+            with CaptureQueriesContext(connection) as queries:
+                self.sweep(dry_run=True)
+        self.assertFalse([q for q in queries if q["sql"].startswith("UPDATE")])
+        self.assertFalse(Subscription.objects.filter(expired=True).exists())
+        self.assertTrue(AvailableSlot.objects.get().is_available)
+
+    def test_sweep_drops_cached_entitlements(self):
+        student = self.make_user("sara", email="sara@example.com")
+        self.subscription("sara@example.com", date(2025, 1, 1))
+        # Entitlements cached on the subscription's last day must not outlive
+        # the sweep that expires it.
+        with mock.patch.object(timezone, "localdate", return_value=date(2025, 1, 1)):
+            self.assertIn(self.course.pk, entitlements.entitled_course_ids(student))
+            sweeper.sweep("subscriptions", today=self.today)
+            self.assertNotIn(self.course.pk, entitlements.entitled_course_ids(student))
+
+    def test_rollups_stay_consistent_after_a_sweep(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription("u@example.com", date(2025, 1, 1))
+        before = list(DailyCourseStat.objects.values("day", "subscriptions", "revenue"))
+        sweeper.sweep("subscriptions", today=self.today)
+        rollups.rebuild(date(2024, 1, 1), date(2024, 1, 1))
+        self.assertEqual(
+            list(DailyCourseStat.objects.values("day", "subscriptions", "revenue")), before
+        )
+
+
+@UNTHROTTLED
+class ExportTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course(title="نحو")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paid = Subscription.objects.create(
+                user_email="a@example.com",
+                course=self.course,
+                course_title=self.course.title,
+                payment_status="completed",
+                payment_amount=Decimal("19.90"),
+                payment_date=date(2025, 1, 2),
+            )
+            Subscription.objects.create(
+                user_email="b@example.com",
+                course=self.course,
+                payment_status="pending",
+                payment_amount=Decimal("5.00"),
+                payment_date=date(2025, 1, 3),
+            )
+        self.client.force_authenticate(self.make_user("boss", role="manager"))
+
+    def export(self, path, **params):
+        response = self.client.get(f"/api/exports/{path}", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_streams_header_then_rows(self):
+        lines = self.export("subscriptions.csv", payment_status="completed").splitlines()
+        self.assertEqual(lines[0], ",".join(exports.SUBSCRIPTION_COLUMNS))
+        self.assertEqual(
+            lines[1:],
+            [f"{self.paid.pk},a@example.com,{self.course.pk},نحو,completed,19.90,2025-01-02,,False"],
+        )
+
+    def test_ndjson_writes_one_object_per_line_with_exact_amounts(self):
+        rows = [json.loads(line) for line in self.export("subscriptions.ndjson").splitlines()]
+        self.assertEqual([row["user_email"] for row in rows], ["a@example.com", "b@example.com"])
+        self.assertEqual(set(rows[0]), set(exports.SUBSCRIPTION_COLUMNS))
+        self.assertEqual(
+            (rows[0]["payment_amount"], rows[0]["payment_date"]), ("19.90", "2025-01-02")
+        )
+
+    def test_revenue_export_reads_the_rollups(self):
+        rows = [json.loads(line) for line in self.export("revenue.ndjson").splitlines()]
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "day": "2025-01-02",
+                    "source": "course",
+                    "entity_id": self.course.pk,
+                    "name": "نحو",
+                    "count": 1,
+                    "paid_count": 1,
+                    "revenue": "19.90",
+                },
+                {
+                    "day": "2025-01-03",
+                    "source": "course",
+                    "entity_id": self.course.pk,
+                    "name": "نحو",
+                    "count": 1,
+                    "paid_count": 0,
+                    "revenue": "0.00",
+                },
+            ],
+        )
+        lines = self.export("revenue.csv", start="2025-01-03", source="courses").splitlines()
+        self.assertEqual(
+            lines,
+            [",".join(exports.REVENUE_COLUMNS), f"2025-01-03,course,{self.course.pk},نحو,1,0,0.00"],
+        )
+        self.assertEqual(self.export("revenue.csv", source="writers").splitlines()[1:], [])
+
+    def test_bad_filters_and_ranges_are_rejected(self):
+        for path, params in [
+            ("subscriptions.csv", {"id": "abc"}),
+            ("bookings.ndjson", {"writer_id": "x"}),
+            ("revenue.csv", {"start": "2025-13-01"}),
+            ("revenue.csv", {"start": "2025-02-01", "end": "2025-01-01"}),
+            ("revenue.ndjson", {"source": "lessons"}),
+        ]:
+            with self.subTest(path=path, params=params):
+                response = self.client.get(f"/api/exports/{path}", params)
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/exports/lessons.csv").status_code, 404)
+        self.assertEqual(self.client.get("/api/exports/subscriptions.xml").status_code, 404)
+
+    def test_only_managers_can_export(self):
+        self.client.force_authenticate(self.make_user("student"))
+        self.assertEqual(self.client.get("/api/exports/subscriptions.csv").status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.get("/api/exports/revenue.csv").status_code, (401, 403))
+
+
+class SlotEventTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.writer = Writer.objects.create(name="Huda", specialty="Poetry")
+        self.package = MentorshipPackage.objects.create(
+            writer=self.writer, sessions_count=1, price=Decimal("10.00")
+        )
+        self.slot = AvailableSlot.objects.create(
+            writer=self.writer, package=self.package, date=date(2030, 1, 1), time="10:00"
+        )
+
+    def events(self, change):
+        with mock.patch.object(slot_events, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+        return [call.args[:2] for call in publish.mock_calls]
+
+    def save(self, **fields):
+        for name, value in fields.items():
+            setattr(self.slot, name, value)
+        return lambda: self.slot.save()
+
+    def test_new_slot_is_added_with_its_row(self):
+        with mock.patch.object(slot_events, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                slot = AvailableSlot.objects.create(
+                    writer=self.writer, date=date(2030, 1, 2), time="11:00"
+                )
+        publish.assert_called_once_with(
+            self.writer.pk, slot_events.ADDED, serializers.AvailableSlotSerializer(slot).data
+        )
+
+    def test_transitions(self):
+        pk = self.writer.pk
+        self.assertEqual(self.events(self.save(time="12:00")), [(pk, slot_events.UPDATED)])
+        self.assertEqual(self.events(self.save(is_available=False)), [(pk, slot_events.TAKEN)])
+        self.assertEqual(self.events(self.save(time="13:00")), [])
+        self.assertEqual(self.events(self.save(is_available=True)), [(pk, slot_events.RELEASED)])
+        self.assertEqual(self.events(self.slot.delete), [(pk, slot_events.REMOVED)])
+
+    def test_taken_slot_is_deleted_silently(self):
+        self.slot.is_available = False
+        self.slot.save()
+        self.assertEqual(self.events(self.slot.delete), [])
+
+    def test_moving_an_open_slot_between_writers(self):
+        other = Writer.objects.create(name="Omar", specialty="Prose")
+        self.assertEqual(
+            self.events(self.save(writer=other)),
+            [(self.writer.pk, slot_events.REMOVED), (other.pk, slot_events.ADDED)],
+        )
+
+    def test_moving_a_taken_slot_between_writers_is_silent(self):
+        self.slot.is_available = False
+        self.slot.save()
+        other = Writer.objects.create(name="Omar", specialty="Prose")
+        self.assertEqual(self.events(self.save(writer=other)), [])
+
+    def test_events_wait_for_commit(self):
+        with mock.patch.object(slot_events, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self.save(time="12:00")()
+            publish.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+    @UNTHROTTLED
+    def test_booking_a_slot_publishes_exactly_one_taken(self):
+        self.client.force_authenticate(self.make_user("sara"))
+        payload = {
+            "user_email": "sara@example.com",
+            "writer_id": self.writer.pk,
+            "package_id": self.package.pk,
+            "slot_id": self.slot.pk,
+        }
+
+        def book():
+            self.response = self.client.post("/api/bookings/", payload, format="json")
+
+        self.assertEqual(self.events(book), [(self.writer.pk, slot_events.TAKEN)])
+        self.assertEqual(self.response.status_code, 201)
+        self.slot.refresh_from_db()
+        self.assertEqual(
+            (self.slot.is_available, self.slot.booking_id), (False, self.response.json()["id"])
+        )
+
+        self.assertEqual(self.events(book), [])
+        self.assertEqual(self.response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class SnapshotTests(KitabTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = override_settings(CATALOGUE_SNAPSHOT_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.course = self.make_course(title="نحو", published=True)
+
+    def build(self, *only):
+        call_command("build_snapshots", *[f"--only={name}" for name in only], stdout=StringIO())
+        return json.loads((self.directory / snapshots.MANIFEST).read_bytes())
+
+    def test_build_writes_versioned_json_and_precompressed_variants(self):
+        manifest = self.build()
+        self.assertEqual(set(manifest), set(snapshots.SNAPSHOTS))
+        entry = manifest["courses"]
+        body = (self.directory / entry["url"]).read_bytes()
+        self.assertRegex(entry["url"], r"^courses\.[0-9a-f]{16}\.json$")
+        self.assertEqual((entry["count"], entry["bytes"]), (1, len(body)))
+        self.assertEqual([course["title"] for course in json.loads(body)], ["نحو"])
+        decompress = {
+            "gzip": gzip.decompress,
+            "br": lambda data: compression.brotli.decompress(data),
+            "zstd": lambda data: compression.zstandard.ZstdDecompressor().decompress(data),
+        }
+        for codec in compression.CODECS:
+            with self.subTest(codec=codec):
+                variant = self.directory / f"{entry['url']}{snapshots.EXTENSIONS[codec]}"
+                self.assertEqual(decompress[codec](variant.read_bytes()), body)
+        stats = json.loads((self.directory / manifest["stats"]["url"]).read_bytes())
+        self.assertEqual(stats["courses"], 1)
+
+    def test_unchanged_catalogue_keeps_its_version(self):
+        first = self.build("courses")["courses"]["url"]
+        self.assertEqual(self.build("courses")["courses"]["url"], first)
+        self.course.title = "صرف"
+        self.course.save()
+        manifest = self.build("courses")
+        self.assertNotEqual(manifest["courses"]["url"], first)
+        self.assertEqual(set(manifest), set(snapshots.SNAPSHOTS) & {"courses"})
+
+    def test_old_versions_are_pruned(self):
+        urls = []
+        for n in range(4):
+            self.course.title = f"Course {n}"
+            self.course.save()
+            urls.append(self.build("courses")["courses"]["url"])
+            # Order the versions explicitly; builds inside one test can share
+            # an mtime.
+            for path in self.directory.glob(f"{urls[-1]}*"):
+                os.utime(path, (n, n))
+        kept = {path.name for path in self.directory.glob("courses.*")}
+        expected = {
+            f"{url}{suffix}"
+            for url in urls[-snapshots.KEEP_VERSIONS :]
+            for suffix in ("", *(snapshots.EXTENSIONS[codec] for codec in compression.CODECS))
+        }
+        self.assertEqual(kept, expected)
+
+    def test_catalogue_saves_schedule_one_delayed_rebuild(self):
+        writer = Writer.objects.create(name="Huda", specialty="Poetry")
+        package = MentorshipPackage.objects.create(
+            writer=writer, sessions_count=1, price=Decimal("10.00")
+        )
+        edits = [(self.course, "title", "صرف"), (writer, "name", "Hana"), (package, "price", 12)]
+        for instance, field, value in edits:
+            with self.subTest(model=type(instance).__name__):
+                setattr(instance, field, value)
+                with mock.patch.object(tasks, "schedule_snapshots") as schedule:
+                    instance.save()
+                schedule.assert_called_once_with()
+
+        with override_settings(CATALOGUE_SNAPSHOT_ON_CHANGE=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.course.title = "بلاغة"
+                self.course.save()
+                writer.name = "Huda"
+                writer.save()
+                package.delete()
+        pending = Task.objects.filter(name="build_snapshots", status="pending")
+        self.assertEqual(pending.count(), 1)
+        self.assertGreater(pending.get().run_after, timezone.now())
+        self.assertFalse((self.directory / snapshots.MANIFEST).exists())
+
+        tasks.build_snapshots()
+        self.assertTrue((self.directory / snapshots.MANIFEST).exists())
+
+    def test_snapshots_are_not_scheduled_when_disabled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = "صرف"
+            self.course.save()
+        self.assertFalse(Task.objects.filter(name="build_snapshots").exists())
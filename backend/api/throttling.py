@@ -0,0 +1,80 @@
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    count, _, period = rate.partition("/")
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    cache = default_cache
+    timer = time.time
+    scope = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_bucket_ident(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        ident = self.get_bucket_ident(request, view) if rate else None
+        if ident is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        key = f"throttle:{scope}:{ident}"
+        now = self.timer()
+        tokens, stamp = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * capacity / period)
+        if tokens < 1:
+            self.retry_after = (1 - tokens) * period / capacity
+            metrics.incr(f"throttle.{scope}.rejected")
+            return False
+        self.cache.set(key, (tokens - 1, now), timeout=period)
+        return True
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    scope = "ip"
+
+    def get_bucket_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    scope = "user"
+
+    def get_bucket_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    def get_scope(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope:
+            return scope
+        return "read" if request.method in SAFE_METHODS else "write"
+
+    def get_bucket_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"user-{request.user.pk}"
+        return f"ip-{self.get_ident(request)}"
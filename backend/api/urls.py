@@ -2,19 +2,29 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    AnalyticsView,
+    ArchivedBookingViewSet,
+    ArchivedSlotViewSet,
+    ArchivedSubscriptionViewSet,
     AvailableSlotViewSet,
+    BlobView,
     BookingViewSet,
+    CatalogueImportView,
     CourseViewSet,
     CsrfView,
+    ExportView,
     HealthView,
     LessonViewSet,
     LoginView,
     LogoutView,
     MeView,
     MentorshipPackageViewSet,
+    MetricsView,
     RegisterView,
+    SearchView,
     SubscriptionViewSet,
     WriterViewSet,
+    writer_slot_stream,
 )
 
 router = DefaultRouter()
@@ -25,6 +35,9 @@ router.register("writers", WriterViewSet)
 router.register("mentorship-packages", MentorshipPackageViewSet)
 router.register("bookings", BookingViewSet)
 router.register("available-slots", AvailableSlotViewSet)
+router.register("archive/subscriptions", ArchivedSubscriptionViewSet)
+router.register("archive/bookings", ArchivedBookingViewSet)
+router.register("archive/slots", ArchivedSlotViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -34,4 +47,11 @@ urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/logout/', LogoutView.as_view(), name='logout'),
     path('auth/me/', MeView.as_view(), name='me'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('blobs/<str:key>/', BlobView.as_view(), name='blob'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('writers/<int:writer_id>/slots/stream', writer_slot_stream, name='writer-slot-stream'),
+    path('imports/catalogue/', CatalogueImportView.as_view(), name='catalogue-import'),
+    path('exports/<slug:resource>.<slug:fmt>', ExportView.as_view(), name='export'),
 ]
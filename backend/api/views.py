@@ -1,12 +1,48 @@
+from datetime import date
+from functools import cached_property
+
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model, login, logout
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.middleware.csrf import get_token
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.viewsets import ModelViewSet
-
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+
+from . import (
+    blobstore,
+    catalogue,
+    entitlements,
+    exports,
+    images,
+    metrics,
+    ordering,
+    response_cache,
+    rollups,
+    search,
+    slot_events,
+)
+from .auth import next_username, writer_profile_id
+from .fastpath import compile_serializer, has_object_permissions
+from .filters import filter_by_params
 from .models import (
+    ArchivedBooking,
+    ArchivedSlot,
+    ArchivedSubscription,
     AvailableSlot,
     Booking,
     Course,
@@ -14,8 +50,14 @@ from .models import (
     MentorshipPackage,
     Subscription,
     Writer,
+    normalize_email,
 )
+from .permissions import IsCourseInstructorOrManager, IsManager
+from .renderers import dumps
 from .serializers import (
+    ArchivedBookingSerializer,
+    ArchivedSlotSerializer,
+    ArchivedSubscriptionSerializer,
     AvailableSlotSerializer,
     BookingSerializer,
     CourseSerializer,
@@ -28,6 +70,7 @@ from .serializers import (
 
 class HealthView(APIView):
     permission_classes = []
+    throttle_classes = []
 
     def get(self, request):
         return Response({"status": "ok"})
@@ -42,6 +85,7 @@ class CsrfView(APIView):
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "auth"
 
     def post(self, request):
         username = request.data.get("username")
@@ -54,7 +98,7 @@ class LoginView(APIView):
         resolved_username = identifier
         if email or (identifier and "@" in identifier):
             User = get_user_model()
-            matched = User.objects.filter(email__iexact=identifier).only("username").first()
+            matched = User.objects.with_email(identifier).only("username").first()
             if matched:
                 resolved_username = matched.username
 
@@ -76,6 +120,8 @@ class LogoutView(APIView):
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "auth"
+    username_attempts = 5
 
     def post(self, request):
         email = request.data.get("email")
@@ -89,24 +135,29 @@ class RegisterView(APIView):
         valid_roles = {choice[0] for choice in User.ROLE_CHOICES}
         if role not in valid_roles:
             return Response({"detail": "Invalid role."}, status=400)
-        if User.objects.filter(email__iexact=email).exists():
+        email = normalize_email(email)
+        if User.objects.with_email(email).exists():
             return Response({"detail": "Email already registered."}, status=400)
 
         base_username = email.split("@")[0].replace(".", "_")
-        username = base_username
-        counter = 1
-        while User.objects.filter(username=username).exists():
-            counter += 1
-            username = f"{base_username}{counter}"
-
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
-            first_name=full_name,
-            role=role,
-        )
-        login(request, user)
+        for _ in range(self.username_attempts):
+            try:
+                with transaction.atomic():
+                    user = User.objects.create_user(
+                        username=next_username(base_username),
+                        email=email,
+                        password=password,
+                        first_name=full_name,
+                        role=role,
+                    )
+                break
+            except IntegrityError:
+                if User.objects.with_email(email).exists():
+                    return Response({"detail": "Email already registered."}, status=400)
+        else:
+            return Response({"detail": "Could not allocate a username, try again."}, status=409)
+
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
         return Response({"detail": "Registered.", "username": user.username}, status=201)
 
 
@@ -115,7 +166,6 @@ class MeView(APIView):
 
     def get(self, request):
         user = request.user
-        writer_profile = getattr(user, "writer_profile", None)
         return Response(
             {
                 "id": user.id,
@@ -123,52 +173,379 @@ class MeView(APIView):
                 "email": user.email,
                 "full_name": user.get_full_name() or user.username,
                 "role": user.role,
-                "writer_id": writer_profile.id if writer_profile else None,
+                "writer_id": writer_profile_id(user),
+            }
+        )
+
+
+class BlobView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    def get(self, request, key):
+        if not blobstore.is_valid_key(key):
+            raise Http404
+        return blobstore.get_blob_store().response(key)
+
+
+class AnalyticsView(APIView):
+    permission_classes = [IsManager]
+    sources = ("courses", "writers", "totals")
+    groupings = ("day", "entity", "entity_day")
+
+    def get(self, request):
+        params = request.query_params
+        source = params.get("source", "courses")
+        group_by = params.get("group_by", "day")
+        if source not in self.sources:
+            return Response({"detail": "Invalid source."}, status=400)
+        if source == "totals":
+            return Response({"source": source, "results": rollups.totals()})
+        if group_by not in self.groupings:
+            return Response({"detail": "Invalid group_by."}, status=400)
+        try:
+            start = date.fromisoformat(params["start"]) if params.get("start") else None
+            end = date.fromisoformat(params["end"]) if params.get("end") else None
+            ids = [int(value) for value in params.get("ids", "").split(",") if value]
+        except ValueError:
+            return Response({"detail": "Invalid date or id."}, status=400)
+
+        return Response(
+            {
+                "source": source,
+                "group_by": group_by,
+                "results": rollups.series(source, group_by, start=start, end=end, ids=ids),
+            }
+        )
+
+
+class ExportView(APIView):
+    permission_classes = [IsManager]
+    throttle_scope = "export"
+
+    def get(self, request, resource, fmt):
+        if resource not in exports.RESOURCES or fmt not in exports.FORMATS:
+            raise Http404
+        try:
+            content_type, body = exports.stream(resource, fmt, request.query_params)
+        except (ValueError, DjangoValidationError):
+            return Response({"detail": "Invalid filter value."}, status=400)
+        response = StreamingHttpResponse(body, content_type=content_type)
+        filename = f"{resource}-{date.today().isoformat()}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+async def writer_slot_stream(request, writer_id):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Slot streaming needs an ASGI server."}, status=501)
+    if slot_events.subscriber_count() >= settings.SLOT_STREAM_MAX_SUBSCRIBERS:
+        response = JsonResponse({"detail": "Server is busy, retry shortly."}, status=503)
+        response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER)
+        return response
+    if not await Writer.objects.filter(pk=writer_id).aexists():
+        raise Http404
+    response = StreamingHttpResponse(
+        slot_events.stream(writer_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+class CatalogueImportView(APIView):
+    permission_classes = [IsManager]
+    throttle_scope = "write"
+
+    def post(self, request):
+        kind = request.query_params.get("kind")
+        if kind and kind not in catalogue.KINDS:
+            return Response({"detail": "Invalid kind."}, status=400)
+        upload = request.FILES.get("file")
+        try:
+            if upload is not None:
+                fmt = upload.name.rsplit(".", 1)[-1].lower()
+                stream = upload.read() if fmt == "csv" else upload
+                bundle = catalogue.read(stream, fmt, kind or catalogue.kind_for_path(upload.name))
+            else:
+                bundle = catalogue.read(request.data, "json", kind)
+            dry_run = request.query_params.get("dry_run") in ("1", "true")
+            report = catalogue.Importer(dry_run=dry_run).run(bundle)
+        except (ValueError, UnicodeDecodeError) as exc:
+            return Response({"detail": str(exc)}, status=400)
+        return Response(report)
+
+
+class MetricsView(APIView):
+    permission_classes = [IsManager]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+class SearchView(APIView):
+    permission_classes = [AllowAny]
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        kind = request.query_params.get("kind")
+        if kind and kind not in search.INDEXED_FIELDS:
+            return Response({"detail": "Invalid kind."}, status=400)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 20)), self.max_limit))
+        except ValueError:
+            return Response({"detail": "Invalid limit."}, status=400)
+
+        hits = search.search(query, kinds=[kind] if kind else None, limit=limit)
+        titles = {
+            "course": dict(
+                Course.objects.filter(id__in=[h[1] for h in hits if h[0] == "course"])
+                .values_list("id", "title")
+            ),
+            "writer": dict(
+                Writer.objects.filter(id__in=[h[1] for h in hits if h[0] == "writer"])
+                .values_list("id", "name")
+            ),
+        }
+        return Response(
+            {
+                "query": query,
+                "results": [
+                    {
+                        "kind": hit_kind,
+                        "id": object_id,
+                        "title": titles[hit_kind].get(object_id, ""),
+                        "score": score,
+                    }
+                    for hit_kind, object_id, score in hits
+                ],
             }
         )
 
 
 class QueryParamFilterMixin:
     filter_fields = ()
+    email_filter_field = None
 
     def get_queryset(self):
         qs = super().get_queryset()
         if not self.filter_fields:
             return qs
-        params = self.request.query_params
-        filters = {}
-        for field in self.filter_fields:
-            if field not in params:
-                continue
-            value = params.get(field)
-            if value is None or value == "":
-                continue
-            lowered = value.lower()
-            if lowered in {"true", "false"}:
-                value = lowered == "true"
-            filters[field] = value
-        return qs.filter(**filters)
-
-
-class CourseViewSet(QueryParamFilterMixin, ModelViewSet):
+        return filter_by_params(
+            qs, self.request.query_params, self.filter_fields, self.email_filter_field
+        )
+
+
+class StreamingListMixin:
+    stream_chunk_size = 500
+
+    def wants_stream(self):
+        return self.request.query_params.get("stream", "").lower() in {"1", "true"}
+
+    def list(self, request, *args, **kwargs):
+        if not self.wants_stream():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        compiled = compile_serializer(self.get_serializer_class())
+        if compiled is not None:
+            rows = compiled.rows(
+                queryset,
+                chunk_size=self.stream_chunk_size,
+                context=self.get_serializer_context(),
+            )
+        else:
+            serializer = self.get_serializer_class()(context=self.get_serializer_context())
+            rows = map(
+                serializer.to_representation,
+                queryset.iterator(chunk_size=self.stream_chunk_size),
+            )
+        rows = map(self.present_row, rows)
+        return StreamingHttpResponse(self._stream_json(rows), content_type="application/json")
+
+    def _stream_json(self, rows):
+        yield b"["
+        separator = b""
+        chunk = []
+        for row in rows:
+            chunk.append(dumps(row))
+            if len(chunk) >= self.stream_chunk_size:
+                yield separator + b",".join(chunk)
+                separator = b","
+                chunk = []
+        if chunk:
+            yield separator + b",".join(chunk)
+        yield b"]"
+
+
+class FastReadMixin:
+    def list(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        if self.wants_stream():
+            return super().list(request, *args, **kwargs)
+        if compiled is None or self.paginator is not None:
+            return self._present(super().list(request, *args, **kwargs))
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = compiled.rows(queryset, context=self.get_serializer_context())
+        return Response([self.present_row(row) for row in rows])
+
+    def retrieve(self, request, *args, **kwargs):
+        compiled = compile_serializer(self.get_serializer_class())
+        if compiled is None or has_object_permissions(self.get_permissions()):
+            return self._present(super().retrieve(request, *args, **kwargs))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            # Lookups are cast when the query runs, so a malformed id such as
+            # /lessons/abc/ only fails inside next(); that is a miss, not a 500.
+            queryset = queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+            row = next(compiled.rows(queryset[:1], context=self.get_serializer_context()), None)
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        if row is None:
+            raise Http404
+        return Response(self.present_row(row))
+
+    def _present(self, response):
+        data = response.data
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            data["results"] = [self.present_row(row) for row in data["results"]]
+        elif isinstance(data, list):
+            response.data = [self.present_row(row) for row in data]
+        else:
+            response.data = self.present_row(data)
+        return response
+
+
+class ResponseCacheMixin:
+    def _response_cache_key(self):
+        if self.request.method != "GET" or self.action not in ("list", "retrieve"):
+            return None
+        if self.wants_stream() or self.request.accepted_renderer.format != "json":
+            return None
+        return response_cache.key_for(self.request, self.queryset.model)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = self._response_cache_key()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response() or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response() or super().retrieve(request, *args, **kwargs)
+
+    def _cached_response(self):
+        if not self.response_cache_key:
+            return None
+        entry = response_cache.lookup(self.response_cache_key)
+        if entry is None:
+            return None
+        metrics.incr("response_cache.hits")
+        response = HttpResponse(entry.body, content_type=entry.content_type)
+        response.cache_entry = entry
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, "response_cache_key", None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            response.cache_entry = response_cache.store(key, response)
+            metrics.incr("response_cache.misses")
+        return response
+
+
+class KitabModelViewSet(FastReadMixin, StreamingListMixin, ModelViewSet):
+    def present_row(self, row):
+        return row
+
+    # Write responses echo the saved row, so they go through present_row too.
+    def create(self, request, *args, **kwargs):
+        return self._present(super().create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self._present(super().update(request, *args, **kwargs))
+
+
+class ImageVariantMixin:
+    def get_image_size(self):
+        size = self.request.query_params.get("size")
+        if size in images.IMAGE_SIZES:
+            return size
+        return "card" if self.action == "list" else "full"
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        variants = qs.model.image_variants.rel.related_model
+        return qs.prefetch_related(
+            Prefetch("image_variants", queryset=variants.objects.filter(size=self.get_image_size()))
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["image_size"] = self.get_image_size()
+        return context
+
+
+class CourseViewSet(
+    ResponseCacheMixin, ImageVariantMixin, QueryParamFilterMixin, KitabModelViewSet
+):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     filter_fields = ("id", "instructor", "type", "published", "level", "category")
 
-
-class LessonViewSet(QueryParamFilterMixin, ModelViewSet):
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="lessons/reorder",
+        permission_classes=[IsCourseInstructorOrManager],
+    )
+    def reorder_lessons(self, request, pk=None):
+        course = self.get_object()
+        lesson_ids = request.data.get("lessons")
+        if not isinstance(lesson_ids, list) or not all(
+            type(value) is int for value in lesson_ids
+        ):
+            return Response({"detail": "lessons must be a list of lesson ids."}, status=400)
+        try:
+            ordering.reorder(course, lesson_ids)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        # Only the new keys go back: lesson bodies are LessonViewSet's to mask.
+        keys = Lesson.objects.filter(course=course).order_by("order").values("id", "order")
+        return Response(list(keys))
+
+
+class LessonViewSet(QueryParamFilterMixin, KitabModelViewSet):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     filter_fields = ("id", "course_id", "type", "is_free")
+    locked_fields = ("content", "video_url")
+
+    @cached_property
+    def access(self):
+        return entitlements.LessonAccess(self.request.user)
 
+    def present_row(self, row):
+        if self.access.can_open(row["course_id"], row["is_free"]):
+            return {**row, "locked": False}
+        return {**row, **dict.fromkeys(self.locked_fields, ""), "locked": True}
 
-class SubscriptionViewSet(QueryParamFilterMixin, ModelViewSet):
+
+class SubscriptionViewSet(QueryParamFilterMixin, KitabModelViewSet):
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
-    filter_fields = ("id", "course_id", "user_email", "payment_status")
+    filter_fields = ("id", "course_id", "user_email", "payment_status", "expired")
+    email_filter_field = "user_email"
 
 
-class WriterViewSet(QueryParamFilterMixin, ModelViewSet):
+class WriterViewSet(
+    ResponseCacheMixin, ImageVariantMixin, QueryParamFilterMixin, KitabModelViewSet
+):
     queryset = Writer.objects.all()
     serializer_class = WriterSerializer
     filter_fields = ("id", "active", "email")
@@ -185,19 +562,52 @@ class WriterViewSet(QueryParamFilterMixin, ModelViewSet):
             serializer.save()
 
 
-class MentorshipPackageViewSet(QueryParamFilterMixin, ModelViewSet):
+class MentorshipPackageViewSet(ResponseCacheMixin, QueryParamFilterMixin, KitabModelViewSet):
     queryset = MentorshipPackage.objects.all()
     serializer_class = MentorshipPackageSerializer
     filter_fields = ("id", "writer_id")
 
 
-class BookingViewSet(QueryParamFilterMixin, ModelViewSet):
+class BookingViewSet(QueryParamFilterMixin, KitabModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     filter_fields = ("id", "writer_id", "package_id", "status", "payment_status", "user_email")
+    email_filter_field = "user_email"
 
 
-class AvailableSlotViewSet(QueryParamFilterMixin, ModelViewSet):
+class AvailableSlotViewSet(QueryParamFilterMixin, KitabModelViewSet):
     queryset = AvailableSlot.objects.all()
     serializer_class = AvailableSlotSerializer
     filter_fields = ("id", "writer_id", "package_id", "is_available", "booking_id", "date")
+
+
+class ArchivePagination(CursorPagination):
+    ordering = "-id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class ArchiveViewSet(QueryParamFilterMixin, ReadOnlyModelViewSet):
+    permission_classes = [IsManager]
+    pagination_class = ArchivePagination
+
+
+class ArchivedSubscriptionViewSet(ArchiveViewSet):
+    queryset = ArchivedSubscription.objects.all()
+    serializer_class = ArchivedSubscriptionSerializer
+    filter_fields = ("id", "course_id", "user_email", "payment_status")
+    email_filter_field = "user_email"
+
+
+class ArchivedBookingViewSet(ArchiveViewSet):
+    queryset = ArchivedBooking.objects.all()
+    serializer_class = ArchivedBookingSerializer
+    filter_fields = ("id", "writer_id", "package_id", "status", "payment_status", "user_email")
+    email_filter_field = "user_email"
+
+
+class ArchivedSlotViewSet(ArchiveViewSet):
+    queryset = ArchivedSlot.objects.all()
+    serializer_class = ArchivedSlotSerializer
+    filter_fields = ("id", "writer_id", "package_id", "booking_id", "date")
@@ -10,8 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,8 +49,21 @@ INSTALLED_APPS = [
 
 AUTH_USER_MODEL = 'api.User'
 
+# A single backend: each listed backend runs the password hasher on a failed
+# login. Migration 0014 moved older sessions off the stock ModelBackend.
+AUTHENTICATION_BACKENDS = [
+    'api.auth.CachedModelBackend',
+]
+
+# Seconds a resolved request.user (with its writer profile id) stays cached.
+AUTH_USER_CACHE_TIMEOUT = 60
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.admission.ConcurrencyLimitMiddleware',
+    'api.profiling.MemoryProfileMiddleware',
+    'api.compression.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,13 +96,41 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Write transactions take SQLite's write lock when they begin and wait up to
+# `timeout` seconds for it, so concurrent signups queue instead of failing
+# with "database is locked" when a read-then-write transaction upgrades.
+# Tests use a file database because in-memory ones never wait for locks.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        'TEST': {'NAME': BASE_DIR / 'test-db.sqlite3'},
+    }
+}
+
+# Use a shared cache (Redis/Memcached) in production so invalidation reaches
+# every worker; the local-memory cache is per process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Seconds a user's set of entitled course ids stays cached. Subscription
+# saves and deletes drop the owner's entry straight away.
+ENTITLEMENT_CACHE_TIMEOUT = 300
+
+# Seconds a rendered catalogue response (and its compressed forms) stays in
+# the cache; saves to the underlying models expire entries immediately.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Responses smaller than this many bytes are sent uncompressed. Brotli and
+# zstd are negotiated when the brotli / zstandard packages are installed.
+COMPRESSION_MIN_SIZE = 1024
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
@@ -92,8 +138,116 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Token buckets: "N/period" refills N tokens per period and allows bursts
+    # of up to N. Anonymous clients are bucketed by IP, signed-in ones by user.
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.IPTokenBucketThrottle',
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.ScopedTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'ip': '120/min',
+        'user': '300/min',
+        'auth': '10/min',
+        'read': '240/min',
+        'write': '60/min',
+        'export': '30/hour',
+    },
 }
 
+# Background tasks (api.tasks) are rows in the database, run by
+# `manage.py run_tasks` workers. Eager mode runs them in-process right after
+# the writing transaction commits, which is what `manage.py test` uses.
+TASK_QUEUE_EAGER = os.environ.get(
+    'KITAB_TASKS_EAGER', '1' if 'test' in sys.argv[1:2] else ''
+) == '1'
+TASK_BATCH_SIZE = 20
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_BACKOFF = 10
+TASK_RETRY_BACKOFF_MAX = 3600
+TASK_LEASE_SECONDS = 300
+# Finished tasks are deleted after this many days; run_tasks prunes them every
+# TASK_PRUNE_INTERVAL seconds. Failed tasks are kept for inspection.
+TASK_RETENTION_DAYS = int(os.environ.get('KITAB_TASK_RETENTION_DAYS', 7))
+TASK_PRUNE_INTERVAL = 3600
+
+# Long text columns (lesson content, course descriptions, writer bios) are
+# stored compressed once they reach COMPRESSED_TEXT_MIN_SIZE bytes. Each value
+# starts with a version byte, so rows written with either codec stay readable.
+# "zstd" needs the zstandard package (pinned in requirements-dev.txt) on
+# every host that reads the database; startup fails without it.
+COMPRESSED_TEXT_CODEC = os.environ.get('KITAB_COMPRESSED_TEXT_CODEC', 'zlib')
+COMPRESSED_TEXT_MIN_SIZE = 256
+COMPRESSED_TEXT_LEVEL = 6
+
+# Versioned, precompressed JSON snapshots of the published catalogue that the
+# SPA reads before the API. `manage.py build_snapshots` writes them; catalogue
+# edits queue a rebuild CATALOGUE_SNAPSHOT_DELAY seconds later so bursts of
+# edits share one. The SPA ignores snapshots older than 15 minutes, so also
+# run the command from cron more often than that. Point the directory at the
+# SPA's deployed static root.
+CATALOGUE_SNAPSHOT_DIR = Path(
+    os.environ.get('KITAB_SNAPSHOT_DIR', BASE_DIR.parent / 'public' / 'snapshots')
+)
+CATALOGUE_SNAPSHOT_ON_CHANGE = os.environ.get(
+    'KITAB_SNAPSHOT_ON_CHANGE', '' if 'test' in sys.argv[1:2] else '1'
+) == '1'
+CATALOGUE_SNAPSHOT_DELAY = 30
+
+# `manage.py archive_history` moves finished rows older than these windows
+# (in days) into the api_archived* tables, served read-only under
+# /api/archive/. Rollup recomputes count the archived rows as well as the live ones.
+ARCHIVE_SLOT_RETENTION_DAYS = int(os.environ.get('KITAB_ARCHIVE_SLOT_DAYS', 90))
+ARCHIVE_BOOKING_RETENTION_DAYS = int(os.environ.get('KITAB_ARCHIVE_BOOKING_DAYS', 365))
+ARCHIVE_SUBSCRIPTION_RETENTION_DAYS = int(os.environ.get('KITAB_ARCHIVE_SUBSCRIPTION_DAYS', 365))
+
+# Outgoing mail prints to the console by default. Point KITAB_EMAIL_BACKEND
+# at django.core.mail.backends.smtp.EmailBackend to deliver through
+# KITAB_EMAIL_HOST:KITAB_EMAIL_PORT, e.g. a local SMTP catcher such as
+# Mailpit on port 1025. `manage.py test` swaps in the in-memory backend.
+EMAIL_BACKEND = os.environ.get(
+    'KITAB_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend'
+)
+EMAIL_HOST = os.environ.get('KITAB_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('KITAB_EMAIL_PORT', 1025))
+DEFAULT_FROM_EMAIL = os.environ.get('KITAB_FROM_EMAIL', 'KITAB <no-reply@kitab.local>')
+
+# Requests served at once per worker process. Further requests wait up to
+# ADMISSION_QUEUE_TIMEOUT seconds for a slot, then get a 503 with Retry-After.
+ADMISSION_MAX_CONCURRENT_REQUESTS = int(os.environ.get('KITAB_MAX_CONCURRENT_REQUESTS', 32))
+ADMISSION_QUEUE_TIMEOUT = 0.5
+ADMISSION_RETRY_AFTER = 2
+ADMISSION_EXEMPT_PATHS = ['/api/health/']
+
+# Memory profiling is off unless KITAB_MEMORY_PROFILE_SAMPLE_RATE is set (0.05
+# traces one request in twenty). Traced requests record peak and net
+# allocation with tracemalloc, charged to lines in api/serializers.py,
+# api/views.py and api/renderers.py, as JSON lines under MEMORY_PROFILE_DIR.
+# `manage.py memory_profile_report` aggregates them per route. Streaming
+# responses are not recorded: their body renders after the view returns, so a
+# sample would miss most of their cost. Tracing slows the sampled request
+# several times over, so keep the rate low in production.
+MEMORY_PROFILE_SAMPLE_RATE = float(os.environ.get('KITAB_MEMORY_PROFILE_SAMPLE_RATE', 0))
+MEMORY_PROFILE_FRAMES = 30
+MEMORY_PROFILE_TOP_SITES = 15
+MEMORY_PROFILE_DIR = Path(
+    os.environ.get('KITAB_MEMORY_PROFILE_DIR', BASE_DIR / 'memory-profiles')
+)
+
+# Live slot events for booking pages (/api/writers/<id>/slots/stream) need
+# an ASGI server such as `uvicorn config.asgi:application`. Events fan out
+# inside one worker process, so run a single ASGI worker for streams or let
+# clients fall back to refetching. Each open page holds one subscriber with
+# a bounded queue; a slow reader that fills it gets a "reset" event instead.
+SLOT_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('KITAB_SLOT_STREAM_MAX_SUBSCRIBERS', 1000))
+SLOT_STREAM_QUEUE_SIZE = 100
+SLOT_STREAM_HEARTBEAT = 15
+SLOT_STREAM_RETRY_MS = 5000
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
     'http://127.0.0.1:5173',
@@ -101,6 +255,12 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# The SPA revalidates cached entity reads with If-None-Match, so it has to
+# send that header cross-origin and read the ETag that
+# ConditionalGetMiddleware puts on responses.
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+CORS_EXPOSE_HEADERS = ['ETag']
+
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:5173',
     'http://127.0.0.1:5173',
@@ -126,6 +286,51 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# KITAB_PASSWORD_HASHING picks the hasher new and upgraded hashes use:
+# "scrypt" (default), "argon2" (needs argon2-cffi) or "pbkdf2". The "fast"
+# policy (MD5) is set by `manage.py test` only and cannot be chosen from the
+# environment: upgrade-on-login would re-hash real users with it, and no other
+# policy lists it, so they could not log in once it was switched back.
+# Hashes made by any other listed hasher still verify and are re-hashed with
+# the preferred one on the next successful login.
+
+PASSWORD_HASHER_POLICIES = {
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'fast': 'django.contrib.auth.hashers.MD5PasswordHasher',
+}
+
+PASSWORD_HASHING_POLICY = os.environ.get('KITAB_PASSWORD_HASHING', 'scrypt')
+if PASSWORD_HASHING_POLICY not in set(PASSWORD_HASHER_POLICIES) - {'fast'}:
+    raise ImproperlyConfigured(
+        f'KITAB_PASSWORD_HASHING must be scrypt, argon2 or pbkdf2, not {PASSWORD_HASHING_POLICY!r}.'
+    )
+if 'test' in sys.argv[1:2]:
+    PASSWORD_HASHING_POLICY = 'fast'
+
+PASSWORD_SCRYPT_PARAMS = {
+    'work_factor': int(os.environ.get('KITAB_SCRYPT_WORK_FACTOR', 2**14)),
+    'block_size': 8,
+    'parallelism': 1,
+}
+
+PASSWORD_ARGON2_PARAMS = {
+    'time_cost': int(os.environ.get('KITAB_ARGON2_TIME_COST', 2)),
+    'memory_cost': int(os.environ.get('KITAB_ARGON2_MEMORY_COST', 65536)),
+    'parallelism': 1,
+}
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_POLICIES[PASSWORD_HASHING_POLICY]] + [
+    hasher
+    for policy, hasher in PASSWORD_HASHER_POLICIES.items()
+    if policy not in {PASSWORD_HASHING_POLICY, 'fast'}
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
 
@@ -145,3 +350,34 @@ STATIC_URL = 'static/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+
+# Blob storage
+# Binary content (image variants) is stored outside the database, keyed by
+# SHA-256. Use 'api.blobstore.S3BlobStore' with OPTIONS such as bucket and
+# endpoint_url for an S3-compatible service (requires boto3).
+
+BLOB_STORE = {
+    'BACKEND': 'api.blobstore.FileSystemBlobStore',
+    'OPTIONS': {'root': BASE_DIR / 'blobs'},
+}
+
+
+# Image uploads
+# Uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to a temporary file,
+# and anything above IMAGE_UPLOAD_MAX_BYTES is rejected before decoding.
+# Each accepted image is stored as bounded variants selected with ?size=.
+
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+IMAGE_MAX_PIXELS = 40_000_000
+
+IMAGE_VARIANT_FORMAT = 'WEBP'  # or 'AVIF' / 'JPEG'
+
+IMAGE_VARIANT_QUALITY = 80
+
+IMAGE_VARIANT_BOUNDS = {
+    'thumbnail': (160, 160),
+    'card': (640, 640),
+    'full': (1600, 1600),
+}
@@ -1,6 +1,10 @@
 // src/api/base44Client.js
 
 const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
+const SNAPSHOT_BASE = import.meta.env.VITE_SNAPSHOT_BASE || "/snapshots";
+// Snapshots are rebuilt after catalogue edits and on a schedule; older ones
+// are ignored in favour of the API.
+const SNAPSHOT_MAX_AGE_MS = 15 * 60 * 1000;
 
 function getCookie(name) {
   if (typeof document === "undefined") return null;
@@ -15,15 +19,6 @@ function resolveMediaUrl(url) {
   if (url.startsWith("/")) return `${API_BASE}${url}`;
   return url;
 }
-// Helper: simple filter by object match { published: true }
-function matchesWhere(item, where = {}) {
-  return Object.entries(where).every(([k, v]) => {
-    const current = item?.[k];
-    if (current === undefined || current === null) return false;
-    return String(current) === String(v);
-  });
-}
-
 // Helper: sort by "-created_date" or "created_date"
 function sortBy(list, sortKey) {
   if (!sortKey) return list;
@@ -60,7 +55,15 @@ async function ensureCsrfToken() {
   return getCookie("csrftoken");
 }
 
-async function apiRequest(path, { method = "GET", body } = {}) {
+const MAX_RETRY_AFTER_SECONDS = 5;
+
+function retryDelay(res) {
+  const seconds = Number(res.headers.get("Retry-After"));
+  if (!Number.isFinite(seconds) || seconds > MAX_RETRY_AFTER_SECONDS) return null;
+  return Math.max(seconds, 0) * 1000;
+}
+
+async function apiExchange(path, { method = "GET", body, etag, retried = false } = {}) {
   const headers = {};
   const writeMethods = ["POST", "PUT", "PATCH", "DELETE"];
   if (body !== undefined) {
@@ -70,6 +73,9 @@ async function apiRequest(path, { method = "GET", body } = {}) {
     const csrfToken = await ensureCsrfToken();
     headers["X-CSRFToken"] = csrfToken || "";
   }
+  if (etag) {
+    headers["If-None-Match"] = etag;
+  }
 
   const res = await fetch(`${API_BASE}${path}`, {
     method,
@@ -78,15 +84,99 @@ async function apiRequest(path, { method = "GET", body } = {}) {
     body: body !== undefined ? JSON.stringify(body) : undefined,
   });
 
-  if (res.status === 204) return null;
+  if (res.status === 503 && method === "GET" && !retried) {
+    const delay = retryDelay(res);
+    if (delay !== null) {
+      await new Promise((resolve) => setTimeout(resolve, delay));
+      return apiExchange(path, { method, body, etag, retried: true });
+    }
+  }
+  if (res.status === 304) return { notModified: true, etag, payload: null };
+  if (res.status === 204) return { etag: null, payload: null };
   const payload = await res.json().catch(() => null);
   if (!res.ok) {
     const detail = payload?.detail || "Request failed.";
     throw new Error(detail);
   }
+  return { etag: res.headers.get("ETag"), payload };
+}
+
+async function apiRequest(path, options) {
+  const { payload } = await apiExchange(path, options);
   return payload;
 }
 
+// Entity reads are shared between components: identical GETs in flight are
+// coalesced, answers younger than FRESH_MS are served as is, answers younger
+// than STALE_MS are served while an If-None-Match revalidation runs in the
+// background, and older ones wait for that revalidation.
+const FRESH_MS = 5 * 1000;
+const STALE_MS = 60 * 1000;
+const MAX_CACHED_READS = 200;
+const readCache = new Map();
+const inFlightReads = new Map();
+let readGeneration = 0;
+
+// Server-side side effects of writes: booking a slot reserves it, renaming a
+// writer or course is copied onto packages, bookings and subscriptions.
+const RELATED_ENTITIES = {
+  Booking: ["AvailableSlot"],
+  Writer: ["MentorshipPackage", "Booking"],
+  Course: ["Subscription", "Lesson"],
+  Subscription: ["Lesson"],
+};
+
+function revalidate(entityKey, path) {
+  if (inFlightReads.has(path)) return inFlightReads.get(path);
+  const cached = readCache.get(path);
+  const generation = readGeneration;
+  const request = apiExchange(path, { etag: cached?.etag })
+    .then(({ notModified, etag, payload }) => {
+      const entry = notModified
+        ? { ...cached, fetchedAt: Date.now() }
+        : { entityKey, etag, payload, fetchedAt: Date.now() };
+      // A write landed while this read was in flight; answer it but keep it out of the cache.
+      if (generation !== readGeneration) return entry.payload;
+      readCache.delete(path);
+      readCache.set(path, entry);
+      if (readCache.size > MAX_CACHED_READS) {
+        readCache.delete(readCache.keys().next().value);
+      }
+      return entry.payload;
+    })
+    .finally(() => {
+      if (inFlightReads.get(path) === request) inFlightReads.delete(path);
+    });
+  inFlightReads.set(path, request);
+  return request;
+}
+
+function cachedRead(entityKey, path) {
+  const cached = readCache.get(path);
+  const age = cached ? Date.now() - cached.fetchedAt : Infinity;
+  if (age < FRESH_MS) return Promise.resolve(cached.payload);
+  if (age < STALE_MS) {
+    revalidate(entityKey, path).catch(() => readCache.delete(path));
+    return Promise.resolve(cached.payload);
+  }
+  return revalidate(entityKey, path);
+}
+
+function invalidateEntity(entityKey) {
+  readGeneration += 1;
+  inFlightReads.clear();
+  const stale = new Set([entityKey, ...(RELATED_ENTITIES[entityKey] || [])]);
+  for (const [path, entry] of readCache) {
+    if (stale.has(entry.entityKey)) readCache.delete(path);
+  }
+}
+
+function clearReadCache() {
+  readGeneration += 1;
+  inFlightReads.clear();
+  readCache.clear();
+}
+
 async function apiRequestForm(path, { method = "POST", formData } = {}) {
   const headers = {};
   const writeMethods = ["POST", "PUT", "PATCH", "DELETE"];
@@ -124,38 +214,68 @@ function createEntityApi(entityKey, normalizeItem) {
   const endpoint = endpoints[entityKey];
   const normalize = (item) => (normalizeItem ? normalizeItem(item) : item);
 
+  const write = async (request) => {
+    try {
+      return await request;
+    } finally {
+      invalidateEntity(entityKey);
+    }
+  };
+
   return {
     async list() {
-      const items = await apiRequest(`/api/${endpoint}/`);
+      const items = await cachedRead(entityKey, `/api/${endpoint}/`);
+      return items.map(normalize);
+    },
+    // Bulk read through the streaming list mode. Streams carry no ETag and
+    // skip the server's response cache, so this is not cached here either.
+    async stream() {
+      const items = await apiRequest(`/api/${endpoint}/?stream=true`);
       return items.map(normalize);
     },
     async filter(where = {}, sortKey) {
       const params = buildQueryParams(where);
+      params.sort();
       const query = params.toString();
-      const items = await apiRequest(`/api/${endpoint}/${query ? `?${query}` : ""}`);
-      const normalized = items.map(normalize);
-      const filtered = normalized.filter((item) => matchesWhere(item, where));
-      return sortBy(filtered, sortKey);
+      const items = await cachedRead(entityKey, `/api/${endpoint}/${query ? `?${query}` : ""}`);
+      return sortBy(items.map(normalize), sortKey);
     },
     async create(data) {
-      const item = await apiRequest(`/api/${endpoint}/`, { method: "POST", body: data });
+      const item = await write(apiRequest(`/api/${endpoint}/`, { method: "POST", body: data }));
       return normalize(item);
     },
     async update(id, updates) {
-      const item = await apiRequest(`/api/${endpoint}/${id}/`, { method: "PATCH", body: updates });
+      const item = await write(
+        apiRequest(`/api/${endpoint}/${id}/`, { method: "PATCH", body: updates })
+      );
       return normalize(item);
     },
     async delete(id) {
-      await apiRequest(`/api/${endpoint}/${id}/`, { method: "DELETE" });
+      await write(apiRequest(`/api/${endpoint}/${id}/`, { method: "DELETE" }));
       return true;
     },
     async createForm(formData) {
-      const item = await apiRequestForm(`/api/${endpoint}/`, { method: "POST", formData });
+      const item = await write(apiRequestForm(`/api/${endpoint}/`, { method: "POST", formData }));
       return normalize(item);
     },
   };
 }
 
+// Prerendered catalogue JSON served next to the SPA. The manifest is
+// revalidated on every read; the files it names are immutable.
+async function loadSnapshot(name) {
+  try {
+    const manifestRes = await fetch(`${SNAPSHOT_BASE}/manifest.json`, { cache: "no-cache" });
+    if (!manifestRes.ok) return null;
+    const entry = (await manifestRes.json())?.[name];
+    if (!entry || Date.now() - Date.parse(entry.generated_at) > SNAPSHOT_MAX_AGE_MS) return null;
+    const res = await fetch(`${SNAPSHOT_BASE}/${entry.url}`);
+    return res.ok ? await res.json() : null;
+  } catch {
+    return null;
+  }
+}
+
 const normalizeCourse = (course) => ({
   ...course,
   image_url: resolveMediaUrl(course.image_data || course.image_url),
@@ -192,6 +312,7 @@ export const kitabApi = {
         credentials: "include",
         body: JSON.stringify({ email, password }),
       });
+      clearReadCache();
       if (!res.ok) {
         const payload = await res.json().catch(() => ({}));
         throw new Error(payload.detail || "Login failed.");
@@ -214,6 +335,7 @@ export const kitabApi = {
           role,
         }),
       });
+      clearReadCache();
       if (!res.ok) {
         const payload = await res.json().catch(() => ({}));
         throw new Error(payload.detail || "Registration failed.");
@@ -230,6 +352,7 @@ export const kitabApi = {
         },
         credentials: "include",
       });
+      clearReadCache();
     },
     redirectToLogin(returnTo) {
       window.dispatchEvent(
@@ -243,18 +366,97 @@ export const kitabApi = {
     Course: createEntityApi("Course", normalizeCourse),
     Writer: createEntityApi("Writer", normalizeWriter),
     Subscription: createEntityApi("Subscription"),
-    Lesson: createEntityApi("Lesson"),
+    Lesson: {
+      ...createEntityApi("Lesson"),
+      async reorder(courseId, lessonIds) {
+        try {
+          return await apiRequest(`/api/courses/${courseId}/lessons/reorder/`, {
+            method: "POST",
+            body: { lessons: lessonIds },
+          });
+        } finally {
+          invalidateEntity("Lesson");
+        }
+      },
+    },
     MentorshipPackage: createEntityApi("MentorshipPackage"),
     AvailableSlot: createEntityApi("AvailableSlot"),
     Booking: createEntityApi("Booking"),
   },
 
-  integrations: {
-    Core: {
-      async SendEmail(payload) {
-        console.log("Mock email sent", payload);
-        return true;
-      },
+  catalogue: {
+    async courses() {
+      const rows = await loadSnapshot("courses");
+      if (rows) return rows.map(normalizeCourse);
+      return kitabApi.entities.Course.filter({ published: true });
+    },
+    async writers() {
+      const rows = await loadSnapshot("writers");
+      if (rows) return rows.map(normalizeWriter);
+      return kitabApi.entities.Writer.filter({ active: true });
+    },
+    async packages(writerId, sortKey) {
+      const rows = await loadSnapshot("packages");
+      const mine = rows?.filter((row) => String(row.writer_id) === String(writerId));
+      if (mine?.length) return sortBy(mine, sortKey);
+      return kitabApi.entities.MentorshipPackage.filter({ writer_id: writerId }, sortKey);
+    },
+    async stats() {
+      const stats = await loadSnapshot("stats");
+      if (stats) return stats;
+      const [courses, writers, subscriptions] = await Promise.all([
+        kitabApi.entities.Course.list(),
+        kitabApi.entities.Writer.list(),
+        kitabApi.entities.Subscription.list(),
+      ]);
+      return {
+        courses: courses.filter((c) => c.published).length,
+        writers: writers.filter((w) => w.active).length,
+        students: new Set(subscriptions.map((s) => s.user_email)).size,
+      };
+    },
+  },
+
+  async search(query, { kind, limit } = {}) {
+    const params = buildQueryParams({ q: query, kind, limit });
+    const payload = await apiRequest(`/api/search/?${params.toString()}`);
+    return payload?.results || [];
+  },
+
+  slots: {
+    // Live slot events for one writer; returns a function that closes the stream.
+    subscribe(writerId, onEvent) {
+      if (typeof EventSource === "undefined") return () => {};
+      const source = new EventSource(`${API_BASE}/api/writers/${writerId}/slots/stream`, {
+        withCredentials: true,
+      });
+      ["added", "taken", "released", "updated", "removed", "reset"].forEach((type) => {
+        source.addEventListener(type, (event) => {
+          invalidateEntity("AvailableSlot");
+          onEvent(type, JSON.parse(event.data));
+        });
+      });
+      return () => source.close();
+    },
+  },
+
+  exports: {
+    url(resource, format = "csv", filters = {}) {
+      const query = buildQueryParams(filters).toString();
+      return `${API_BASE}/api/exports/${resource}.${format}${query ? `?${query}` : ""}`;
+    },
+  },
+
+  analytics: {
+    async query({ source = "courses", groupBy = "day", start, end, ids } = {}) {
+      const params = buildQueryParams({
+        source,
+        group_by: groupBy,
+        start,
+        end,
+        ids: ids?.length ? ids.join(",") : undefined,
+      });
+      return apiRequest(`/api/analytics/?${params.toString()}`);
     },
   },
 };
@@ -8,7 +8,7 @@ import { Input } from "@/components/ui/input";
 import { Textarea } from "@/components/ui/textarea";
 import {
   Users, BookOpen, Calendar, Edit, Trash2, Save, Loader2,
-  GraduationCap, PackagePlus, FileText
+  GraduationCap, PackagePlus, FileText, Download
 } from "lucide-react";
 import {
   Dialog,
@@ -56,47 +56,65 @@ export default function AdminDashboard() {
     Subscription: "admin-subscriptions",
   };
 
-  // Fetch all data
+  // Each tab loads only the lists it shows; the stat cards read rollup totals.
+  const tabData = {
+    "writers-management": ["writers", "packages", "bookings"],
+    writers: ["writers"],
+    courses: ["courses"],
+    lessons: ["lessons"],
+    packages: ["packages"],
+    bookings: ["bookings"],
+    subscriptions: ["subscriptions"],
+  };
+  const showsList = (name) => !!user && (tabData[activeTab] || []).includes(name);
+
+  const { data: totals } = useQuery({
+    queryKey: ['admin-totals'],
+    queryFn: async () => (await kitabApi.analytics.query({ source: "totals" })).results,
+    initialData: {},
+    enabled: !!user,
+  });
+
   const { data: writers } = useQuery({
     queryKey: ['admin-writers'],
     queryFn: () => kitabApi.entities.Writer.list(),
     initialData: [],
-    enabled: !!user,
+    enabled: showsList('writers'),
   });
 
   const { data: courses } = useQuery({
     queryKey: ['admin-courses'],
     queryFn: () => kitabApi.entities.Course.list(),
     initialData: [],
-    enabled: !!user,
+    enabled: showsList('courses'),
   });
 
   const { data: lessons } = useQuery({
     queryKey: ['admin-lessons'],
     queryFn: () => kitabApi.entities.Lesson.list(),
     initialData: [],
-    enabled: !!user,
+    enabled: showsList('lessons'),
   });
 
   const { data: packages } = useQuery({
     queryKey: ['admin-packages'],
     queryFn: () => kitabApi.entities.MentorshipPackage.list(),
     initialData: [],
-    enabled: !!user,
+    enabled: showsList('packages'),
   });
 
   const { data: bookings } = useQuery({
     queryKey: ['admin-bookings'],
     queryFn: () => kitabApi.entities.Booking.list('-created_date'),
     initialData: [],
-    enabled: !!user,
+    enabled: showsList('bookings'),
   });
 
   const { data: subscriptions } = useQuery({
     queryKey: ['admin-subscriptions'],
     queryFn: () => kitabApi.entities.Subscription.list('-created_date'),
     initialData: [],
-    enabled: !!user,
+    enabled: showsList('subscriptions'),
   });
 
   // Generic mutations
@@ -116,6 +134,7 @@ export default function AdminDashboard() {
       if (queryKey) {
         queryClient.invalidateQueries({ queryKey: [queryKey] });
       }
+      queryClient.invalidateQueries({ queryKey: ['admin-totals'] });
       setEditDialog({ open: false, type: null, data: null });
     },
   });
@@ -136,6 +155,7 @@ export default function AdminDashboard() {
       if (queryKey) {
         queryClient.invalidateQueries({ queryKey: [queryKey] });
       }
+      queryClient.invalidateQueries({ queryKey: ['admin-totals'] });
     },
   });
 
@@ -175,7 +195,7 @@ export default function AdminDashboard() {
         <div className="grid grid-cols-2 md:grid-cols-6 gap-4 mb-8">
           <StatCard
             label="كتّاب"
-            value={writers.length}
+            value={totals.writers ?? 0}
             Icon={Users}
             iconColor="text-[#B8941F]"
             iconBg="bg-[#D4AF37]/15"
@@ -183,7 +203,7 @@ export default function AdminDashboard() {
           />
           <StatCard
             label="دورات"
-            value={courses.length}
+            value={totals.courses ?? 0}
             Icon={GraduationCap}
             iconColor="text-[#5B6EE1]"
             iconBg="bg-[#5B6EE1]/15"
@@ -191,7 +211,7 @@ export default function AdminDashboard() {
           />
           <StatCard
             label="دروس"
-            value={lessons.length}
+            value={totals.lessons ?? 0}
             Icon={FileText}
             iconColor="text-[#2BAF6A]"
             iconBg="bg-[#2BAF6A]/15"
@@ -199,7 +219,7 @@ export default function AdminDashboard() {
           />
           <StatCard
             label="باقات"
-            value={packages.length}
+            value={totals.packages ?? 0}
             Icon={PackagePlus}
             iconColor="text-[#E78B3A]"
             iconBg="bg-[#E78B3A]/15"
@@ -207,7 +227,7 @@ export default function AdminDashboard() {
           />
           <StatCard
             label="حجوزات"
-            value={bookings.length}
+            value={totals.bookings ?? 0}
             Icon={Calendar}
             iconColor="text-[#3A7BD5]"
             iconBg="bg-[#3A7BD5]/15"
@@ -215,7 +235,7 @@ export default function AdminDashboard() {
           />
           <StatCard
             label="اشتراكات"
-            value={subscriptions.length}
+            value={totals.subscriptions ?? 0}
             Icon={BookOpen}
             iconColor="text-[#8E5AD7]"
             iconBg="bg-[#8E5AD7]/15"
@@ -606,7 +626,17 @@ export default function AdminDashboard() {
           <TabsContent value="bookings">
             <Card className="border-none shadow-lg">
               <CardHeader>
-                <CardTitle>الحجوزات ({bookings.length})</CardTitle>
+                <div className="flex items-center justify-between">
+                  <CardTitle>الحجوزات ({bookings.length})</CardTitle>
+                  <Button
+                    variant="outline"
+                    size="sm"
+                    onClick={() => window.location.assign(kitabApi.exports.url("bookings", "csv"))}
+                  >
+                    <Download className="w-4 h-4 ml-2" />
+                    تصدير CSV
+                  </Button>
+                </div>
               </CardHeader>
               <CardContent>
                 <div className="overflow-x-auto">
@@ -663,7 +693,17 @@ export default function AdminDashboard() {
           <TabsContent value="subscriptions">
             <Card className="border-none shadow-lg">
               <CardHeader>
-                <CardTitle>الاشتراكات ({subscriptions.length})</CardTitle>
+                <div className="flex items-center justify-between">
+                  <CardTitle>الاشتراكات ({subscriptions.length})</CardTitle>
+                  <Button
+                    variant="outline"
+                    size="sm"
+                    onClick={() => window.location.assign(kitabApi.exports.url("subscriptions", "csv"))}
+                  >
+                    <Download className="w-4 h-4 ml-2" />
+                    تصدير CSV
+                  </Button>
+                </div>
               </CardHeader>
               <CardContent>
                 <div className="overflow-x-auto">
@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 import { kitabApi } from "@/api/kitabApiClient";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { Link } from "react-router-dom";
@@ -57,6 +57,31 @@ export default function BookingPage() {
     enabled: !!writerId,
   });
 
+  useEffect(() => {
+    if (!writerId) return undefined;
+    return kitabApi.slots.subscribe(writerId, (type, slot) => {
+      if (type === "reset") {
+        queryClient.invalidateQueries({ queryKey: ['slots', writerId] });
+        return;
+      }
+      queryClient.setQueryData(['slots', writerId], (current = []) => {
+        const others = current.filter((s) => s.id !== slot.id);
+        if (type === "taken" || type === "removed") return others;
+        if (packageId && String(slot.package_id) !== String(packageId)) return others;
+        return [...others, slot].sort((a, b) => a.date.localeCompare(b.date));
+      });
+    });
+  }, [writerId, packageId, queryClient]);
+
+  useEffect(() => {
+    if (
+      selectedTime &&
+      !availableSlots.some((s) => s.date === selectedDate && s.time === selectedTime)
+    ) {
+      setSelectedTime(null);
+    }
+  }, [availableSlots, selectedDate, selectedTime]);
+
   // Group slots by date
   const slotsByDate = availableSlots.reduce((acc, slot) => {
     if (!acc[slot.date]) {
@@ -69,66 +94,7 @@ export default function BookingPage() {
   const availableDates = Object.keys(slotsByDate).sort();
 
   const createBookingMutation = useMutation({
-    mutationFn: async (bookingData) => {
-      // Create booking
-      const booking = await kitabApi.entities.Booking.create(bookingData);
-      
-      // Mark slot as unavailable
-      const slot = availableSlots.find(
-        s => s.date === selectedDate && s.time === selectedTime
-      );
-      if (slot) {
-        await kitabApi.entities.AvailableSlot.update(slot.id, {
-          is_available: false,
-          booking_id: booking.id
-        });
-      }
-      
-      // Send email to writer
-      await kitabApi.integrations.Core.SendEmail({
-        to: writer.email,
-        subject: `حجز جديد من ${user.full_name}`,
-        body: `
-          مرحباً ${writer.name}،
-          
-          لديك حجز جديد:
-          
-          - الطالب: ${user.full_name}
-          - البريد: ${user.email}
-          - التاريخ: ${selectedDate}
-          - الوقت: ${selectedTime}
-          - الباقة: ${pkg.name || pkg.sessions_count + ' جلسات'}
-          - ملاحظات: ${notes || 'لا توجد'}
-          
-          يرجى التواصل مع الطالب لتأكيد الموعد.
-          
-          مع تحيات منصة كتاب
-        `
-      });
-      
-      // Send confirmation to user
-      await kitabApi.integrations.Core.SendEmail({
-        to: user.email,
-        subject: `تأكيد حجز جلسة إرشاد مع ${writer.name}`,
-        body: `
-          مرحباً ${user.full_name}،
-          
-          تم حجز جلستك بنجاح!
-          
-          - الكاتب: ${writer.name}
-          - التاريخ: ${selectedDate}
-          - الوقت: ${selectedTime}
-          - الباقة: ${pkg.name || pkg.sessions_count + ' جلسات'}
-          - السعر: ${pkg.price} ر.س
-          
-          سيتواصل معك الكاتب قريباً لتأكيد الموعد.
-          
-          مع تحيات منصة كتاب
-        `
-      });
-      
-      return booking;
-    },
+    mutationFn: (bookingData) => kitabApi.entities.Booking.create(bookingData),
     onSuccess: () => {
       setSuccess(true);
       queryClient.invalidateQueries({ queryKey: ['slots'] });
@@ -140,6 +106,9 @@ export default function BookingPage() {
     if (!selectedDate || !selectedTime) {
       return;
     }
+    const selectedSlot = availableSlots.find(
+      s => s.date === selectedDate && s.time === selectedTime
+    );
 
     setIsProcessing(true);
     try {
@@ -154,7 +123,8 @@ export default function BookingPage() {
         session_date: `${selectedDate}T${selectedTime}`,
         status: 'pending',
         payment_status: 'pending',
-        notes: notes
+        notes: notes,
+        slot_id: selectedSlot?.id
       });
     } catch (error) {
       console.error('Error creating booking:', error);
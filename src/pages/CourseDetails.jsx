@@ -44,7 +44,8 @@ export default function CourseDetails() {
       const subs = await kitabApi.entities.Subscription.filter({
         course_id: courseId,
         user_email: user.email,
-        payment_status: 'completed'
+        payment_status: 'completed',
+        expired: false
       });
       return subs[0];
     },
@@ -18,18 +18,31 @@ export default function Courses() {
 
   const { data: courses, isLoading } = useQuery({
     queryKey: ['courses'],
-    queryFn: () => kitabApi.entities.Course.filter({ published: true }, '-created_date'),
+    queryFn: () => kitabApi.catalogue.courses(),
     initialData: [],
   });
 
-  const filteredCourses = courses.filter(course => {
-    const matchesSearch = course.title?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                         course.description?.toLowerCase().includes(searchQuery.toLowerCase());
-    const matchesType = typeFilter === "all" || course.type === typeFilter;
-    const matchesLevel = levelFilter === "all" || course.level === levelFilter;
-    return matchesSearch && matchesType && matchesLevel;
+  const trimmedQuery = searchQuery.trim();
+  const { data: searchHits } = useQuery({
+    queryKey: ['course-search', trimmedQuery],
+    queryFn: () => kitabApi.search(trimmedQuery, { kind: 'course', limit: 50 }),
+    enabled: trimmedQuery.length > 0,
+    placeholderData: (previous) => previous,
   });
 
+  const searchRanks = trimmedQuery && searchHits
+    ? new Map(searchHits.map((hit, index) => [hit.id, index]))
+    : null;
+
+  const filteredCourses = courses
+    .filter(course => {
+      const matchesSearch = !searchRanks || searchRanks.has(course.id);
+      const matchesType = typeFilter === "all" || course.type === typeFilter;
+      const matchesLevel = levelFilter === "all" || course.level === levelFilter;
+      return matchesSearch && matchesType && matchesLevel;
+    })
+    .sort((a, b) => (searchRanks ? searchRanks.get(a.id) - searchRanks.get(b.id) : 0));
+
   const getTypeLabel = (type) => {
     const labels = {
       free: "مجاني",
@@ -15,17 +15,7 @@ export default function Home() {
   });
 
   React.useEffect(() => {
-    Promise.all([
-      kitabApi.entities.Course.list(),
-      kitabApi.entities.Writer.list(),
-      kitabApi.entities.Subscription.list()
-    ]).then(([courses, writers, subscriptions]) => {
-      setStats({
-        courses: courses.filter(c => c.published).length,
-        writers: writers.filter(w => w.active).length,
-        students: new Set(subscriptions.map(s => s.user_email)).size
-      });
-    });
+    kitabApi.catalogue.stats().then(setStats);
   }, []);
 
   const handleStartNow = async () => {
@@ -22,7 +22,7 @@ import {
   SelectValue,
 } from "@/components/ui/select";
 import {
-  GraduationCap, FileText, Plus, Edit, Trash2, Save, Loader2
+  GraduationCap, FileText, Plus, Edit, Trash2, Save, Loader2, ArrowUp, ArrowDown
 } from "lucide-react";
 import useAuthGuard from "@/hooks/useAuthGuard";
 
@@ -50,6 +50,8 @@ export default function InstructorDashboard() {
   const myLessons = allLessons.filter((lesson) =>
     courses.some((course) => course.id === lesson.course_id)
   );
+  const courseLessonIds = (courseId) =>
+    myLessons.filter((lesson) => lesson.course_id === courseId).map((lesson) => lesson.id);
 
   // Course Mutations
   const createCourseMutation = useMutation({
@@ -92,6 +94,22 @@ export default function InstructorDashboard() {
     },
   });
 
+  const reorderLessonsMutation = useMutation({
+    mutationFn: ({ courseId, lessonIds }) => kitabApi.entities.Lesson.reorder(courseId, lessonIds),
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ["instructor-lessons"] });
+    },
+  });
+
+  const moveLesson = (lesson, offset) => {
+    const lessonIds = courseLessonIds(lesson.course_id);
+    const from = lessonIds.indexOf(lesson.id);
+    const to = from + offset;
+    if (to < 0 || to >= lessonIds.length) return;
+    lessonIds.splice(to, 0, lessonIds.splice(from, 1)[0]);
+    reorderLessonsMutation.mutate({ courseId: lesson.course_id, lessonIds });
+  };
+
   const deleteLessonMutation = useMutation({
     mutationFn: (id) => kitabApi.entities.Lesson.delete(id),
     onSuccess: () => {
@@ -222,6 +240,8 @@ export default function InstructorDashboard() {
                   <div className="space-y-4">
                     {myLessons.map((lesson) => {
                       const course = courses.find((c) => c.id === lesson.course_id);
+                      const siblings = courseLessonIds(lesson.course_id);
+                      const position = siblings.indexOf(lesson.id);
                       return (
                         <div key={lesson.id} className="p-4 bg-[#F5F1E8] rounded-lg">
                           <div className="flex items-start justify-between">
@@ -231,7 +251,7 @@ export default function InstructorDashboard() {
                                   {course?.title}
                                 </Badge>
                                 <Badge className="text-xs bg-[#D4AF37]/20 text-[#D4AF37]">
-                                  الترتيب: {lesson.order}
+                                  الترتيب: {position + 1}
                                 </Badge>
                               </div>
                               <h3 className="text-lg font-bold text-[#1A1A1A]">{lesson.title}</h3>
@@ -249,6 +269,24 @@ export default function InstructorDashboard() {
                               </div>
                             </div>
                             <div className="flex gap-2">
+                              <Button
+                                size="sm"
+                                variant="outline"
+                                disabled={position === 0 || reorderLessonsMutation.isPending}
+                                onClick={() => moveLesson(lesson, -1)}
+                              >
+                                <ArrowUp className="w-4 h-4" />
+                              </Button>
+                              <Button
+                                size="sm"
+                                variant="outline"
+                                disabled={
+                                  position === siblings.length - 1 || reorderLessonsMutation.isPending
+                                }
+                                onClick={() => moveLesson(lesson, 1)}
+                              >
+                                <ArrowDown className="w-4 h-4" />
+                              </Button>
                               <Button
                                 size="sm"
                                 variant="outline"
@@ -477,7 +515,6 @@ function LessonDialog({ dialog, setDialog, courses, onCreate, onUpdate }) {
     video_url: "",
     content: "",
     is_free: false,
-    order: 1,
     duration: "",
   });
 
@@ -493,7 +530,6 @@ function LessonDialog({ dialog, setDialog, courses, onCreate, onUpdate }) {
         video_url: "",
         content: "",
         is_free: false,
-        order: 1,
         duration: "",
       });
     }
@@ -564,14 +600,6 @@ function LessonDialog({ dialog, setDialog, courses, onCreate, onUpdate }) {
                 </SelectContent>
               </Select>
             </div>
-            <div>
-              <label className="text-sm font-medium mb-2 block">الترتيب *</label>
-              <Input
-                type="number"
-                value={formData.order}
-                onChange={(e) => setFormData({ ...formData, order: parseInt(e.target.value) })}
-              />
-            </div>
           </div>
           <div>
             <label className="text-sm font-medium mb-2 block">رابط الفيديو</label>
@@ -17,7 +17,7 @@ export default function Lesson() {
   const { user } = useAuthGuard({ requireAuth: false });
 
   const { data: lesson, isLoading: loadingLesson } = useQuery({
-    queryKey: ['lesson', lessonId],
+    queryKey: ['lesson', lessonId, user?.email],
     queryFn: async () => {
       const lessons = await kitabApi.entities.Lesson.filter({ id: lessonId });
       return lessons[0];
@@ -41,26 +41,11 @@ export default function Lesson() {
     enabled: !!lesson?.course_id,
   });
 
-  const { data: subscription } = useQuery({
-    queryKey: ['subscription', lesson?.course_id, user?.email],
-    queryFn: async () => {
-      if (!user) return null;
-      const subs = await kitabApi.entities.Subscription.filter({
-        course_id: lesson.course_id,
-        user_email: user.email,
-        payment_status: 'completed'
-      });
-      return subs[0];
-    },
-    enabled: !!lesson?.course_id && !!user,
-  });
-
   const currentIndex = allLessons.findIndex(l => l.id === lessonId);
   const previousLesson = currentIndex > 0 ? allLessons[currentIndex - 1] : null;
   const nextLesson = currentIndex < allLessons.length - 1 ? allLessons[currentIndex + 1] : null;
   
-  const isEnrolled = !!subscription;
-  const canAccess = lesson?.is_free || course?.type === 'free' || isEnrolled;
+  const canAccess = !lesson?.locked;
 
   const getVideoEmbed = (url) => {
     if (!url) return null;
@@ -15,7 +15,7 @@ export default function Mentorship() {
 
   const { data: writers, isLoading } = useQuery({
     queryKey: ['writers'],
-    queryFn: () => kitabApi.entities.Writer.filter({ active: true }, '-created_date'),
+    queryFn: () => kitabApi.catalogue.writers(),
     initialData: [],
   });
 
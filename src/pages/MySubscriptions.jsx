@@ -18,7 +18,8 @@ export default function MySubscriptions() {
     queryKey: ['my-subscriptions', user?.email],
     queryFn: () => kitabApi.entities.Subscription.filter({ 
       user_email: user.email,
-      payment_status: 'completed'
+      payment_status: 'completed',
+      expired: false
     }, '-created_date'),
     initialData: [],
     enabled: !!user,
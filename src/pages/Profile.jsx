@@ -24,7 +24,8 @@ export default function Profile() {
     queryKey: ['my-subscriptions', user?.email],
     queryFn: () => kitabApi.entities.Subscription.filter({ 
       user_email: user.email,
-      payment_status: 'completed'
+      payment_status: 'completed',
+      expired: false
     }),
     initialData: [],
     enabled: !!user,
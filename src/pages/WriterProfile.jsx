@@ -30,7 +30,7 @@ export default function WriterProfile() {
 
   const { data: packages, isLoading: loadingPackages } = useQuery({
     queryKey: ['packages', writerId],
-    queryFn: () => kitabApi.entities.MentorshipPackage.filter({ writer_id: writerId }, 'sessions_count'),
+    queryFn: () => kitabApi.catalogue.packages(writerId, 'sessions_count'),
     initialData: [],
     enabled: !!writerId,
   });